@@ -0,0 +1,353 @@
+"""
+Admission control in front of the memory tools.
+
+The dispatcher caps how many Mem0 calls of each operation run at once, but
+every tool call still gets in line for it, however many are already waiting.
+One agent looping save_memory over SSE can queue up unbounded work, use up
+the LLM quota and hold back everyone else's searches. The admission
+controller decides, before a tool starts, whether it runs now, waits, or is
+turned away:
+
+* At most ADMISSION_MAX_CONCURRENT tool calls run at once, and at most
+  ADMISSION_CLIENT_MAX_CONCURRENT of them for one client.
+* A client that calls a tool faster than its RATE_LIMIT_<TOOL> (calls per
+  minute, with a burst of RATE_LIMIT_BURST) is rejected right away, with the
+  time until its next token as retry_after_ms.
+* Calls over the concurrency limits wait in a queue of at most
+  ADMISSION_MAX_QUEUE entries. Searches and reads are admitted before saves.
+  When the queue is full, a call displaces the lowest priority waiter if it
+  outranks it, and is rejected otherwise.
+* A call waits at most ADMISSION_QUEUE_TIMEOUT_MS, or the shorter
+  ``timeout_ms`` the client sends in the request's ``_meta``. When the queue
+  ahead of it cannot drain in that time at the recent service rate, it is
+  rejected at once instead of timing out.
+
+Rejections come back at once as an error string carrying a JSON object with
+the reason and a retry hint.
+Clients are told apart by a ``client_id`` in the request's ``_meta``, else by
+their connection, or by their user / agent scope on the stateless HTTP
+transport, where every request is a new connection. Limits hold per server
+process.
+"""
+from collections import OrderedDict
+import asyncio
+import bisect
+import functools
+import itertools
+import json
+import os
+import time
+
+from metrics import record_error
+from scoping import resolve_scope, scope_key
+from utils import env_bool, env_float, env_int
+
+# Lower runs first. Tools not listed here get DEFAULT_PRIORITY.
+TOOL_PRIORITIES = {
+    "search_memories": 0,
+    "search_memories_batch": 0,
+    "get_memories": 0,
+    "get_all_memories": 1,
+    "save_memory": 2,
+    "save_memories": 2,
+}
+DEFAULT_PRIORITY = 1
+
+# Token buckets kept for idle clients before the least recently used are dropped
+_MAX_BUCKETS = 10000
+# Weight of the latest call in the moving average of tool service times
+_SERVICE_TIME_WEIGHT = 0.1
+
+class AdmissionRejected(Exception):
+    """A tool call turned away by admission control."""
+
+    def __init__(self, reason, message, retry_after=None):
+        """
+        Args:
+            reason: "rate_limited", "overloaded" or "queue_timeout"
+            message: Explanation for the client
+            retry_after: Seconds after which a retry may succeed, if known
+        """
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def to_dict(self, tool):
+        error = {"error": self.reason, "tool": tool, "message": str(self)}
+        if self.retry_after is not None:
+            error["retry_after_ms"] = max(1, round(self.retry_after * 1000))
+        return error
+
+class TokenBucket:
+    """Allows rate calls per second on average, and bursts of up to burst calls."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self, now=None):
+        """Take a token if there is one; returns 0, or the seconds until the next token."""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class AdmissionController:
+    """Global and per-client concurrency limits, per-tool rate limits and a bounded priority queue.
+
+    Runs on the event loop; none of its methods may be called from worker threads.
+    """
+
+    def __init__(self, max_concurrent=64, client_max_concurrent=16, max_queue=256, queue_timeout=5.0,
+                 rate_limits=None, burst=10, priorities=None):
+        """
+        Args:
+            max_concurrent: Tool calls running at once across all clients (0 for no limit)
+            client_max_concurrent: Tool calls running at once per client (0 for no limit)
+            max_queue: Calls that may wait for a slot; further calls are rejected
+            queue_timeout: Seconds a call waits for a slot at most
+            rate_limits: Mapping of tool name to calls per minute per client
+            burst: Calls a client may make in a burst before its rate limit applies
+            priorities: Mapping of tool name to priority (lower is admitted first)
+        """
+        self.max_concurrent = max_concurrent
+        self.client_max_concurrent = client_max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate_limits = {tool: limit for tool, limit in (rate_limits or {}).items() if limit > 0}
+        self.burst = burst
+        self.priorities = dict(TOOL_PRIORITIES if priorities is None else priorities)
+        self._running = 0
+        self._client_running = {}
+        # Waiters sorted by (priority, arrival): [priority, sequence, client, tool, future]
+        self._queue = []
+        self._sequence = itertools.count()
+        self._buckets = OrderedDict()
+        self._service_time = None
+        self._admitted = {}
+        self._rejected = {}
+
+    def priority_of(self, tool):
+        return self.priorities.get(tool, DEFAULT_PRIORITY)
+
+    def _can_run(self, client):
+        if self.max_concurrent and self._running >= self.max_concurrent:
+            return False
+        return not self.client_max_concurrent or self._client_running.get(client, 0) < self.client_max_concurrent
+
+    def _check_rate(self, tool, client):
+        limit = self.rate_limits.get(tool)
+        if not limit:
+            return
+        key = (client, tool)
+        bucket = self._buckets.pop(key, None) or TokenBucket(limit / 60.0, min(self.burst, limit))
+        self._buckets[key] = bucket
+        if len(self._buckets) > _MAX_BUCKETS:
+            self._buckets.popitem(last=False)
+        wait = bucket.take()
+        if wait > 0:
+            raise AdmissionRejected(
+                "rate_limited", f"{tool} is limited to {limit:g} calls per minute per client", retry_after=wait
+            )
+
+    def _estimated_wait(self, ahead):
+        """Seconds until ahead queued calls have started, at the recent service rate; None before any call finished."""
+        if self._service_time is None or not self.max_concurrent:
+            return None
+        return (ahead + 1) * self._service_time / self.max_concurrent
+
+    def _start(self, tool, client):
+        self._running += 1
+        self._client_running[client] = self._client_running.get(client, 0) + 1
+        self._admitted[tool] = self._admitted.get(tool, 0) + 1
+
+    def _count_rejection(self, tool, reason):
+        self._rejected[(tool, reason)] = self._rejected.get((tool, reason), 0) + 1
+
+    async def acquire(self, tool, client, timeout=None):
+        """Wait for a slot to run tool for client.
+
+        Args:
+            tool: Name of the tool being called
+            client: Hashable identity of the calling client
+            timeout: Seconds the caller is willing to wait; capped by queue_timeout
+
+        Raises:
+            AdmissionRejected: The call is rate limited, the queue is full or the wait would be too long
+        """
+        try:
+            await self._acquire(tool, client, timeout)
+        except AdmissionRejected as e:
+            self._count_rejection(tool, e.reason)
+            raise
+
+    async def _acquire(self, tool, client, timeout):
+        self._check_rate(tool, client)
+        priority = self.priority_of(tool)
+        # Only waiters that outrank or arrived before this call and could run now go first
+        ahead = [waiter for waiter in self._queue if waiter[0] <= priority]
+        if self._can_run(client) and not any(self._can_run(waiter[2]) for waiter in ahead):
+            self._start(tool, client)
+            return
+
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        estimate = self._estimated_wait(len(ahead))
+        if timeout <= 0 or (estimate is not None and estimate > timeout):
+            raise AdmissionRejected(
+                "overloaded", f"server busy: {len(ahead)} calls ahead, more than {timeout:g}s of waiting",
+                retry_after=estimate,
+            )
+        if self.max_queue and len(self._queue) >= self.max_queue:
+            lowest = self._queue[-1]
+            if lowest[0] <= priority:
+                raise AdmissionRejected("overloaded", "server busy: the admission queue is full", retry_after=estimate)
+            # Shed the waiter with the lowest priority to make room for this one
+            self._queue.pop()
+            if not lowest[4].done():
+                lowest[4].set_exception(AdmissionRejected(
+                    "overloaded", "server busy: displaced from the queue by a higher priority call",
+                    retry_after=estimate,
+                ))
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = [priority, next(self._sequence), client, tool, future]
+        bisect.insort(self._queue, waiter, key=lambda entry: (entry[0], entry[1]))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            if future.done() and future.exception() is None:
+                # Granted just as the wait ran out
+                return
+            self._remove(waiter)
+            raise AdmissionRejected("queue_timeout", f"no slot became free within {timeout:g}s",
+                                    retry_after=self._estimated_wait(len(self._queue)))
+        except asyncio.CancelledError:
+            self._remove(waiter)
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # The slot was granted to a caller that is gone; hand it on
+                self.release(tool, client)
+            raise
+
+    def _remove(self, waiter):
+        try:
+            self._queue.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, tool, client, service_time=None):
+        """Free the slot of a finished call and admit the waiters that can run now."""
+        self._running -= 1
+        remaining = self._client_running.get(client, 1) - 1
+        if remaining:
+            self._client_running[client] = remaining
+        else:
+            self._client_running.pop(client, None)
+        if service_time is not None:
+            if self._service_time is None:
+                self._service_time = service_time
+            else:
+                self._service_time += _SERVICE_TIME_WEIGHT * (service_time - self._service_time)
+        for waiter in list(self._queue):
+            if self.max_concurrent and self._running >= self.max_concurrent:
+                break
+            if waiter[4].done() or not self._can_run(waiter[2]):
+                continue
+            self._queue.remove(waiter)
+            self._start(waiter[3], waiter[2])
+            waiter[4].set_result(None)
+
+    async def run(self, tool, client, func, timeout=None):
+        """Run the coroutine function func once admitted, holding a slot until it finishes."""
+        await self.acquire(tool, client, timeout)
+        started = time.perf_counter()
+        try:
+            return await func()
+        finally:
+            self.release(tool, client, time.perf_counter() - started)
+
+    def stats(self):
+        """Running and queued calls, and admissions and rejections per tool."""
+        return {
+            "running": self._running,
+            "queued": len(self._queue),
+            "clients": len(self._client_running),
+            "max_concurrent": self.max_concurrent,
+            "client_max_concurrent": self.client_max_concurrent,
+            "max_queue": self.max_queue,
+            "service_time_ms": None if self._service_time is None else round(self._service_time * 1000, 3),
+            "admitted": dict(self._admitted),
+            "rejected": [
+                {"tool": tool, "reason": reason, "count": count} for (tool, reason), count in self._rejected.items()
+            ],
+        }
+
+def get_admission_settings():
+    """Read the ADMISSION_* and RATE_LIMIT_* settings."""
+    return {
+        "enabled": env_bool("ADMISSION_ENABLED", True),
+        "max_concurrent": env_int("ADMISSION_MAX_CONCURRENT", 64),
+        "client_max_concurrent": env_int("ADMISSION_CLIENT_MAX_CONCURRENT", 16),
+        "max_queue": env_int("ADMISSION_MAX_QUEUE", 256),
+        "queue_timeout": env_int("ADMISSION_QUEUE_TIMEOUT_MS", 5000) / 1000,
+        "rate_limits": {tool: env_float(f"RATE_LIMIT_{tool.upper()}", 0.0) for tool in TOOL_PRIORITIES},
+        "burst": env_int("RATE_LIMIT_BURST", 10),
+    }
+
+def get_admission_controller():
+    """Build an AdmissionController from the settings, or None with ADMISSION_ENABLED=false."""
+    settings = get_admission_settings()
+    if not settings.pop("enabled"):
+        return None
+    return AdmissionController(**settings)
+
+def _meta_value(ctx, key):
+    meta = getattr(ctx.request_context, "meta", None)
+    if meta is None:
+        return None
+    values = meta.model_dump() if hasattr(meta, "model_dump") else dict(meta)
+    return values.get(key)
+
+def client_of(ctx, kwargs):
+    """Identity of the client making a tool call: its _meta client_id, its connection, or its scope."""
+    client_id = _meta_value(ctx, "client_id")
+    if client_id:
+        return ("client", str(client_id))
+    if os.getenv("TRANSPORT", "sse") != "streamable-http":
+        session = getattr(ctx.request_context, "session", None)
+        if session is not None:
+            return ("session", id(session))
+    scope = resolve_scope(ctx, kwargs.get("user_id"), kwargs.get("agent_id"), kwargs.get("run_id"))
+    return ("scope", scope_key(scope.filters()))
+
+def admission_controlled(func):
+    """Run an MCP tool under the admission controller of the server context.
+
+    A rejected call returns without running the tool, as an "Error calling <tool>: "
+    string like the tools' own errors, followed by the JSON of AdmissionRejected.to_dict.
+    Goes below instrument_tool, so rejections count as errors and the time spent
+    queued is part of the tool's duration.
+    """
+    tool = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(ctx, *args, **kwargs):
+        controller = getattr(ctx.request_context.lifespan_context, "admission", None)
+        if controller is None:
+            return await func(ctx, *args, **kwargs)
+        timeout = _meta_value(ctx, "timeout_ms")
+        try:
+            timeout = float(timeout) / 1000 if timeout is not None else None
+        except (TypeError, ValueError):
+            timeout = None
+        try:
+            return await controller.run(tool, client_of(ctx, kwargs), lambda: func(ctx, *args, **kwargs), timeout)
+        except AdmissionRejected as e:
+            record_error(e)
+            return f"Error calling {tool}: {json.dumps(e.to_dict(tool))}"
+
+    return wrapper
@@ -0,0 +1,285 @@
+"""
+Batched ingestion for Mem0.
+
+``Memory.add`` runs one fact-extraction prompt, one update prompt and one
+embedding request per extracted fact for every call. When many texts arrive
+together that is mostly wasted round-trips, so this module ingests a group of
+texts with a single shared extraction prompt, a single update prompt and one
+batched embedding request, and also offers a verbatim path that skips the LLM
+and stores every text with one embedding request and one vector upsert.
+
+``SaveBatcher`` applies the same grouping to individual ``save_memory`` calls
+that arrive within a short window of each other.
+"""
+from datetime import datetime
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+
+import pytz
+
+from scoping import scope_key
+from utils import env_int
+
+logger = logging.getLogger(__name__)
+
+# OpenAI accepts up to 2048 inputs per embeddings request; stay well below it
+EMBEDDING_BATCH_SIZE = 256
+
+def embed_batch(embedder, texts, memory_action="add"):
+    """Embed several texts, using one provider request per chunk where the embedder allows it.
+
+    Works with the OpenAI-compatible and Ollama embedders Mem0 builds, and with
+    any wrapper that exposes its own ``embed_batch``. Other embedders fall back
+    to one ``embed`` call per text.
+
+    Args:
+        embedder: The Mem0 embedding model (``memory.embedding_model``)
+        texts: The texts to embed
+        memory_action: The Mem0 action the embeddings are for ("add", "search" or "update")
+
+    Returns:
+        list: One embedding vector per input text, in input order
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    if hasattr(embedder, "embed_batch"):
+        return embedder.embed_batch(texts, memory_action)
+
+    client = getattr(embedder, "client", None)
+    vectors = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        chunk = texts[start:start + EMBEDDING_BATCH_SIZE]
+        if client is not None and hasattr(getattr(client, "embeddings", None), "create"):
+            # Same request the Mem0 OpenAI embedder makes, with every text in one call
+            response = client.embeddings.create(
+                input=[text.replace("\n", " ") for text in chunk],
+                model=embedder.config.model,
+                dimensions=embedder.config.embedding_dims,
+            )
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda item: item.index))
+        elif client is not None and hasattr(client, "embed"):
+            # Ollama's /api/embed endpoint takes a list of inputs
+            response = client.embed(model=embedder.config.model, input=chunk)
+            vectors.extend(list(vector) for vector in response["embeddings"])
+        else:
+            vectors.extend(embedder.embed(text, memory_action) for text in chunk)
+    return vectors
+
+def store_verbatim(memory, texts, filters, vectors=None, metadata=None):
+    """Store texts as-is, without LLM fact extraction.
+
+    All texts are embedded in one batched request (unless their vectors are
+    passed in) and written with one vector store upsert, using the same payload
+    layout as ``Memory.add(infer=False)``. Extra metadata is stored in every payload.
+
+    Returns:
+        list: One {"id", "memory", "event"} entry per text, in input order
+    """
+    metadata = {**(metadata or {}), **filters}
+    if vectors is None:
+        vectors = embed_batch(memory.embedding_model, texts, "add")
+    created_at = datetime.now(pytz.timezone("US/Pacific")).isoformat()
+    ids = [str(uuid.uuid4()) for _ in texts]
+    payloads = [
+        {**metadata, "data": text, "hash": hashlib.md5(text.encode()).hexdigest(), "created_at": created_at}
+        for text in texts
+    ]
+    memory.vector_store.insert(vectors=vectors, ids=ids, payloads=payloads)
+    for memory_id, text in zip(ids, texts):
+        memory.db.add_history(memory_id, None, text, "ADD", created_at=created_at)
+    return [{"id": memory_id, "memory": text, "event": "ADD"} for memory_id, text in zip(ids, texts)]
+
+def _generate_json(memory, messages):
+    from mem0.memory.utils import remove_code_blocks
+
+    response = memory.llm.generate_response(messages=messages, response_format={"type": "json_object"})
+    return json.loads(remove_code_blocks(response))
+
+def extract_and_store(memory, texts, filters, metadata=None):
+    """Run Mem0's extract/update pipeline once for a whole group of texts.
+
+    Mirrors ``Memory._add_to_vector_store`` from mem0ai 0.1.x, but the texts share
+    one fact-extraction prompt and one update prompt, and the extracted facts
+    are embedded in a single batched request. Extra metadata is stored with
+    every memory the group adds or updates.
+
+    Returns:
+        list: The memory events ({"id", "memory", "event"}) produced for the group
+    """
+    from mem0.configs.prompts import get_update_memory_messages
+    from mem0.memory.utils import get_fact_retrieval_messages, parse_messages
+
+    metadata = {**(metadata or {}), **filters}
+    parsed_messages = parse_messages([{"role": "user", "content": text} for text in texts])
+    if memory.custom_fact_extraction_prompt:
+        system_prompt = memory.custom_fact_extraction_prompt
+        user_prompt = f"Input:\n{parsed_messages}"
+    else:
+        system_prompt, user_prompt = get_fact_retrieval_messages(parsed_messages)
+
+    facts = _generate_json(
+        memory,
+        [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
+    ).get("facts", [])
+    if not facts:
+        return []
+
+    fact_embeddings = dict(zip(facts, embed_batch(memory.embedding_model, facts, "add")))
+    existing = {}
+    for fact, vector in fact_embeddings.items():
+        for hit in memory.vector_store.search(query=fact, vectors=vector, limit=5, filters=filters):
+            existing[hit.id] = hit.payload["data"]
+
+    # Number the existing memories so the LLM cannot hallucinate UUIDs
+    temp_ids = {str(index): memory_id for index, memory_id in enumerate(existing)}
+    old_memory = [{"id": index, "text": existing[memory_id]} for index, memory_id in temp_ids.items()]
+    actions = _generate_json(
+        memory,
+        [{"role": "user", "content": get_update_memory_messages(old_memory, facts, memory.custom_update_memory_prompt)}],
+    )
+
+    events = []
+    for action in actions.get("memory", []):
+        text = action.get("text")
+        event = action.get("event")
+        try:
+            if not text or event == "NONE":
+                continue
+            if event == "ADD":
+                memory_id = memory._create_memory(data=text, existing_embeddings=fact_embeddings, metadata=dict(metadata))
+                events.append({"id": memory_id, "memory": text, "event": event})
+            elif event == "UPDATE":
+                memory_id = temp_ids[action["id"]]
+                memory._update_memory(
+                    memory_id=memory_id, data=text, existing_embeddings=fact_embeddings, metadata=dict(metadata)
+                )
+                events.append({"id": memory_id, "memory": text, "event": event, "previous_memory": action.get("old_memory")})
+            elif event == "DELETE":
+                memory_id = temp_ids[action["id"]]
+                memory._delete_memory(memory_id=memory_id)
+                events.append({"id": memory_id, "memory": text, "event": event})
+        except Exception as e:
+            logger.error(f"Error applying batched memory action {action}: {e}")
+    return events
+
+def _ingest_routed(memory, texts, filters, metadata=None):
+    from prefilter import RAW, SKIP, plan_saves
+
+    plans = plan_saves(memory, texts, filters)
+    items = [None] * len(texts)
+    events = []
+    raw = [index for index, plan in enumerate(plans) if plan["mode"] == RAW]
+    if raw:
+        raw_events = store_verbatim(
+            memory, [texts[index] for index in raw], filters,
+            vectors=[plans[index]["vector"] for index in raw], metadata=metadata,
+        )
+        events.extend(raw_events)
+        for index, event in zip(raw, raw_events):
+            items[index] = {"status": "saved", "id": event["id"]}
+    inferred = [index for index, plan in enumerate(plans) if plan["mode"] not in (RAW, SKIP)]
+    if inferred:
+        events.extend(extract_and_store(memory, [texts[index] for index in inferred], filters, metadata))
+        for index in inferred:
+            items[index] = {"status": "processed"}
+    for index, plan in enumerate(plans):
+        if plan["mode"] == SKIP:
+            items[index] = {"status": "duplicate", "id": plan["similar_id"]}
+        items[index].update({"mode": plan["mode"], "reason": plan["reason"]})
+    return {"items": items, "events": events}
+
+def ingest_batch(memory, texts, filters, infer=True, mode=None, metadata=None):
+    """Ingest a group of texts and report a result for every item.
+
+    Args:
+        memory: The Mem0 client
+        texts: The texts to save
+        filters: The user_id / agent_id / run_id the memories belong to
+        infer: Run LLM fact extraction (True) or store the texts verbatim (False)
+        mode: "infer", "raw" or "auto"; overrides infer. "auto" decides per text with
+            prefilter.plan_saves whether extraction is needed
+        metadata: Extra payload fields stored with every memory, e.g. expires_at
+
+    Returns:
+        dict: {"items": per-item results in input order, "events": the memory events}
+    """
+    if mode is not None:
+        if mode == "auto":
+            return _ingest_routed(memory, texts, filters, metadata)
+        infer = mode != "raw"
+    if not infer:
+        events = store_verbatim(memory, texts, filters, metadata=metadata)
+        items = [{"status": "saved", "id": event["id"]} for event in events]
+        return {"items": items, "events": events}
+    events = extract_and_store(memory, texts, filters, metadata)
+    # Facts extracted from a shared prompt cannot be attributed to a single input text
+    return {"items": [{"status": "processed"} for _ in texts], "events": events}
+
+class SaveBatcher:
+    """Groups single saves that arrive within a short window into one batched ingest."""
+
+    def __init__(self, dispatcher, memory, window=0.05, max_batch_size=20):
+        """
+        Args:
+            dispatcher: The Mem0Dispatcher that runs the batched ingest
+            memory: The Mem0 client
+            window: Seconds to wait for more saves after the first one arrives
+            max_batch_size: Flush as soon as this many saves are waiting
+        """
+        self.dispatcher = dispatcher
+        self.memory = memory
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending = {}
+        self._timers = {}
+        self._flushes = set()
+
+    async def submit(self, text, filters):
+        """Queue a text for the next batch of its scope and wait for the batch result."""
+        future = asyncio.get_running_loop().create_future()
+        key = scope_key(filters)
+        batch = self._pending.setdefault(key, [])
+        batch.append((text, future))
+        if len(batch) >= self.max_batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.get_running_loop().call_later(self.window, self._flush, key)
+        return await future
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, [])
+        if batch:
+            task = asyncio.create_task(self._run(dict(key), batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _run(self, filters, batch):
+        texts = [text for text, _ in batch]
+        try:
+            result = await self.dispatcher.run("add", ingest_batch, self.memory, texts, filters)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for _, future in batch:
+            if not future.done():
+                future.set_result({"results": result["events"]})
+
+    async def close(self):
+        """Flush every waiting save and wait for the batches in flight."""
+        for key in list(self._pending):
+            self._flush(key)
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+def get_save_batch_size():
+    """Number of texts sent through one shared extraction prompt (SAVE_BATCH_SIZE)."""
+    return env_int("SAVE_BATCH_SIZE", 20)
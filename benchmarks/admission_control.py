@@ -0,0 +1,131 @@
+"""
+Measure search latency while one client floods the server with saves, with and without admission control.
+
+Usage:
+    python benchmarks/admission_control.py --flood-concurrency 32 --searchers 4 --seconds 10
+    python benchmarks/admission_control.py --llm-latency-ms 500 --save-rate-limit 60 --output admission.json
+
+Starts fake_server.py over SSE. One session, the flooder, keeps
+--flood-concurrency save_memory calls in flight (LLM extraction with
+--llm-latency-ms per call); --searchers other sessions each run
+search_memories in a loop. Rejected saves are retried after their
+retry_after_ms hint (at most a second). Scenarios:
+
+    off           ADMISSION_ENABLED=false: every call waits for the dispatcher
+    concurrency   per-client and global concurrency limits with the priority queue
+    rate_limited  the same plus RATE_LIMIT_SAVE_MEMORY for the flooder
+
+Prints search p50/p95/p99 latency, and saves completed and rejected, per
+scenario as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server_load import git_commit, memory_text, sse_sessions, summarize, tool_failed
+
+def scenario_env(args, scenario):
+    env = {"ADMISSION_ENABLED": "false" if scenario == "off" else "true", "SAVE_BATCH_WINDOW_MS": "0"}
+    if scenario != "off":
+        env.update({
+            "ADMISSION_MAX_CONCURRENT": str(args.max_concurrent),
+            "ADMISSION_CLIENT_MAX_CONCURRENT": str(args.client_max_concurrent),
+            "ADMISSION_QUEUE_TIMEOUT_MS": str(args.queue_timeout_ms),
+        })
+    if scenario == "rate_limited":
+        env["RATE_LIMIT_SAVE_MEMORY"] = str(args.save_rate_limit)
+    return env
+
+async def run_scenario(args, scenario):
+    saved = dict(os.environ)
+    os.environ.update(scenario_env(args, scenario))
+    try:
+        async with sse_sessions(args, args.searchers + 1) as (sessions, _):
+            flooder, searchers = sessions[0], sessions[1:]
+            await flooder.call_tool("save_memories", {
+                "texts": [memory_text(index) for index in range(args.dataset)], "infer": False, "user_id": "bench",
+            })
+            deadline = time.monotonic() + args.seconds
+            counts = {"saved": 0, "rejected": 0}
+            latencies, errors = [], 0
+
+            async def flood(worker):
+                index = args.dataset + worker
+                while time.monotonic() < deadline:
+                    result = await flooder.call_tool("save_memory", {"text": memory_text(index), "user_id": "flood"})
+                    index += args.flood_concurrency
+                    if not tool_failed(result):
+                        counts["saved"] += 1
+                        continue
+                    counts["rejected"] += 1
+                    # Back off for the retry hint, as far as the rejection carries one
+                    _, _, error = result.content[0].text.partition(": ")
+                    try:
+                        retry_after = json.loads(error).get("retry_after_ms", 1)
+                    except ValueError:
+                        retry_after = 1
+                    await asyncio.sleep(min(retry_after, 1000) / 1000)
+
+            async def search(session, worker):
+                nonlocal errors
+                index = worker
+                while time.monotonic() < deadline:
+                    started = time.perf_counter()
+                    result = await session.call_tool("search_memories", {"query": memory_text(index), "limit": 5,
+                                                                         "user_id": "bench"})
+                    if tool_failed(result):
+                        errors += 1
+                    else:
+                        latencies.append(time.perf_counter() - started)
+                    index += len(searchers)
+
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(flood(worker) for worker in range(args.flood_concurrency)),
+                *(search(session, worker) for worker, session in enumerate(searchers)),
+            )
+            elapsed = time.perf_counter() - started
+            return {"search": summarize(latencies, errors, elapsed), "saves": counts}
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="off,concurrency,rate_limited", type=lambda value: value.split(","))
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--dataset", type=int, default=200)
+    parser.add_argument("--flood-concurrency", type=int, default=32)
+    parser.add_argument("--searchers", type=int, default=4)
+    parser.add_argument("--max-concurrent", type=int, default=64)
+    parser.add_argument("--client-max-concurrent", type=int, default=4)
+    parser.add_argument("--queue-timeout-ms", type=int, default=2000)
+    parser.add_argument("--save-rate-limit", type=float, default=120, help="save_memory calls per minute per client")
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--embed-latency-ms", type=float, default=5)
+    parser.add_argument("--store-latency-ms", type=float, default=1)
+    parser.add_argument("--vector-store", choices=["memory", "local"], default="memory")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    result = {
+        "commit": git_commit(),
+        "seconds": args.seconds,
+        "flood_concurrency": args.flood_concurrency,
+        "searchers": args.searchers,
+        "latency_ms": {"llm": args.llm_latency_ms, "embed": args.embed_latency_ms, "store": args.store_latency_ms},
+        "scenarios": {scenario: asyncio.run(run_scenario(args, scenario)) for scenario in args.scenarios},
+    }
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    main()
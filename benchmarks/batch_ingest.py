@@ -0,0 +1,88 @@
+"""
+Compare per-item Memory.add against batched ingestion on a synthetic import.
+
+Usage:
+    python benchmarks/batch_ingest.py --items 1000 --llm-latency 0.5 --embed-latency 0.05
+
+The per-item baseline runs once sequentially and once with --concurrency
+threads, the same concurrency the batched run gets, so the speedup reflects
+batching rather than parallelism. Prints one JSON object with the wall time and
+throughput of each approach and how many LLM and embedding round-trips each
+one made.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import build_fake_memory
+from batching import ingest_batch
+
+def run_loop(memory, texts, user_id):
+    for text in texts:
+        memory.add([{"role": "user", "content": text}], user_id=user_id)
+
+def run_concurrent_loop(memory, texts, user_id, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda text: memory.add([{"role": "user", "content": text}], user_id=user_id), texts))
+
+def run_batched(memory, texts, user_id, batch_size, concurrency):
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda batch: ingest_batch(memory, batch, {"user_id": user_id}), batches))
+
+def measure(name, run, memory, texts):
+    start = time.perf_counter()
+    run(memory, texts)
+    elapsed = time.perf_counter() - start
+    return {
+        "name": name,
+        "items": len(texts),
+        "seconds": round(elapsed, 3),
+        "items_per_second": round(len(texts) / elapsed, 2),
+        "llm_calls": memory.llm.calls,
+        "embedding_calls": memory.embedding_model.calls,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--loop-items", type=int, default=None,
+                        help="Items to time for the per-item baselines (extrapolated to --items); defaults to --items")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--store-latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    texts = [f"Imported note {i}: project item {i % 37} owned by team {i % 11}" for i in range(args.items)]
+    latencies = dict(llm_latency=args.llm_latency, embed_latency=args.embed_latency, store_latency=args.store_latency)
+
+    loop_texts = texts[:args.loop_items] if args.loop_items else texts
+    loop = measure("loop_add", lambda m, t: run_loop(m, t, "bench"), build_fake_memory(**latencies), loop_texts)
+    concurrent_loop = measure(
+        "concurrent_add",
+        lambda m, t: run_concurrent_loop(m, t, "bench", args.concurrency),
+        build_fake_memory(**latencies),
+        loop_texts,
+    )
+    batched = measure(
+        "batched",
+        lambda m, t: run_batched(m, t, "bench", args.batch_size, args.concurrency),
+        build_fake_memory(**latencies),
+        texts,
+    )
+    print(json.dumps({
+        "concurrency": args.concurrency,
+        "results": [loop, concurrent_loop, batched],
+        "speedup": round(batched["items_per_second"] / concurrent_loop["items_per_second"], 2),
+        "speedup_vs_sequential": round(batched["items_per_second"] / loop["items_per_second"], 2),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
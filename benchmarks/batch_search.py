@@ -0,0 +1,97 @@
+"""
+Measure how long an agent takes to load its context with several related searches.
+
+Usage:
+    python benchmarks/batch_search.py --queries 8 --rounds 50
+    python benchmarks/batch_search.py --embed-latency-ms 150 --vector-store local --output batch.json
+
+Starts fake_server.py over SSE with --dataset memories and, per round, runs
+--queries searches three ways:
+
+    sequential  one search_memories call after another, as agents usually do
+    concurrent  the same calls issued at once
+    batch       a single search_memories_batch call
+
+Every round uses new queries, so the search cache does not answer them; the
+fake embedder takes --embed-latency-ms per request, like a provider round
+trip. Prints the p50/p95/p99 time to get all results per scenario as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server_load import git_commit, memory_text, sse_sessions, summarize, tool_failed
+
+async def load_context(session, scenario, queries, limit):
+    """Run one round of searches; returns whether any of them failed."""
+    if scenario == "batch":
+        result = await session.call_tool("search_memories_batch", {"queries": queries, "limit": limit,
+                                                                   "user_id": "bench"})
+        return tool_failed(result)
+    calls = [
+        session.call_tool("search_memories", {"query": query, "limit": limit, "user_id": "bench"})
+        for query in queries
+    ]
+    if scenario == "concurrent":
+        results = await asyncio.gather(*calls)
+    else:
+        results = [await call for call in calls]
+    return any(tool_failed(result) for result in results)
+
+async def run(args):
+    results = {}
+    async with sse_sessions(args, 1) as (sessions, _):
+        session = sessions[0]
+        await session.call_tool("save_memories", {
+            "texts": [memory_text(index) for index in range(args.dataset)], "infer": False, "user_id": "bench",
+        })
+        offset = args.dataset
+        for scenario in args.scenarios:
+            latencies, errors = [], 0
+            started = time.perf_counter()
+            for _ in range(args.rounds):
+                queries = [memory_text(offset + index) for index in range(args.queries)]
+                offset += args.queries
+                round_started = time.perf_counter()
+                if await load_context(session, scenario, queries, args.limit):
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - round_started)
+            results[scenario] = summarize(latencies, errors, time.perf_counter() - started)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="sequential,concurrent,batch", type=lambda value: value.split(","))
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--dataset", type=int, default=500)
+    parser.add_argument("--embed-latency-ms", type=float, default=50)
+    parser.add_argument("--store-latency-ms", type=float, default=2)
+    parser.add_argument("--llm-latency-ms", type=float, default=0)
+    parser.add_argument("--vector-store", choices=["memory", "local"], default="memory")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    result = {
+        "commit": git_commit(),
+        "queries": args.queries,
+        "rounds": args.rounds,
+        "dataset": args.dataset,
+        "latency_ms": {"embed": args.embed_latency_ms, "store": args.store_latency_ms},
+        "scenarios": asyncio.run(run(args)),
+    }
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    main()
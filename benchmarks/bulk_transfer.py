@@ -0,0 +1,93 @@
+"""
+Measure bulk export and import throughput with and without vector reuse.
+
+Usage:
+    python benchmarks/bulk_transfer.py --rows 100000 --dims 1536
+    python benchmarks/bulk_transfer.py --embed-latency-ms 300 --output transfer.json
+
+Fills a local vector store with synthetic memories, exports it with
+transfer.py as NDJSON (plain and gzip) and imports each file into an empty
+store twice: once reusing the exported vectors, and once with --reembed
+against a fake embedder that takes --embed-latency-ms per batch request, like
+a provider round trip. Prints records per second and file sizes as JSON. The
+pgvector COPY path needs a database and is not covered here.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from fakes import FakeEmbedder
+from local_store import LocalVectorStore
+from server_load import git_commit
+from transfer import export_memories, import_memories, read_export
+
+def fill(store, rows, dims, seed):
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, 5000):
+        count = min(5000, rows - start)
+        payloads = [
+            {"data": f"synthetic memory {index} about topic {index % 97}", "user_id": f"user{index % 10}",
+             "created_at": "2026-01-01T00:00:00+00:00", "hash": f"{index:032x}"}
+            for index in range(start, start + count)
+        ]
+        store.insert(rng.normal(size=(count, dims)).astype(np.float32), payloads,
+                     [f"m{index}" for index in range(start, start + count)])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dims", type=int, default=1536)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--embed-latency-ms", type=float, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    embedder = FakeEmbedder(dims=args.dims, latency=args.embed_latency_ms / 1000)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="mem0-bench-transfer-") as path:
+        options = {"path": path}
+        source = LocalVectorStore("source", args.dims, **options)
+        fill(source, args.rows, args.dims, args.seed)
+        memory = types.SimpleNamespace(vector_store=source, embedding_model=embedder)
+        for name in ("export.ndjson", "export.ndjson.gz"):
+            file_path = os.path.join(path, name)
+            report = export_memories(memory, file_path, chunk_size=args.chunk_size)
+            results[f"export {name}"] = {
+                "records_per_second": report["records_per_second"],
+                "bytes": os.path.getsize(file_path),
+            }
+            for reembed in (False, True):
+                target = LocalVectorStore(f"target{len(results)}{int(reembed)}", args.dims, **options)
+                header, chunks = read_export(file_path, chunk_size=args.chunk_size)
+                report = import_memories(types.SimpleNamespace(vector_store=target, embedding_model=embedder),
+                                         chunks, header, reembed=reembed)
+                results[f"import {name}{' --reembed' if reembed else ''}"] = {
+                    "records_per_second": report["records_per_second"],
+                    "reembedded": report["reembedded"],
+                }
+                target.close()
+        source.close()
+
+    output = json.dumps({
+        "commit": git_commit(),
+        "rows": args.rows,
+        "dims": args.dims,
+        "chunk_size": args.chunk_size,
+        "embed_latency_ms": args.embed_latency_ms,
+        "results": results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Run the MCP server with the deterministic fakes from fakes.py instead of a real
+LLM, embedder and vector store.
+
+Started by server_load.py; it can also be run by hand to poke at the server
+without API keys:
+
+    TRANSPORT=sse PORT=8050 python benchmarks/fake_server.py
+
+BENCH_LLM_LATENCY_MS, BENCH_EMBED_LATENCY_MS and BENCH_STORE_LATENCY_MS add a
+fixed delay to every fake provider call, and BENCH_STARTUP_LATENCY_MS to
+building the client, like a slow database connection. BENCH_VECTOR_STORE=local
+keeps the fake LLM and embedder but stores vectors in the embedded local
+vector store.
+
+With TRANSPORT=streamable-http and HTTP_WORKERS > 1 every worker process
+builds its own fake store, so BENCH_SEED_MEMORIES stores the same memories in
+each of them on startup.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import build_fake_memory
+
+def build_memory(embedding_cache=None):
+    time.sleep(float(os.getenv("BENCH_STARTUP_LATENCY_MS", "0")) / 1000)
+    memory = build_fake_memory(
+        llm_latency=float(os.getenv("BENCH_LLM_LATENCY_MS", "0")) / 1000,
+        embed_latency=float(os.getenv("BENCH_EMBED_LATENCY_MS", "0")) / 1000,
+        store_latency=float(os.getenv("BENCH_STORE_LATENCY_MS", "0")) / 1000,
+    )
+    if os.getenv("BENCH_VECTOR_STORE") == "local":
+        from local_store import LocalVectorStore
+
+        memory.vector_store = LocalVectorStore(
+            "bench", memory.embedding_model.dims, path=tempfile.mkdtemp(prefix="mem0-bench-local-")
+        )
+    seed = int(os.getenv("BENCH_SEED_MEMORIES", "0"))
+    if seed:
+        from batching import store_verbatim
+        from server_load import memory_text
+
+        for start in range(0, seed, 100):
+            texts = [memory_text(index) for index in range(start, min(seed, start + 100))]
+            store_verbatim(memory, texts, {"user_id": "bench"})
+    return memory
+
+def http_app():
+    """App factory for the streamable-HTTP worker processes."""
+    import main as server
+
+    server.get_mem0_client = build_memory
+    return server.http_app()
+
+def main():
+    os.environ.setdefault("SAVE_QUEUE_PATH", os.path.join(tempfile.mkdtemp(prefix="mem0-bench-queue-"), "queue.db"))
+    import main as server
+
+    server.get_mem0_client = build_memory
+    if os.getenv("TRANSPORT") == "streamable-http" and server.get_http_workers() > 1:
+        server.run_http_workers("fake_server:http_app")
+    else:
+        asyncio.run(server.main())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Deterministic local stand-ins for the LLM, the embedder and the vector store.
+
+They let the benchmarks drive the real ingestion and search code paths without
+network access or API cost. Each call sleeps for a configurable latency so the
+numbers reflect round-trip counts the way a real provider would; the LLM and
+the embedder can also be made slow or failing on a share of their calls.
+"""
+import ast
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+from pydantic import BaseModel
+
+# Keep Mem0 from phoning home during benchmarks; must happen before mem0 is imported
+os.environ.setdefault("MEM0_TELEMETRY", "False")
+
+class OutputData(BaseModel):
+    id: str | None
+    score: float | None
+    payload: dict | None
+
+class FakeProviderError(RuntimeError):
+    """An injected provider failure."""
+
+class _RoundTrip:
+    """A provider round trip: a fixed latency, an occasional slow call and an occasional failure."""
+
+    def __init__(self, latency=0.0, slow_rate=0.0, slow_latency=0.0, fail_rate=0.0, seed=None):
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        with self._lock:
+            self.calls += 1
+            slow = self._random.random() < self.slow_rate
+            fail = self._random.random() < self.fail_rate
+        delay = self.slow_latency if slow else self.latency
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise FakeProviderError("injected provider failure")
+
+class FakeEmbedder(_RoundTrip):
+    """Hashes words into a fixed number of buckets, so texts sharing words get similar vectors."""
+
+    def __init__(self, dims=64, latency=0.0, model="fake-embedding", **round_trip):
+        super().__init__(latency, **round_trip)
+        self.dims = dims
+        self.config = type("Config", (), {"model": model, "embedding_dims": dims})()
+
+    def _vector(self, text):
+        vector = [0.0] * self.dims
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(word.encode()).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dims] += 1.0 if digest[4] % 2 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed(self, text, memory_action=None):
+        self._round_trip()
+        return self._vector(text)
+
+    def embed_batch(self, texts, memory_action=None):
+        self._round_trip()
+        return [self._vector(text) for text in texts]
+
+class FakeLLM(_RoundTrip):
+    """Answers Mem0's extraction prompt with one fact per input line and its update prompt with ADDs."""
+
+    def generate_response(self, messages, response_format=None, **kwargs):
+        self._round_trip()
+        if messages[0]["role"] == "system":
+            conversation = messages[-1]["content"].split("Input:\n", 1)[-1]
+            facts = [line[len("user: "):] for line in conversation.splitlines() if line.startswith("user: ")]
+            return json.dumps({"facts": facts})
+        blocks = re.findall(r"```\s*(.*?)\s*```", messages[-1]["content"], re.S)
+        facts = ast.literal_eval(blocks[1]) if len(blocks) > 1 else []
+        return json.dumps({"memory": [{"id": str(i), "text": fact, "event": "ADD"} for i, fact in enumerate(facts)]})
+
+class InMemoryVectorStore:
+    """Brute-force cosine search over a dict, with the Mem0 vector store interface."""
+
+    # search() reports cosine distance, like Mem0's pgvector stores
+    score_is_distance = True
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.records = {}
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    @staticmethod
+    def _matches(payload, filters):
+        return all(payload.get(key) == value for key, value in (filters or {}).items())
+
+    def create_col(self, name=None, vector_size=None, distance=None):
+        pass
+
+    def insert(self, vectors, payloads=None, ids=None):
+        self._round_trip()
+        ids = ids or [str(uuid.uuid4()) for _ in vectors]
+        payloads = payloads or [{} for _ in vectors]
+        with self._lock:
+            for memory_id, vector, payload in zip(ids, vectors, payloads):
+                self.records[memory_id] = (list(vector), dict(payload))
+
+    def search(self, query, vectors, limit=5, filters=None):
+        self._round_trip()
+        with self._lock:
+            candidates = [(memory_id, vector, payload) for memory_id, (vector, payload) in self.records.items()
+                          if self._matches(payload, filters)]
+        scored = sorted(
+            ((1.0 - sum(a * b for a, b in zip(vectors, vector)), memory_id, payload)
+             for memory_id, vector, payload in candidates),
+            key=lambda item: item[0],
+        )
+        return [OutputData(id=memory_id, score=score, payload=payload) for score, memory_id, payload in scored[:limit]]
+
+    def delete(self, vector_id):
+        with self._lock:
+            self.records.pop(vector_id, None)
+
+    def update(self, vector_id, vector=None, payload=None):
+        with self._lock:
+            old_vector, old_payload = self.records.get(vector_id, (None, {}))
+            self.records[vector_id] = (vector or old_vector, payload if payload is not None else old_payload)
+
+    def get(self, vector_id):
+        record = self.records.get(vector_id)
+        return OutputData(id=vector_id, score=None, payload=record[1]) if record else None
+
+    def list_cols(self):
+        return []
+
+    def delete_col(self):
+        self.records.clear()
+
+    def col_info(self):
+        return {"count": len(self.records)}
+
+    def list(self, filters=None, limit=100):
+        with self._lock:
+            rows = [OutputData(id=memory_id, score=None, payload=payload)
+                    for memory_id, (_, payload) in self.records.items() if self._matches(payload, filters)]
+        return [rows[:limit]]
+
+def build_fake_memory(llm_latency=0.0, embed_latency=0.0, store_latency=0.0, dims=64):
+    """Build a real mem0 Memory whose LLM, embedder and vector store are the fakes above."""
+    os.environ.setdefault("OPENAI_API_KEY", "fake-key")
+    from mem0 import Memory
+
+    workdir = tempfile.mkdtemp(prefix="mem0-bench-")
+    memory = Memory.from_config({
+        "vector_store": {"provider": "qdrant", "config": {"path": workdir, "embedding_model_dims": dims}},
+        "history_db_path": os.path.join(workdir, "history.db"),
+    })
+    memory.llm = FakeLLM(latency=llm_latency)
+    memory.embedding_model = FakeEmbedder(dims=dims, latency=embed_latency)
+    memory.vector_store = InMemoryVectorStore(latency=store_latency)
+    return memory
@@ -0,0 +1,153 @@
+"""
+Measure streamable-HTTP throughput as the number of worker processes grows.
+
+Usage:
+    python benchmarks/http_scaling.py --workers 1,2,4 --concurrency 32 --requests 2000
+    python benchmarks/http_scaling.py --tools search_memories --output scaling.json
+
+For each --workers count, starts fake_server.py with TRANSPORT=streamable-http
+and HTTP_WORKERS set, seeds --dataset memories into every worker's fake store,
+and sends --requests stateless tools/call POSTs per tool from --concurrency
+concurrent clients. The workers share caches through a SHARED_BACKEND=local
+state file. Prints throughput and p50/p95/p99 latency per worker count, and
+the throughput relative to the first count. Scaling needs free cores: the
+speedup stops at the number of CPUs of the machine (reported as "cpus").
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from server_load import SERVER, TOPICS, free_port, git_commit, memory_text, summarize
+
+def start_server(args, workers, port, state_dir):
+    env = dict(os.environ)
+    env.update({
+        "TRANSPORT": "streamable-http",
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "HTTP_WORKERS": str(workers),
+        "SHARED_BACKEND": "local",
+        "SHARED_STATE_PATH": os.path.join(state_dir, "shared.db"),
+        "SAVE_QUEUE_PATH": os.path.join(state_dir, "queue.db"),
+        "LIFECYCLE_PATH": os.path.join(state_dir, "lifecycle.db"),
+        "BENCH_SEED_MEMORIES": str(args.dataset),
+        "BENCH_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "BENCH_EMBED_LATENCY_MS": str(args.embed_latency_ms),
+        "BENCH_STORE_LATENCY_MS": str(args.store_latency_ms),
+        "METRICS_PORT": "0",
+    })
+    return subprocess.Popen([sys.executable, SERVER], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+async def wait_ready(client, url, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    body = {"jsonrpc": "2.0", "id": 0, "method": "tools/list"}
+    while True:
+        try:
+            if (await client.post(url, json=body)).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("The streamable-HTTP server did not start")
+        await asyncio.sleep(0.2)
+
+async def drive(client, url, tool, make_arguments, requests, concurrency):
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+
+    async def caller():
+        nonlocal errors
+        for index in counter:
+            body = {"jsonrpc": "2.0", "id": index, "method": "tools/call",
+                    "params": {"name": tool, "arguments": make_arguments(index)}}
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json=body)
+                result = response.json().get("result") or {}
+                text = result.get("content", [{}])[0].get("text", "")
+                failed = response.status_code != 200 or result.get("isError") or text.startswith("Error")
+            except Exception:
+                failed = True
+            if failed:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+async def run_workers(args, workers):
+    port = free_port()
+    with tempfile.TemporaryDirectory(prefix="mem0-bench-http-") as state_dir:
+        process = start_server(args, workers, port, state_dir)
+        url = f"http://127.0.0.1:{port}/mcp"
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        try:
+            async with httpx.AsyncClient(timeout=60, limits=limits, headers={"Accept": "application/json, text/event-stream"}) as client:
+                await wait_ready(client, url, process)
+                tools = {
+                    "save_memory": lambda index: {"text": memory_text(args.dataset + index), "mode": "raw", "user_id": "bench"},
+                    "search_memories": lambda index: {
+                        "query": f"{TOPICS[index % len(TOPICS)]} follow up item {index % 97}", "limit": 5, "user_id": "bench",
+                    },
+                    "get_all_memories": lambda index: {"limit": args.page_size, "user_id": "bench"},
+                }
+                results = {}
+                for tool in args.tools:
+                    results[tool] = await drive(client, url, tool, tools[tool], args.requests, args.concurrency)
+                return {"workers": workers, "tools": results}
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=20)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+async def run(args):
+    runs = [await run_workers(args, workers) for workers in args.workers]
+    baseline = runs[0]["tools"]
+    for run_result in runs:
+        for tool, stats in run_result["tools"].items():
+            if stats.get("throughput_per_s") and baseline[tool].get("throughput_per_s"):
+                stats["speedup"] = round(stats["throughput_per_s"] / baseline[tool]["throughput_per_s"], 2)
+    return {
+        "commit": git_commit(),
+        "cpus": os.cpu_count(),
+        "dataset": args.dataset,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "latency_ms": {"llm": args.llm_latency_ms, "embed": args.embed_latency_ms, "store": args.store_latency_ms},
+        "runs": runs,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", type=lambda value: [int(part) for part in value.split(",")])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--dataset", type=int, default=1000, help="memories seeded into every worker")
+    parser.add_argument("--requests", type=int, default=1000, help="calls per tool per worker count")
+    parser.add_argument("--tools", default="search_memories,save_memory,get_all_memories", type=lambda value: value.split(","))
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=0)
+    parser.add_argument("--embed-latency-ms", type=float, default=0)
+    parser.add_argument("--store-latency-ms", type=float, default=0)
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    output = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    main()
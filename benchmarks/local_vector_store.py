@@ -0,0 +1,129 @@
+"""
+Compare the embedded local vector store against the pgvector path.
+
+Usage:
+    python benchmarks/local_vector_store.py --rows 50000 --dims 384
+    DATABASE_URL=postgresql://... python benchmarks/local_vector_store.py --rows 50000 --dims 384
+
+Loads the same random vectors (spread over --tenants users) into the local
+store, which scans them exactly, and, when DATABASE_URL is set, into a scratch
+pgvector collection with the HNSW index Mem0 creates. For each backend it reports load time, time to reopen
+the store, p50/p95 search latency with and without a user filter, and recall@k
+against exact search. Prints one JSON object.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Mem0 reads this when local_store imports it
+os.environ.setdefault("MEM0_TELEMETRY", "False")
+
+import numpy as np
+
+from local_store import LocalVectorStore
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000, 3),
+    }
+
+def measure(search, queries, tenants, truth, k):
+    unfiltered, filtered, hits = [], [], 0
+    for index, query in enumerate(queries):
+        started = time.perf_counter()
+        ids = search(query, k, None)
+        unfiltered.append(time.perf_counter() - started)
+        hits += len(truth[index].intersection(ids))
+        started = time.perf_counter()
+        search(query, k, f"user-{index % tenants}")
+        filtered.append(time.perf_counter() - started)
+    return {
+        "search": percentiles(unfiltered),
+        "filtered_search": percentiles(filtered),
+        f"recall_at_{k}": round(hits / (len(queries) * k), 4),
+    }
+
+def bench_local(name, vectors, payloads, ids, queries, truth, args):
+    directory = tempfile.mkdtemp(prefix="mem0-local-bench-")
+    try:
+        started = time.perf_counter()
+        store = LocalVectorStore("bench", args.dims, path=directory)
+        for start in range(0, len(vectors), 1000):
+            store.insert(vectors[start:start + 1000], payloads[start:start + 1000], ids[start:start + 1000])
+        load = time.perf_counter() - started
+        store.close()
+        started = time.perf_counter()
+        store = LocalVectorStore("bench", args.dims, path=directory)
+        reopen = time.perf_counter() - started
+
+        def search(query, k, user_id):
+            filters = {"user_id": user_id} if user_id else None
+            return [hit.id for hit in store.search("", query, limit=k, filters=filters)]
+
+        result = {"backend": name, "load_seconds": round(load, 3), "reopen_seconds": round(reopen, 3)}
+        result.update(measure(search, queries, args.tenants, truth, args.k))
+        store.close()
+        return result
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def bench_pgvector(database_url, vectors, payloads, ids, queries, truth, args):
+    import vecs
+
+    client = vecs.create_client(database_url)
+    name = "bench_local_comparison"
+    try:
+        started = time.perf_counter()
+        collection = client.get_or_create_collection(name=name, dimension=args.dims)
+        records = [(point_id, vector.tolist(), payload) for point_id, vector, payload in zip(ids, vectors, payloads)]
+        for start in range(0, len(records), 1000):
+            collection.upsert(records[start:start + 1000])
+        collection.create_index()
+        load = time.perf_counter() - started
+
+        def search(query, k, user_id):
+            filters = {"user_id": {"$eq": user_id}} if user_id else None
+            return [str(row) for row in collection.query(data=query.tolist(), limit=k, filters=filters)]
+
+        result = {"backend": "pgvector_hnsw", "load_seconds": round(load, 3)}
+        result.update(measure(search, queries, args.tenants, truth, args.k))
+        return result
+    finally:
+        client.delete_collection(name)
+        client.disconnect()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--tenants", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = rng.standard_normal((args.rows, args.dims)).astype(np.float32)
+    payloads = [{"user_id": f"user-{index % args.tenants}", "data": f"memory {index}"} for index in range(args.rows)]
+    ids = [str(index) for index in range(args.rows)]
+    queries = rng.standard_normal((args.queries, args.dims)).astype(np.float32)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    truth = [set(str(i) for i in np.argsort(-(normalized @ query))[:args.k]) for query in queries]
+
+    results = [bench_local("local_brute_force", vectors, payloads, ids, queries, truth, args)]
+    if args.database_url:
+        results.append(bench_pgvector(args.database_url, vectors, payloads, ids, queries, truth, args))
+    print(json.dumps({"rows": args.rows, "dims": args.dims, "tenants": args.tenants, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Measure embedding latency with provider failover, hedging and circuit breakers.
+
+Usage:
+    python benchmarks/provider_failover.py --requests 2000 --concurrency 8
+    python benchmarks/provider_failover.py --slow-rate 0.05 --slow-latency-ms 1000 --output failover.json
+
+Runs the failover wrapper from failover.py over fake embedders that serve the
+same model: every call takes --latency-ms, except for --slow-rate of them that
+take --slow-latency-ms. Scenarios:
+
+    single      one provider, no fallback
+    hedged      a backup provider that gets a hedged request once the primary is
+                slower than its p95
+    outage      the primary hangs on every call; the backup answers after a timeout
+                until the circuit breaker opens
+    no_breaker  the same outage with the circuit breaker disabled
+
+Prints p50/p95/p99/max latency, errors and hedge counts per scenario as JSON.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from failover import CircuitBreaker, FailoverEmbedder, FailoverGroup, Provider
+from fakes import FakeEmbedder
+from server_load import git_commit, summarize
+
+def build(args, scenario):
+    tail = {"slow_rate": args.slow_rate, "slow_latency": args.slow_latency_ms / 1000}
+    latency = args.latency_ms / 1000
+    threshold = 0 if scenario == "no_breaker" else args.failure_threshold
+    primary = FakeEmbedder(latency=latency, seed=1, **tail)
+    if scenario in ("outage", "no_breaker"):
+        primary = FakeEmbedder(latency=args.timeout_ms * 2 / 1000, seed=1)
+    providers = [Provider("primary", primary, CircuitBreaker(threshold, args.reset_seconds))]
+    if scenario != "single":
+        providers.append(Provider("backup", FakeEmbedder(latency=latency, seed=2, **tail), CircuitBreaker(threshold)))
+    group = FailoverGroup(
+        "embedding", providers, timeout=args.timeout_ms / 1000, hedge=scenario != "single",
+        min_hedge_delay=args.min_hedge_delay_ms / 1000, max_workers=args.concurrency * 4,
+    )
+    return FailoverEmbedder(group, primary.dims)
+
+def run_scenario(args, scenario):
+    embedder = build(args, scenario)
+    latencies, errors = [], 0
+
+    def call(index):
+        started = time.perf_counter()
+        try:
+            embedder.embed(f"query {index}", "search")
+        except Exception:
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for latency in pool.map(call, range(args.requests)):
+            if latency is None:
+                errors += 1
+            else:
+                latencies.append(latency)
+    result = summarize(latencies, errors, time.perf_counter() - started)
+    if latencies:
+        result["max_ms"] = round(max(latencies) * 1000, 3)
+    stats = embedder.group.stats()
+    result["hedges"] = stats["hedges"]
+    result["hedge_wins"] = stats["hedge_wins"]
+    result["providers"] = stats["providers"]
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="single,hedged,outage,no_breaker", type=lambda value: value.split(","))
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="share of calls that are slow")
+    parser.add_argument("--slow-latency-ms", type=float, default=500)
+    parser.add_argument("--timeout-ms", type=float, default=1000)
+    parser.add_argument("--min-hedge-delay-ms", type=float, default=10)
+    parser.add_argument("--failure-threshold", type=int, default=5)
+    parser.add_argument("--reset-seconds", type=float, default=30)
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    result = {
+        "commit": git_commit(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "latency_ms": args.latency_ms,
+        "slow_rate": args.slow_rate,
+        "slow_latency_ms": args.slow_latency_ms,
+        "timeout_ms": args.timeout_ms,
+        "scenarios": {scenario: run_scenario(args, scenario) for scenario in args.scenarios},
+    }
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Load-test the MCP server end to end over stdio and SSE.
+
+Usage:
+    python benchmarks/server_load.py --transport stdio,sse --concurrency 1,8 --dataset 1000
+    python benchmarks/server_load.py --output before.json
+    python benchmarks/server_load.py --compare before.json
+
+Starts fake_server.py (the real server with deterministic local stand-ins for
+the LLM, the embedder and the vector store) for each transport, seeds
+--dataset memories through save_memories, then drives save_memory,
+search_memories and get_all_memories with --requests calls each at every
+--concurrency level. Over stdio the calls share the one session concurrently;
+over SSE every concurrent caller has its own session, like separate agents.
+
+Prints one JSON object with p50/p95/p99 latency, throughput and error counts
+per tool, and the server's resident memory (current and peak) after seeding
+and after the load. --output also writes it to a file, and --compare adds the
+relative change of every latency and throughput figure against an earlier run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER = os.path.join(BENCH_DIR, "fake_server.py")
+
+TOPICS = ["python", "postgres", "deployment", "billing", "oncall", "frontend", "latency", "kubernetes"]
+WORDS = (
+    "alert api backup budget cache certificate client config cron dashboard database deadline debug "
+    "dependency disk dns docker email feature firewall gateway invoice kafka laptop license load logging "
+    "meeting metrics migration mobile monitor network password payment pipeline quota queue redis refund "
+    "release replica report retry review roadmap schema secret server storage support terraform ticket "
+    "timeout token upgrade vendor vpn webhook"
+).split()
+
+def memory_text(index):
+    # Deterministic but varied, so memories are not all near-duplicates of each other
+    topic = TOPICS[index % len(TOPICS)]
+    words = random.Random(index).sample(WORDS, 6)
+    return f"{topic} {' '.join(words[:3])} {index} {' '.join(words[3:])}"
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+def summarize(latencies, errors, elapsed):
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "throughput_per_s": round(len(latencies) / elapsed, 2),
+    }
+
+def read_rss(pid):
+    """Current and peak resident set size of a process in MiB (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            fields = dict(line.split(":", 1) for line in status if ":" in line)
+    except OSError:
+        return None
+    return {
+        "rss_mb": round(int(fields["VmRSS"].split()[0]) / 1024, 1),
+        "peak_rss_mb": round(int(fields["VmHWM"].split()[0]) / 1024, 1),
+    }
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def server_env(args, transport, port=None):
+    env = dict(os.environ)
+    env.update({
+        "TRANSPORT": transport,
+        "BENCH_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "BENCH_EMBED_LATENCY_MS": str(args.embed_latency_ms),
+        "BENCH_STORE_LATENCY_MS": str(args.store_latency_ms),
+        "BENCH_VECTOR_STORE": args.vector_store,
+        "METRICS_PORT": "0",
+    })
+    if port is not None:
+        env.update({"HOST": "127.0.0.1", "PORT": str(port)})
+    return env
+
+def find_server_pid():
+    """The stdio client starts the server itself; find it as our newest fake_server.py child."""
+    output = subprocess.run(["pgrep", "-n", "-P", str(os.getpid()), "-f", "fake_server.py"], capture_output=True, text=True)
+    return int(output.stdout.strip()) if output.stdout.strip() else None
+
+@asynccontextmanager
+async def stdio_sessions(args, count):
+    params = StdioServerParameters(command=sys.executable, args=[SERVER], env=server_env(args, "stdio"))
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            # Every caller shares the single stdio session
+            yield [session] * count, find_server_pid()
+
+@asynccontextmanager
+async def sse_sessions(args, count):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, SERVER], env=server_env(args, "sse", port), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/sse"
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=1):
+                    break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("The SSE server did not start")
+                await asyncio.sleep(0.1)
+        async with AsyncExitStack() as stack:
+            sessions = []
+            for _ in range(count):
+                read, write = await stack.enter_async_context(sse_client(url))
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                sessions.append(session)
+            yield sessions, process.pid
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            # uvicorn keeps waiting on SSE streams it considers open
+            process.kill()
+            process.wait()
+
+def tool_failed(result):
+    text = result.content[0].text if result.content else ""
+    return result.isError or text.startswith("Error")
+
+async def drive(sessions, tool, make_arguments, requests):
+    """Issue `requests` calls of one tool, one caller per session, and time each call."""
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+
+    async def caller(session):
+        nonlocal errors
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                result = await session.call_tool(tool, make_arguments(index))
+                failed = tool_failed(result)
+            except Exception:
+                failed = True
+            if failed:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller(session) for session in sessions))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+async def run_transport(args, transport, concurrency):
+    open_sessions = stdio_sessions if transport == "stdio" else sse_sessions
+    async with open_sessions(args, concurrency) as (sessions, pid):
+        seed_started = time.perf_counter()
+        for start in range(0, args.dataset, 100):
+            texts = [memory_text(index) for index in range(start, min(args.dataset, start + 100))]
+            await sessions[0].call_tool("save_memories", {"texts": texts, "infer": False, "user_id": "bench"})
+        seed_seconds = time.perf_counter() - seed_started
+        rss_after_seed = read_rss(pid) if pid else None
+
+        offset = args.dataset
+        tools = {
+            "save_memory": lambda index: {"text": memory_text(offset + index), "mode": args.save_mode, "user_id": "bench"},
+            "search_memories": lambda index: {
+                "query": f"{TOPICS[index % len(TOPICS)]} follow up item {index % 97}", "limit": 5, "user_id": "bench",
+            },
+            "get_all_memories": lambda index: {"limit": args.page_size, "user_id": "bench"},
+        }
+        results = {}
+        for tool in args.tools:
+            results[tool] = await drive(sessions, tool, tools[tool], args.requests)
+        return {
+            "transport": transport,
+            "concurrency": concurrency,
+            "seed_seconds": round(seed_seconds, 3),
+            "tools": results,
+            "memory_after_seed": rss_after_seed,
+            "memory_after_load": read_rss(pid) if pid else None,
+        }
+
+def compare(current, baseline):
+    """Relative change of each latency / throughput figure against a baseline run, keyed like the results."""
+    previous = {(run["transport"], run["concurrency"]): run for run in baseline["runs"]}
+    changes = []
+    for run in current["runs"]:
+        old = previous.get((run["transport"], run["concurrency"]))
+        if old is None:
+            continue
+        for tool, stats in run["tools"].items():
+            old_stats = old["tools"].get(tool, {})
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_per_s"):
+                if stats.get(metric) and old_stats.get(metric):
+                    changes.append({
+                        "transport": run["transport"],
+                        "concurrency": run["concurrency"],
+                        "tool": tool,
+                        "metric": metric,
+                        "baseline": old_stats[metric],
+                        "current": stats[metric],
+                        "change_pct": round((stats[metric] - old_stats[metric]) * 100 / old_stats[metric], 1),
+                    })
+    return changes
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=BENCH_DIR
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+async def run(args):
+    runs = []
+    for transport in args.transport:
+        for concurrency in args.concurrency:
+            runs.append(await run_transport(args, transport, concurrency))
+    return {
+        "commit": git_commit(),
+        "dataset": args.dataset,
+        "requests": args.requests,
+        "vector_store": args.vector_store,
+        "save_mode": args.save_mode,
+        "latency_ms": {"llm": args.llm_latency_ms, "embed": args.embed_latency_ms, "store": args.store_latency_ms},
+        "runs": runs,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", default="stdio,sse", type=lambda value: value.split(","))
+    parser.add_argument("--concurrency", default="1,8", type=lambda value: [int(part) for part in value.split(",")])
+    parser.add_argument("--dataset", type=int, default=1000, help="memories stored before the load starts")
+    parser.add_argument("--requests", type=int, default=200, help="calls per tool per run")
+    parser.add_argument("--tools", default="save_memory,search_memories,get_all_memories", type=lambda value: value.split(","))
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--save-mode", choices=["infer", "raw", "auto"], default="infer", help="save_memory mode")
+    parser.add_argument("--vector-store", choices=["memory", "local"], default="memory")
+    parser.add_argument("--llm-latency-ms", type=float, default=0)
+    parser.add_argument("--embed-latency-ms", type=float, default=0)
+    parser.add_argument("--store-latency-ms", type=float, default=0)
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument("--compare", help="JSON result of an earlier run to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        result["comparison"] = {"baseline_commit": baseline.get("commit"), "changes": compare(result, baseline)}
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Measure how long the server takes to become usable over stdio.
+
+Usage:
+    python benchmarks/startup_time.py --runs 5 --startup-latency-ms 2000
+    python benchmarks/startup_time.py --modes eager,background,lazy --output startup.json
+
+For every MEM0_CLIENT_INIT mode, launches fake_server.py over stdio (the way
+Claude Desktop does) --runs times and records, from process launch: when the
+initialize handshake completed, when tools/list answered and when the first
+search_memories call returned. --startup-latency-ms adds a delay to building
+the client, standing in for a slow database. Also reports the time to import
+main.py on its own. Prints medians per mode as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from server_load import BENCH_DIR, SERVER, git_commit
+
+def import_seconds(runs):
+    """Median wall time of a fresh interpreter importing main.py."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], cwd=os.path.dirname(BENCH_DIR), check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings), 3)
+
+async def launch_once(args, mode, state_dir):
+    env = dict(os.environ)
+    env.update({
+        "TRANSPORT": "stdio",
+        "MEM0_CLIENT_INIT": mode,
+        "BENCH_STARTUP_LATENCY_MS": str(args.startup_latency_ms),
+        "SAVE_QUEUE_PATH": os.path.join(state_dir, "queue.db"),
+        "LIFECYCLE_PATH": os.path.join(state_dir, "lifecycle.db"),
+        "METRICS_PORT": "0",
+    })
+    params = StdioServerParameters(command=sys.executable, args=[SERVER], env=env)
+    started = time.perf_counter()
+    marks = {}
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            marks["initialize_s"] = time.perf_counter() - started
+            await session.list_tools()
+            marks["list_tools_s"] = time.perf_counter() - started
+            result = await session.call_tool("search_memories", {"query": "startup", "user_id": "bench"})
+            if result.isError or result.content[0].text.startswith("Error"):
+                raise RuntimeError(f"search_memories failed: {result.content[0].text}")
+            marks["first_search_s"] = time.perf_counter() - started
+    return marks
+
+async def run(args):
+    modes = {}
+    for mode in args.modes:
+        samples = []
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory(prefix="mem0-bench-startup-") as state_dir:
+                samples.append(await launch_once(args, mode, state_dir))
+        modes[mode] = {key: round(statistics.median(sample[key] for sample in samples), 3) for key in samples[0]}
+    return {
+        "commit": git_commit(),
+        "runs": args.runs,
+        "startup_latency_ms": args.startup_latency_ms,
+        "import_main_s": import_seconds(args.runs),
+        "modes": modes,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="eager,background", type=lambda value: value.split(","))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--startup-latency-ms", type=float, default=1000, help="extra delay while building the client")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    output = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    main()
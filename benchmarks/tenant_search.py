@@ -0,0 +1,102 @@
+"""
+Measure scoped search latency on pgvector as the number of tenants grows.
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/tenant_search.py --tenants 10,100,1000,5000
+
+For every tenant count a scratch collection is filled with
+--memories-per-tenant random vectors per tenant and given the same HNSW index
+Mem0 creates. Searches filtered to one random tenant, built the way Mem0 builds
+them, are timed before and after ``ensure_scope_indexes`` adds the scope
+indexes. The collection is dropped afterwards. Prints one JSON object with the
+latency percentiles and the average number of results per search (which drops
+below --limit when the ANN index filters candidates after the fact).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import vecs
+
+from vector_indexes import ensure_scope_indexes
+
+def fill(collection, tenants, per_tenant, dims, rng):
+    records = []
+    for tenant in range(tenants):
+        vectors = rng.standard_normal((per_tenant, dims)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        for index, vector in enumerate(vectors):
+            records.append((f"{tenant}-{index}", vector.tolist(), {"user_id": f"tenant-{tenant}", "data": f"memory {index}"}))
+        if len(records) >= 5000:
+            collection.upsert(records)
+            records = []
+    if records:
+        collection.upsert(records)
+
+def measure(collection, tenants, dims, queries, limit, rng):
+    latencies, returned = [], []
+    for _ in range(queries):
+        vector = rng.standard_normal(dims).astype(np.float32)
+        tenant = f"tenant-{random.randrange(tenants)}"
+        start = time.perf_counter()
+        # Mem0's supabase store turns {"user_id": ...} into this filter
+        results = collection.query(
+            data=vector.tolist(), limit=limit, filters={"user_id": {"$eq": tenant}}, include_metadata=True
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        returned.append(len(results))
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "mean_results": round(sum(returned) / len(returned), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--tenants", default="10,100,1000")
+    parser.add_argument("--memories-per-tenant", type=int, default=50)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("Set DATABASE_URL or pass --database-url")
+
+    rng = np.random.default_rng(args.seed)
+    random.seed(args.seed)
+    client = vecs.create_client(args.database_url)
+    results = []
+    try:
+        for tenants in (int(value) for value in args.tenants.split(",")):
+            name = f"bench_tenants_{tenants}"
+            collection = client.get_or_create_collection(name=name, dimension=args.dims)
+            try:
+                fill(collection, tenants, args.memories_per_tenant, args.dims, rng)
+                collection.create_index()
+                before = measure(collection, tenants, args.dims, args.queries, args.limit, rng)
+                ensure_scope_indexes(collection)
+                after = measure(collection, tenants, args.dims, args.queries, args.limit, rng)
+            finally:
+                client.delete_collection(name)
+            results.append({
+                "tenants": tenants,
+                "rows": tenants * args.memories_per_tenant,
+                "without_scope_indexes": before,
+                "with_scope_indexes": after,
+            })
+    finally:
+        client.disconnect()
+    print(json.dumps({"limit": args.limit, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Compare recall, storage and search latency of the compact vector encodings.
+
+Usage:
+    python benchmarks/vector_encoding.py --rows 50000 --dims 1536 --queries 200
+    python benchmarks/vector_encoding.py --settings float16,int8,binary,int8/512,binary/512 --rescore 1,4,10
+
+Fills a local vector store with synthetic embeddings, then re-opens it with
+each --settings entry (encoding, or encoding/dims for Matryoshka truncation),
+which encodes every stored vector the way ``mem0-encode migrate`` does. For
+every rescore factor it reports recall@k against exact float32 search, the
+bytes of codes scanned per search and p50/p95 latency. "float32" is the exact
+scan over the float vectors.
+
+The synthetic vectors are clustered and carry more variance in their leading
+dimensions, like Matryoshka embeddings, but recall on real embeddings differs:
+measure a pgvector collection with ``python quantization.py evaluate``.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from local_store import LocalVectorStore
+from quantization import VectorCodec
+from server_load import git_commit
+
+def synthetic_embeddings(rows, dims, clusters, seed):
+    rng = np.random.default_rng(seed)
+    # Most of the variance sits in the leading dimensions
+    scale = 1.0 / np.sqrt(1.0 + np.arange(dims) / (dims / 8))
+    centers = rng.normal(size=(clusters, dims)) * scale
+    vectors = centers[rng.integers(clusters, size=rows)] + rng.normal(size=(rows, dims)) * scale * 0.6
+    return vectors.astype(np.float32)
+
+def parse_setting(value, dims):
+    encoding, _, truncated = value.partition("/")
+    return VectorCodec(encoding, int(truncated) if truncated else None, dims)
+
+def measure(store, queries, truth, k):
+    hits, latencies = 0, []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        results = store.search(None, query.tolist(), limit=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += len(expected.intersection(result.id for result in results))
+    latencies.sort()
+    return {
+        "recall": round(hits / (len(queries) * k), 4),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[max(0, int(len(latencies) * 0.95) - 1)], 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dims", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--settings", default="float32,float16,int8,binary,float16/512,int8/512,binary/512")
+    parser.add_argument("--rescore", default="1,4,10", help="Comma separated rescore factors")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.rows + args.queries, args.dims, args.clusters, args.seed)
+    data, queries = vectors[:args.rows], vectors[args.rows:]
+    ids = [f"m{index}" for index in range(args.rows)]
+    normalized = data / np.linalg.norm(data, axis=1, keepdims=True)
+    truth = []
+    for query in queries:
+        scores = normalized @ (query / np.linalg.norm(query))
+        truth.append({ids[index] for index in np.argsort(-scores)[:args.k]})
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="mem0-bench-encoding-") as path:
+        options = {"path": path}
+        store = LocalVectorStore("bench", args.dims, **options)
+        for start in range(0, args.rows, 5000):
+            store.insert(data[start:start + 5000], ids=ids[start:start + 5000])
+        store.close()
+
+        for setting in args.settings.split(","):
+            codec = parse_setting(setting, args.dims)
+            exact = codec.encoding == "float32" and codec.dims == args.dims
+            for factor in ([1] if exact else [int(value) for value in args.rescore.split(",")]):
+                started = time.perf_counter()
+                store = LocalVectorStore("bench", args.dims, codec=None if exact else codec, rescore=factor, **options)
+                opened = time.perf_counter() - started
+                bytes_per_vector = args.dims * 4 if exact else codec.bytes_per_vector
+                results.append({
+                    "setting": setting,
+                    "rescore": None if exact else factor,
+                    "bytes_per_vector": bytes_per_vector,
+                    "scanned_mb": round(args.rows * bytes_per_vector / 2**20, 2),
+                    "open_s": round(opened, 3),
+                    **measure(store, queries, truth, args.k),
+                })
+                store.close()
+
+    output = json.dumps({
+        "commit": git_commit(),
+        "rows": args.rows,
+        "dims": args.dims,
+        "queries": args.queries,
+        "k": args.k,
+        "results": results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Size budgets for tool responses.
+
+search_memories and get_all_memories can return far more text than an agent
+wants in its context window. With a character or token budget the results are
+packed greedily in rank order: every result that fits is kept whole, the one
+that overflows is shortened to the room left (a snippet around the query terms
+for searches, a plain cut otherwise), and the rest are counted as omitted.
+Results carry their id so the full text can be fetched with get_memories only
+when it is needed. Token counts are estimated from the character count, which
+is close enough for English text and needs no tokenizer.
+"""
+import json
+import math
+import re
+
+from hybrid_search import tokenize
+from utils import env_bool, env_int
+
+# Average characters per token of English text for the common BPE tokenizers
+CHARS_PER_TOKEN = 4
+# A result shortened below this many characters is omitted instead
+MIN_RESULT_CHARS = 40
+ELLIPSIS = "…"
+
+_TOKEN = re.compile(r"\w[\w.\-:/]*\w|\w")
+_SEPARATORS = (",", ":")
+
+def estimate_tokens(text):
+    """Estimated token count of text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def dumps(value):
+    """Compact JSON, the form budgets are measured in."""
+    return json.dumps(value, separators=_SEPARATORS, ensure_ascii=False)
+
+def get_budget_settings():
+    """Server-wide response budget defaults from the RESPONSE_* settings (0 means unbounded)."""
+    return {
+        "max_chars": env_int("RESPONSE_MAX_CHARS", 0),
+        "max_tokens": env_int("RESPONSE_MAX_TOKENS", 0),
+        "max_result_chars": env_int("RESPONSE_MAX_RESULT_CHARS", 0),
+        "snippets": env_bool("RESPONSE_SNIPPETS", False),
+    }
+
+def char_budget(max_chars=None, max_tokens=None):
+    """The tighter of a character and a token budget in characters, or None if neither is set."""
+    limits = []
+    if max_chars:
+        limits.append(max_chars)
+    if max_tokens:
+        limits.append(max_tokens * CHARS_PER_TOKEN)
+    return max(min(limits), 1) if limits else None
+
+def truncate(text, width):
+    """Cut text to at most width characters at a word boundary, marking the cut with an ellipsis."""
+    if len(text) <= width:
+        return text
+    if width <= len(ELLIPSIS):
+        return text[:width]
+    cut = text[:width - len(ELLIPSIS)]
+    space = cut.rfind(" ")
+    if space >= len(cut) * 3 // 4:
+        cut = cut[:space]
+    return cut.rstrip() + ELLIPSIS
+
+def snippet(text, query, width):
+    """The width characters of text holding the most query terms, marked with ellipses where cut.
+
+    Falls back to the start of the text when no query term occurs in it.
+    """
+    if len(text) <= width:
+        return text
+    terms = set(tokenize(query))
+    matches = [
+        (match.start(), match.end()) for match in _TOKEN.finditer(text.lower())
+        if match.group() in terms or terms.intersection(tokenize(match.group()))
+    ]
+    if not matches or width <= 2 * len(ELLIPSIS):
+        return truncate(text, width)
+
+    room = width - 2 * len(ELLIPSIS)
+    # Window starting at each match that covers the most matches; ties go to the earliest
+    best_first, best_last, best_count = 0, 0, 0
+    last = 0
+    for first, (start, _) in enumerate(matches):
+        last = max(last, first)
+        while last + 1 < len(matches) and matches[last + 1][1] - start <= room:
+            last += 1
+        count = last - first + 1 if matches[last][1] - start <= room else 0
+        if count > best_count:
+            best_first, best_last, best_count = first, last, count
+    if best_count == 0:
+        # The first match is longer than the window
+        start = matches[0][0]
+        return ELLIPSIS + text[start:start + room] + ELLIPSIS
+
+    span_start, span_end = matches[best_first][0], matches[best_last][1]
+    start = max(0, min(span_start - (room - (span_end - span_start)) // 2, len(text) - room))
+    end = start + room
+    # Widen to the text edges when the ellipses would not be needed, else snap inward to whole words
+    if start == 0:
+        end = min(len(text), end + len(ELLIPSIS))
+    elif text[start - 1] != " ":
+        space = text.find(" ", start, span_start + 1)
+        if space != -1:
+            start = space + 1
+    if end >= len(text):
+        end = len(text)
+    elif text[end] != " ":
+        space = text.rfind(" ", span_end, end)
+        if space != -1:
+            end = space
+    prefix = ELLIPSIS if start > 0 else ""
+    suffix = ELLIPSIS if end < len(text) else ""
+    return prefix + text[start:end].strip() + suffix
+
+def shorten(text, width, query=None):
+    """A snippet around the query terms if query is given, else the truncated text."""
+    return snippet(text, query, width) if query else truncate(text, width)
+
+def pack(entries, budget=None, text_key="memory", query=None, max_result_chars=None, stop_at_overflow=False,
+         envelope=0):
+    """Greedily pack entries, in order, into a character budget.
+
+    Args:
+        entries: Result dicts in rank order; the text_key field is the one shortened
+        budget: Characters the JSON list of entries may take, or None for no limit
+        text_key: Field holding the text to shorten
+        query: Shorten texts to snippets around these terms instead of cutting their tails
+        max_result_chars: Shorten every text to at most this many characters first
+        stop_at_overflow: Stop at the first entry that does not fit instead of trying the
+            smaller ones after it, so a paged listing has no gaps
+        envelope: Characters of the surrounding response taken from the budget first
+
+    Returns:
+        (packed, omitted): The entries kept, shortened ones marked with "truncated": true,
+        and how many were dropped. At least one entry is kept if there are any.
+    """
+    packed, omitted = [], 0
+    used = len(dumps([])) + envelope
+    for index, entry in enumerate(entries):
+        entry = dict(entry)
+        text = entry.get(text_key)
+        if isinstance(text, str) and max_result_chars and len(text) > max_result_chars:
+            entry[text_key] = shorten(text, max_result_chars, query)
+            entry["truncated"] = True
+        separator = 1 if packed else 0
+        cost = len(dumps(entry)) + separator
+        if budget is None or used + cost <= budget:
+            packed.append(entry)
+            used += cost
+            continue
+        text = entry.get(text_key)
+        if isinstance(text, str):
+            shortened = _fit(entry, text_key, text, budget - used - separator, query, force=not packed)
+            if shortened is not None:
+                packed.append(shortened)
+                used += len(dumps(shortened)) + separator
+                continue
+        elif not packed:
+            packed.append(entry)
+            used += cost
+            continue
+        omitted += 1
+        if stop_at_overflow:
+            omitted += len(entries) - index - 1
+            break
+    return packed, omitted
+
+def _fit(entry, text_key, text, room, query, force=False):
+    """entry with its text shortened so the entry's JSON takes at most room characters, or None."""
+    entry = {**entry, "truncated": True}
+    overhead = len(dumps({**entry, text_key: ""}))
+    width = room - overhead
+    while True:
+        if width < MIN_RESULT_CHARS:
+            if not force:
+                return None
+            width = MIN_RESULT_CHARS
+        entry[text_key] = shorten(text, width, query)
+        excess = len(dumps(entry)) - room
+        if excess <= 0 or width == MIN_RESULT_CHARS:
+            return entry
+        # Escaped characters made the JSON longer than the text
+        width -= excess
@@ -0,0 +1,305 @@
+"""
+Near-duplicate detection and compaction of stored memories.
+
+Agents re-save the same facts in slightly different words, so a scope
+collects near-duplicates that make searches slower and ``get_all_memories``
+pages bigger. The compactor walks the memories page by page. For each memory
+it looks up its nearest neighbours in the same user / agent / run scope and
+treats everything at or above COMPACTION_SIMILARITY as one cluster. It keeps
+the most recently updated memory of each cluster, merges the others' extra
+metadata and earliest created_at into it, and retires the rest.
+
+Each page is one short unit of work on the dispatcher's "compact" operation,
+with a pause between pages, so live tool calls keep their workers. Run it from
+the server with COMPACTION_INTERVAL, or on demand:
+
+    python compaction.py --user-id alice --dry-run
+    python compaction.py --vacuum
+
+Runs in the server also compact the files of the local vector store once
+LOCAL_VACUUM_RATIO of its slots belong to deleted or replaced vectors.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from pagination import RESERVED_KEYS, page_memories, parse_timestamp
+from prefilter import score_similarity
+from scoping import SCOPE_KEYS
+from utils import env_bool, env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+def get_compaction_settings():
+    """Read the COMPACTION_* settings; all but "pause" are Compactor arguments."""
+    return {
+        "similarity": env_float("COMPACTION_SIMILARITY", 0.95),
+        "neighbors": env_int("COMPACTION_NEIGHBORS", 5),
+        "batch_size": env_int("COMPACTION_BATCH_SIZE", 200),
+        "max_retire": env_int("COMPACTION_MAX_RETIRE", 1000),
+        "pause": env_float("COMPACTION_PAUSE_MS", 50) / 1000,
+        "dry_run": env_bool("COMPACTION_DRY_RUN", False),
+    }
+
+def _scope_of(payload):
+    return {key: payload[key] for key in SCOPE_KEYS if payload.get(key)}
+
+def _timestamp(item, field):
+    value = item.get(field) or item.get("created_at")
+    return parse_timestamp(value) if value else None
+
+def fetch_vectors(memory, items):
+    """Return {id: vector} for memory items, read from the store where it allows, else re-embedded."""
+    from batching import embed_batch
+
+    vector_store = memory.vector_store
+    ids = [item["id"] for item in items]
+    if hasattr(vector_store, "get_vectors"):
+        return vector_store.get_vectors(ids)
+    collection = getattr(vector_store, "collection", None)
+    if collection is not None and hasattr(collection, "table"):
+        return {str(record[0]): list(record[1]) for record in collection.fetch(ids)}
+    # Served by the embedding cache for texts embedded recently
+    texts = [item["memory"] or "" for item in items]
+    return dict(zip(ids, embed_batch(memory.embedding_model, texts, "add")))
+
+class Compactor:
+    """Finds clusters of near-duplicate memories and retires all but one memory per cluster."""
+
+    def __init__(self, memory, similarity=0.95, neighbors=5, batch_size=200, max_retire=1000, dry_run=False,
+                 lifecycle=None):
+        """
+        Args:
+            memory: The Mem0 client
+            similarity: Minimum cosine similarity for two memories to count as duplicates
+            neighbors: Nearest neighbours checked per memory
+            batch_size: Memories read per page
+            max_retire: Stop after retiring this many memories in one run
+            dry_run: Report what would be retired without changing anything
+            lifecycle: LifecycleStore whose access and archive rows of retired memories are dropped
+        """
+        self.memory = memory
+        self.similarity = similarity
+        self.neighbors = neighbors
+        self.batch_size = batch_size
+        self.max_retire = max_retire
+        self.dry_run = dry_run
+        self.lifecycle = lifecycle
+        self._retired = set()
+        self.report = {
+            "scanned": 0,
+            "clusters": 0,
+            "retired": 0,
+            "merged": 0,
+            "bytes_reclaimed_estimate": 0,
+            "batches": 0,
+            "dry_run": dry_run,
+        }
+
+    @property
+    def exhausted(self):
+        return self.report["retired"] >= self.max_retire
+
+    def _duplicates_of(self, item, vector):
+        scope = _scope_of(item)
+        hits = self.memory.vector_store.search(
+            query=item["memory"] or "", vectors=vector, limit=self.neighbors + 1, filters=scope
+        )
+        duplicates = []
+        for hit in hits:
+            hit_id = str(hit.id)
+            if hit_id == item["id"] or hit_id in self._retired:
+                continue
+            # The filter also matches memories of narrower scopes (e.g. with an agent_id); keep to this one
+            if _scope_of(hit.payload or {}) != scope:
+                continue
+            similarity = score_similarity(self.memory.vector_store, hit.score)
+            if similarity is not None and similarity >= self.similarity:
+                duplicates.append(hit)
+        return duplicates
+
+    def _merge(self, keeper, retired):
+        """Fold the retired memories' extra metadata and earliest created_at into the keeper.
+
+        The merged memory only expires if every member of the cluster does, at the latest expiry.
+        """
+        keeper_payload = dict(keeper["payload"])
+        payload = dict(keeper_payload)
+        for other in retired:
+            for key, value in other["payload"].items():
+                if key not in RESERVED_KEYS and key != "expires_at" and key not in payload:
+                    payload[key] = value
+            created_at = other["payload"].get("created_at")
+            if created_at and (not payload.get("created_at") or parse_timestamp(created_at) < parse_timestamp(payload["created_at"])):
+                payload["created_at"] = created_at
+        expiries = [member["payload"].get("expires_at") for member in [keeper, *retired]]
+        if all(expiries):
+            payload["expires_at"] = max(expiries, key=parse_timestamp)
+        else:
+            payload.pop("expires_at", None)
+        if payload == keeper_payload:
+            return False
+        if not self.dry_run:
+            vector = fetch_vectors(self.memory, [{"id": keeper["id"], "memory": payload.get("data")}])[keeper["id"]]
+            self.memory.vector_store.update(vector_id=keeper["id"], vector=vector, payload=payload)
+        return True
+
+    def run_batch(self, filters, cursor=None):
+        """Compact one page of memories matching filters.
+
+        Returns:
+            tuple: (cursor for the next page or None, list of scopes whose memories changed)
+        """
+        items, next_cursor = page_memories(self.memory, filters, limit=self.batch_size, cursor=cursor)
+        self.report["batches"] += 1
+        items = [item for item in items if item["id"] not in self._retired]
+        vectors = fetch_vectors(self.memory, items) if items else {}
+        changed = []
+        for item in items:
+            if self.exhausted:
+                return None, changed
+            if item["id"] in self._retired or item["id"] not in vectors:
+                continue
+            self.report["scanned"] += 1
+            duplicates = self._duplicates_of(item, vectors[item["id"]])
+            if not duplicates:
+                continue
+            members = [{"id": item["id"], "payload": self.memory.vector_store.get(item["id"]).payload}]
+            members += [{"id": str(hit.id), "payload": hit.payload} for hit in duplicates]
+            # Keep the most recently updated memory: it carries the latest version of the fact
+            members.sort(key=lambda member: _timestamp(member["payload"], "updated_at") or parse_timestamp("1970-01-01"))
+            keeper, retired = members[-1], members[:-1]
+            retired = retired[: self.max_retire - self.report["retired"]]
+            self.report["clusters"] += 1
+            if self._merge(keeper, retired):
+                self.report["merged"] += 1
+            for member in retired:
+                self._retired.add(member["id"])
+                if not self.dry_run:
+                    self.memory.delete(member["id"])
+                dims = len(vectors.get(member["id"]) or vectors[item["id"]])
+                self.report["retired"] += 1
+                self.report["bytes_reclaimed_estimate"] += dims * 4 + len(json.dumps(member["payload"]))
+            if self.lifecycle is not None and retired and not self.dry_run:
+                self.lifecycle.forget(member["id"] for member in retired)
+            changed.append(_scope_of(keeper["payload"]))
+        return next_cursor, changed
+
+    def run(self, filters=None, pause=0.0):
+        """Compact every memory matching filters (all memories if None) and return the report."""
+        started = time.perf_counter()
+        cursor = None
+        while True:
+            cursor, _ = self.run_batch(filters or {}, cursor)
+            if cursor is None or self.exhausted:
+                break
+            if pause:
+                time.sleep(pause)
+        self.report["seconds"] = round(time.perf_counter() - started, 3)
+        return self.report
+
+async def compact_in_background(dispatcher, memory, filters=None, on_change=None, settings=None, lifecycle=None):
+    """Run a compaction one page at a time on the dispatcher, pausing between pages.
+
+    Args:
+        dispatcher: The Mem0Dispatcher; pages run as its "compact" operation
+        memory: The Mem0 client
+        filters: Limit the run to one scope; None compacts every scope
+        on_change: Called with the filters of every scope whose memories changed
+        settings: Overrides for get_compaction_settings()
+        lifecycle: LifecycleStore to drop the retired memories from
+
+    Returns:
+        dict: The compaction report
+    """
+    settings = dict(settings or get_compaction_settings())
+    pause = settings.pop("pause")
+    compactor = Compactor(memory, **settings, lifecycle=lifecycle)
+    started = time.perf_counter()
+    cursor = None
+    while True:
+        cursor, changed = await dispatcher.run("compact", compactor.run_batch, filters or {}, cursor)
+        if on_change is not None:
+            for scope in changed:
+                on_change(scope)
+        if cursor is None or compactor.exhausted:
+            break
+        await asyncio.sleep(pause)
+    vector_store = memory.vector_store
+    if hasattr(vector_store, "vacuum") and not compactor.dry_run:
+        slots = vector_store.col_info()["slots"]
+        # Deleted and replaced vectors of the local store keep their slots until it is vacuumed
+        if slots and vector_store.dead_slots() / slots >= env_float("LOCAL_VACUUM_RATIO", 0.3):
+            compactor.report["vacuum"] = await dispatcher.run("compact", vector_store.vacuum)
+    compactor.report["seconds"] = round(time.perf_counter() - started, 3)
+    return compactor.report
+
+def _table_bytes(memory):
+    collection = getattr(memory.vector_store, "collection", None)
+    if collection is None or not hasattr(collection, "table"):
+        return None
+    from sqlalchemy import text
+
+    with collection.client.Session() as session:
+        return session.execute(
+            text("SELECT pg_total_relation_size(CAST(:table AS regclass))"),
+            {"table": f'vecs."{collection.table.name}"'},
+        ).scalar()
+
+def _vacuum(memory):
+    from sqlalchemy import text
+
+    collection = memory.vector_store.collection
+    with collection.client.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f'VACUUM (ANALYZE) vecs."{collection.table.name}"'))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id")
+    parser.add_argument("--agent-id")
+    parser.add_argument("--run-id")
+    parser.add_argument("--similarity", type=float)
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--max-retire", type=int)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="VACUUM the pgvector table (or compact the local store's files) afterwards to return space")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    from lifecycle import get_lifecycle_store
+    from utils import get_mem0_client
+
+    load_dotenv()
+    settings = get_compaction_settings()
+    for name in ("similarity", "batch_size", "max_retire"):
+        if getattr(args, name) is not None:
+            settings[name] = getattr(args, name)
+    settings["dry_run"] = settings["dry_run"] or args.dry_run
+    pause = settings.pop("pause")
+    filters = {key: value for key, value in
+               (("user_id", args.user_id), ("agent_id", args.agent_id), ("run_id", args.run_id)) if value}
+
+    memory = get_mem0_client()
+    table_bytes_before = _table_bytes(memory)
+    lifecycle = get_lifecycle_store()
+    report = Compactor(memory, **settings, lifecycle=lifecycle).run(filters, pause=pause)
+    if lifecycle is not None:
+        lifecycle.close()
+    if args.vacuum and not settings["dry_run"] and hasattr(memory.vector_store, "vacuum"):
+        report["vacuum"] = memory.vector_store.vacuum()
+    if table_bytes_before is not None:
+        if args.vacuum and not settings["dry_run"]:
+            _vacuum(memory)
+        report["table_bytes_before"] = table_bytes_before
+        report["table_bytes_after"] = _table_bytes(memory)
+    close = getattr(memory.vector_store, "close", None)
+    if close is not None:
+        close()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
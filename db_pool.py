@@ -0,0 +1,141 @@
+"""
+Connection pool settings for the pgvector (vecs) backend.
+
+vecs builds its SQLAlchemy engine with the default pool, which lets
+connections go stale behind the Supabase poolers and re-connects (with a new
+TLS handshake) under bursts of concurrent tool calls. ``configure_vecs_pool``
+rebinds a vecs client to an engine whose pool is sized and recycled from the
+DB_POOL_* settings and that records how long callers waited for a connection.
+
+vecs issues its queries through psycopg2, which has no server-side prepared
+statements (and the Supabase transaction pooler would not keep them across
+transactions anyway). Statement reuse therefore comes from SQLAlchemy's
+compiled statement cache, sized with DB_STATEMENT_CACHE_SIZE.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from utils import env_bool, env_int
+
+logger = logging.getLogger(__name__)
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that counts checkouts and new connections and times the wait for a connection.
+
+    The wait is the time spent queueing for a free pooled connection; opening a
+    new connection and the pre-ping are not part of it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        # Per-thread timing of the checkout in progress
+        self._checkout = threading.local()
+        self._counters = {"checkouts": 0, "connects": 0, "timeouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+
+    def connect(self):
+        self._checkout.waited = 0.0
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self._counters["timeouts"] += 1
+            raise
+        waited = self._checkout.waited
+        with self._stats_lock:
+            self._counters["checkouts"] += 1
+            self._counters["wait_seconds_total"] += waited
+            self._counters["wait_seconds_max"] = max(self._counters["wait_seconds_max"], waited)
+        return connection
+
+    def _do_get(self):
+        # QueuePool._do_get calls itself to retry; only the outermost call is timed
+        depth = getattr(self._checkout, "depth", 0)
+        if depth == 0:
+            self._checkout.creating = 0.0
+            started = time.perf_counter()
+        self._checkout.depth = depth + 1
+        try:
+            return super()._do_get()
+        finally:
+            self._checkout.depth = depth
+            if depth == 0:
+                self._checkout.waited = time.perf_counter() - started - self._checkout.creating
+
+    def _create_connection(self):
+        with self._stats_lock:
+            self._counters["connects"] += 1
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            self._checkout.creating = getattr(self._checkout, "creating", 0.0) + time.perf_counter() - started
+
+    def stats(self):
+        """Return checkout/connect counters, wait times and the current pool occupancy."""
+        with self._stats_lock:
+            counters = dict(self._counters)
+        checkouts = counters["checkouts"]
+        return {
+            **counters,
+            "wait_seconds_total": round(counters["wait_seconds_total"], 6),
+            "wait_seconds_max": round(counters["wait_seconds_max"], 6),
+            "wait_ms_avg": round(counters["wait_seconds_total"] * 1000 / checkouts, 3) if checkouts else 0.0,
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": self.overflow(),
+        }
+
+def get_pool_settings():
+    """Read the DB_POOL_* settings as create_engine keyword arguments."""
+    return {
+        "pool_size": env_int("DB_POOL_SIZE", 10),
+        "max_overflow": env_int("DB_POOL_MAX_OVERFLOW", 10),
+        "pool_timeout": env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": env_bool("DB_POOL_PRE_PING", True),
+        "query_cache_size": env_int("DB_STATEMENT_CACHE_SIZE", 500),
+    }
+
+def configure_vecs_pool(client, **settings):
+    """Rebind a vecs client (and so every collection it created) to a configured, instrumented pool.
+
+    Args:
+        client: The vecs Client, e.g. ``memory.vector_store.db``
+        settings: create_engine pool arguments; defaults to get_pool_settings()
+
+    Returns:
+        InstrumentedQueuePool: The new engine's pool
+    """
+    settings = settings or get_pool_settings()
+    old_engine = client.engine
+    engine = create_engine(old_engine.url, poolclass=InstrumentedQueuePool, **settings)
+    client.engine = engine
+    client.Session = sessionmaker(engine)
+    old_engine.dispose()
+    return engine.pool
+
+def warm_up_pool(engine, connections):
+    """Open up to ``connections`` pooled connections at once so the first requests find them ready.
+
+    Returns:
+        int: The number of connections opened
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = engine.connect()
+            opened.append(connection)
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.warning(f"Connection pool warm-up stopped after {len(opened)} connections: {e}")
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
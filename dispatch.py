@@ -0,0 +1,131 @@
+"""
+Dispatch layer that runs the blocking Mem0 client calls off the event loop.
+
+Every Mem0 call (``add``, ``search``, ``get_all`` ...) is synchronous and can
+spend seconds waiting on the LLM or the database. The dispatcher runs those
+calls on a shared thread pool and caps how many calls of each operation may be
+in flight at once, so a burst of saves cannot occupy every worker and starve
+searches coming from other clients.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import functools
+
+from utils import env_int
+
+# Default per-operation concurrency limits. Override any of them with
+# MEM0_<OPERATION>_CONCURRENCY, e.g. MEM0_ADD_CONCURRENCY=2.
+DEFAULT_OPERATION_LIMITS = {
+    "add": 4,
+    "search": 8,
+    "get_all": 2,
+    # Background compaction never takes more than one worker from live traffic
+    "compact": 1,
+    # So is the lifecycle sweep that expires and archives memories
+    "lifecycle": 1,
+    # And re-embedding into a new model's collection
+    "reembed": 1,
+}
+
+class Mem0Dispatcher:
+    """Runs blocking callables on a bounded thread pool with per-operation limits."""
+
+    def __init__(self, max_workers=16, limits=None, default_limit=4):
+        """
+        Args:
+            max_workers: Size of the shared worker thread pool
+            limits: Mapping of operation name to its maximum concurrency
+            default_limit: Concurrency limit for operations not listed in limits
+        """
+        self.max_workers = max_workers
+        self.limits = dict(limits or {})
+        self.default_limit = default_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mem0-worker")
+        self._semaphores = {}
+        self._in_flight = {}
+        self._waiting = {}
+
+    def limit_for(self, operation):
+        """Return the concurrency limit that applies to an operation."""
+        return self.limits.get(operation, self.default_limit)
+
+    def _semaphore(self, operation):
+        semaphore = self._semaphores.get(operation)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limit_for(operation))
+            self._semaphores[operation] = semaphore
+        return semaphore
+
+    async def run(self, operation, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on the worker pool under the operation's limit.
+
+        The operation slot is held until the worker thread finishes, even if the
+        awaiting coroutine is cancelled, so the limits always reflect the number
+        of threads actually busy with that operation.
+
+        Args:
+            operation: Name of the operation, used to pick the concurrency limit
+            func: The blocking callable to run
+        """
+        semaphore = self._semaphore(operation)
+        self._waiting[operation] = self._waiting.get(operation, 0) + 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting[operation] -= 1
+
+        self._in_flight[operation] = self._in_flight.get(operation, 0) + 1
+        try:
+            # Carry the caller's context vars (tool call, trace span) into the worker thread
+            context = contextvars.copy_context()
+            future = self._executor.submit(context.run, functools.partial(func, *args, **kwargs))
+        except BaseException:
+            self._release(operation, semaphore)
+            raise
+
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: self._release_threadsafe(loop, operation, semaphore))
+        return await asyncio.wrap_future(future)
+
+    def _release_threadsafe(self, loop, operation, semaphore):
+        try:
+            loop.call_soon_threadsafe(self._release, operation, semaphore)
+        except RuntimeError:
+            # The event loop is already closed; nobody is left waiting on the slot
+            pass
+
+    def _release(self, operation, semaphore):
+        self._in_flight[operation] -= 1
+        semaphore.release()
+
+    def stats(self):
+        """Return the configured limits and current in-flight/waiting counts per operation."""
+        operations = set(self.limits) | set(self._in_flight) | set(self._waiting)
+        return {
+            "max_workers": self.max_workers,
+            "operations": {
+                operation: {
+                    "limit": self.limit_for(operation),
+                    "in_flight": self._in_flight.get(operation, 0),
+                    "waiting": self._waiting.get(operation, 0),
+                }
+                for operation in sorted(operations)
+            },
+        }
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and optionally wait for running calls to finish."""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+def get_dispatcher():
+    """Build a Mem0Dispatcher from the MEM0_WORKERS and MEM0_*_CONCURRENCY settings."""
+    limits = {
+        operation: env_int(f"MEM0_{operation.upper()}_CONCURRENCY", default)
+        for operation, default in DEFAULT_OPERATION_LIMITS.items()
+    }
+    return Mem0Dispatcher(
+        max_workers=env_int("MEM0_WORKERS", 16),
+        limits=limits,
+        default_limit=env_int("MEM0_DEFAULT_CONCURRENCY", 4),
+    )
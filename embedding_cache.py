@@ -0,0 +1,210 @@
+"""
+Content-addressed cache in front of the Mem0 embedder.
+
+Agents repeat the same queries constantly, and every Mem0 search or save
+re-embeds its text. ``CachedEmbedder`` wraps the embedder that
+``get_mem0_client`` builds and answers repeated texts from an in-process LRU
+(bounded by size and TTL), backed by an optional SQLite tier that survives
+restarts, and an optional shared tier (see shared_state.py) that worker
+processes fill for each other. Entries are keyed by provider, model,
+dimensions and the normalized text, so switching models never serves a stale
+vector.
+"""
+from array import array
+from collections import OrderedDict
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from utils import env_int
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text, casefold=False):
+    """Collapse whitespace (and optionally case) so trivially different texts share an entry."""
+    text = _WHITESPACE.sub(" ", text).strip()
+    return text.casefold() if casefold else text
+
+class EmbeddingCache:
+    """LRU + TTL cache of embedding vectors with an optional persistent SQLite tier."""
+
+    def __init__(self, max_entries=10000, ttl=86400, path=None, persist_ttl=30 * 86400, shared=None):
+        """
+        Args:
+            max_entries: Maximum number of vectors kept in memory
+            ttl: Seconds a vector stays valid in the in-memory tier
+            path: SQLite file for the persistent tier, or None to keep everything in memory
+            persist_ttl: Seconds a vector stays valid in the persistent and shared tiers
+            shared: Shared backend used as a tier common to every worker process, or None
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_ttl = persist_ttl
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0, "persistent_hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0, "expirations": 0,
+        }
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def get(self, key):
+        """Return the cached vector for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return vector
+                del self._entries[key]
+                self._counters["expirations"] += 1
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT vector FROM embeddings WHERE key = ? AND created_at > ?", (key, now - self.persist_ttl)
+                ).fetchone()
+                if row is not None:
+                    vector = array("f", row[0]).tolist()
+                    self._remember(key, vector, now)
+                    self._counters["persistent_hits"] += 1
+                    return vector
+
+        if self.shared is not None:
+            blob = self.shared.get(f"embedding:{key}")
+            if blob is not None:
+                vector = array("f", blob).tolist()
+                with self._lock:
+                    self._remember(key, vector, now)
+                    self._counters["shared_hits"] += 1
+                return vector
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, key, vector):
+        """Store a vector in every tier."""
+        now = time.time()
+        vector = list(vector)
+        with self._lock:
+            self._remember(key, vector, now)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                    (key, array("f", vector).tobytes(), now),
+                )
+        if self.shared is not None:
+            self.shared.set(f"embedding:{key}", array("f", vector).tobytes(), self.persist_ttl)
+
+    def _remember(self, key, vector, now):
+        self._entries[key] = (vector, now + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def stats(self):
+        """Return hit/miss counters, the hit rate and the number of entries held in memory."""
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        hits = counters["hits"] + counters["persistent_hits"] + counters["shared_hits"]
+        lookups = hits + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": size,
+            "max_entries": self.max_entries,
+            "persistent": self._conn is not None,
+            "shared": self.shared is not None,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class CachedEmbedder:
+    """Wraps a Mem0 embedder and answers repeated texts from an EmbeddingCache."""
+
+    def __init__(self, embedder, cache, provider, casefold=False):
+        """
+        Args:
+            embedder: The Mem0 embedding model to wrap
+            cache: The EmbeddingCache to read and fill
+            provider: Embedder provider name, part of every cache key
+            casefold: Also ignore case when matching texts
+        """
+        self.embedder = embedder
+        self.cache = cache
+        self.provider = provider
+        self.casefold = casefold
+
+    def __getattr__(self, name):
+        # Everything else (config, client, ...) comes from the wrapped embedder
+        if name == "embedder":
+            raise AttributeError(name)
+        return getattr(self.embedder, name)
+
+    def cache_key(self, text):
+        config = self.embedder.config
+        material = "\0".join(
+            [self.provider, str(config.model), str(config.embedding_dims), normalize_text(text, self.casefold)]
+        )
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def embed(self, text, memory_action=None):
+        key = self.cache_key(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embedder.embed(text, memory_action)
+            self.cache.put(key, vector)
+        return vector
+
+    def embed_batch(self, texts, memory_action=None):
+        """Embed texts, sending only the cache misses to the provider in one batched request."""
+        from batching import embed_batch
+
+        keys = [self.cache_key(text) for text in texts]
+        vectors = [self.cache.get(key) for key in keys]
+        missing = {}
+        for index, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(keys[index], []).append(index)
+        if missing:
+            first_indexes = [indexes[0] for indexes in missing.values()]
+            fresh = embed_batch(self.embedder, [texts[index] for index in first_indexes], memory_action)
+            for (key, indexes), vector in zip(missing.items(), fresh):
+                self.cache.put(key, vector)
+                for index in indexes:
+                    vectors[index] = vector
+        return vectors
+
+def get_embedding_cache(shared=None):
+    """Build the EmbeddingCache configured by the EMBEDDING_CACHE_* settings, or None if disabled."""
+    max_entries = env_int("EMBEDDING_CACHE_SIZE", 10000)
+    if max_entries <= 0:
+        return None
+    return EmbeddingCache(
+        max_entries=max_entries,
+        ttl=env_int("EMBEDDING_CACHE_TTL", 86400),
+        path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+        persist_ttl=env_int("EMBEDDING_CACHE_PERSIST_TTL", 30 * 86400),
+        shared=shared,
+    )
@@ -0,0 +1,397 @@
+"""
+Failover, hedging and circuit breakers for the LLM and embedding providers.
+
+``get_mem0_client`` builds one LLM and one embedder. Here they become the
+first entry of an ordered provider list (LLM_FALLBACKS, EMBEDDING_FALLBACKS).
+Every call runs with a timeout (LLM_TIMEOUT, EMBEDDING_TIMEOUT) and moves on
+to the next provider when it fails or times out. When a provider is slower
+than its own recent p95, the same request is hedged: it goes to the next
+provider as well and the first answer wins. A provider that keeps failing has
+its circuit opened and is skipped until CIRCUIT_RESET_SECONDS have passed,
+when one probe request decides whether it is back.
+
+Query vectors must come from the model that indexed the collection, so every
+embedding fallback has to serve the primary's model at the same dimensions
+(another endpoint or host of it). Any other model is rejected at startup, and
+a vector of the wrong length counts as a failed call.
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import logging
+import math
+import os
+import threading
+import time
+
+from utils import env_bool, env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+# Latencies kept per provider for its hedging percentile, and how many it needs first
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+# Config key Mem0 reads a provider's base URL from
+_BASE_URL_KEYS = {"openai": "openai_base_url", "openrouter": "openrouter_base_url", "ollama": "ollama_base_url"}
+
+class ProviderError(RuntimeError):
+    """Raised when no provider of a group could answer a call."""
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures and lets one probe through every reset_after seconds."""
+
+    def __init__(self, failure_threshold=5, reset_after=30.0, clock=time.monotonic):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit (0 never opens it)
+            reset_after: Seconds an open circuit waits before letting a probe request through
+            clock: Monotonic time source
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if self._probing or self.clock() - self.opened_at >= self.reset_after:
+                return "half_open"
+            return "open"
+
+    def allow(self):
+        """Whether a request may go to the provider now; claims the probe of a half-open circuit."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self._probing and self.clock() - self.opened_at >= self.reset_after:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.failure_threshold > 0 and (self.failures >= self.failure_threshold or self.opened_at is not None):
+                self.opened_at = self.clock()
+
+class Provider:
+    """One backend of a FailoverGroup with its circuit breaker, recent latencies and call counters."""
+
+    def __init__(self, name, client, breaker):
+        self.name = name
+        self.client = client
+        self.breaker = breaker
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self.counters = {"success": 0, "failure": 0, "timeout": 0}
+
+    def record(self, outcome, latency=None):
+        with self._lock:
+            self.counters[outcome] += 1
+            if latency is not None:
+                self._latencies.append(latency)
+        if outcome == "success":
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def percentile(self, q):
+        """The q-th percentile of recent successful call latencies, or None until there are enough."""
+        with self._lock:
+            if len(self._latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1)]
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        p95 = self.percentile(95)
+        return {
+            "provider": self.name,
+            "state": self.breaker.state,
+            **counters,
+            "p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+        }
+
+class FailoverGroup:
+    """Runs a call against an ordered list of providers with timeouts, hedging and circuit breakers."""
+
+    def __init__(self, kind, providers, timeout=30.0, hedge=True, hedge_percentile=95, min_hedge_delay=0.05,
+                 max_workers=16):
+        """
+        Args:
+            kind: "llm" or "embedding", used in errors and metrics
+            providers: Providers in order of preference
+            timeout: Seconds each request may take before the next provider is tried
+            hedge: Send a request to the next provider too once the current one is slower than
+                its hedge_percentile latency
+            hedge_percentile: Percentile of a provider's recent latencies that triggers a hedge
+            min_hedge_delay: Seconds a request always gets before it is hedged
+            max_workers: Threads running provider requests
+        """
+        self.kind = kind
+        self.providers = list(providers)
+        self.timeout = timeout
+        self.hedge = hedge and len(self.providers) > 1
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{kind}-provider")
+        self._lock = threading.Lock()
+        self._counters = {"hedges": 0, "hedge_wins": 0}
+
+    @property
+    def primary(self):
+        return self.providers[0]
+
+    def _hedge_delay(self, provider):
+        if not self.hedge:
+            return None
+        latency = provider.percentile(self.hedge_percentile)
+        return None if latency is None else max(latency, self.min_hedge_delay)
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def call(self, operation, validate=None):
+        """Run operation(client) on the first provider that answers in time.
+
+        Args:
+            operation: Callable taking a provider's client and making the request
+            validate: Optional callable that raises if a result is unusable; the provider
+                that returned it counts as failed
+
+        Raises:
+            ProviderError: Every provider failed, timed out or has an open circuit
+        """
+        remaining = deque(self.providers)
+        pending = {}
+        errors = []
+
+        def launch():
+            while remaining:
+                provider = remaining.popleft()
+                if provider.breaker.allow():
+                    future = self._executor.submit(operation, provider.client)
+                    pending[future] = (provider, time.monotonic())
+                    return True
+                errors.append(f"{provider.name}: circuit open")
+            return False
+
+        launch()
+        hedged = False
+        while pending:
+            now = time.monotonic()
+            wake = min(started for _, started in pending.values()) + self.timeout
+            hedge_at = None
+            if remaining and len(pending) == 1:
+                provider, started = next(iter(pending.values()))
+                delay = self._hedge_delay(provider)
+                if delay is not None:
+                    hedge_at = started + delay
+                    wake = min(wake, hedge_at)
+            done, _ = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                provider, started = pending.pop(future)
+                try:
+                    result = future.result()
+                    if validate is not None:
+                        validate(result)
+                except Exception as e:
+                    provider.record("failure")
+                    errors.append(f"{provider.name}: {e}")
+                    logger.warning("%s provider %s failed: %s", self.kind, provider.name, e)
+                    continue
+                provider.record("success", time.monotonic() - started)
+                if hedged and provider is not self.primary:
+                    self._count("hedge_wins")
+                return result
+
+            now = time.monotonic()
+            for future, (provider, started) in list(pending.items()):
+                if now - started >= self.timeout:
+                    # The abandoned request keeps its thread until the provider's own client gives up
+                    del pending[future]
+                    provider.record("timeout")
+                    errors.append(f"{provider.name}: timed out after {self.timeout}s")
+            if not pending:
+                launch()
+            elif hedge_at is not None and now >= hedge_at and launch():
+                hedged = True
+                self._count("hedges")
+        raise ProviderError(f"No {self.kind} provider answered: {'; '.join(errors)}")
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        return {"kind": self.kind, **counters, "providers": [provider.stats() for provider in self.providers]}
+
+class FailoverLLM:
+    """Mem0 LLM that sends generate_response through a FailoverGroup."""
+
+    def __init__(self, group):
+        self.group = group
+
+    def __getattr__(self, name):
+        # config and the rest come from the primary LLM
+        if name == "group":
+            raise AttributeError(name)
+        return getattr(self.group.primary.client, name)
+
+    def generate_response(self, messages, **kwargs):
+        return self.group.call(lambda llm: llm.generate_response(messages=messages, **kwargs))
+
+class FailoverEmbedder:
+    """Mem0 embedder that sends embed and embed_batch through a FailoverGroup and checks vector sizes."""
+
+    def __init__(self, group, dims):
+        self.group = group
+        self.dims = dims
+
+    def __getattr__(self, name):
+        # config and the rest come from the primary embedder
+        if name in ("group", "dims"):
+            raise AttributeError(name)
+        return getattr(self.group.primary.client, name)
+
+    def _check(self, vector):
+        if self.dims and len(vector) != self.dims:
+            raise ValueError(f"returned a {len(vector)}-dimensional vector, the collection needs {self.dims}")
+
+    def embed(self, text, memory_action=None):
+        return self.group.call(lambda embedder: embedder.embed(text, memory_action), validate=self._check)
+
+    def embed_batch(self, texts, memory_action=None):
+        from batching import embed_batch
+
+        def check_all(vectors):
+            for vector in vectors:
+                self._check(vector)
+
+        return self.group.call(lambda embedder: embed_batch(embedder, texts, memory_action), validate=check_all)
+
+def get_failover_settings():
+    """Failover settings from the environment."""
+    return {
+        "llm_timeout": env_float("LLM_TIMEOUT", 120.0),
+        "embedding_timeout": env_float("EMBEDDING_TIMEOUT", 30.0),
+        "hedge": env_bool("HEDGE_ENABLED", True),
+        "hedge_percentile": env_float("HEDGE_PERCENTILE", 95.0),
+        "min_hedge_delay": env_int("HEDGE_MIN_DELAY_MS", 50) / 1000,
+        "failure_threshold": env_int("CIRCUIT_FAILURE_THRESHOLD", 5),
+        "reset_after": env_float("CIRCUIT_RESET_SECONDS", 30.0),
+        "max_workers": env_int("PROVIDER_THREADS", 16),
+    }
+
+def parse_provider_specs(value):
+    """Parse "provider[:model][@base_url]" entries separated by commas.
+
+    The model may itself contain colons (e.g. "ollama:qwen2.5:14b@http://gpu-2:11434").
+    """
+    specs = []
+    for entry in (value or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        target, _, base_url = entry.partition("@")
+        provider, _, model = target.partition(":")
+        specs.append({"provider": provider.strip(), "model": model.strip() or None, "base_url": base_url.strip() or None})
+    return specs
+
+def _spec_name(provider, model, base_url=None):
+    name = f"{provider}:{model}" if model else provider
+    return f"{name}@{base_url}" if base_url else name
+
+def _provider_config(spec, base):
+    config = {**base, "model": spec["model"] or base.get("model")}
+    if spec["base_url"]:
+        config[_BASE_URL_KEYS.get(spec["provider"], "openai_base_url")] = spec["base_url"]
+    return config
+
+def _build_llm(spec, base):
+    from mem0.utils.factory import LlmFactory
+
+    # OpenRouter is served by Mem0's OpenAI LLM once OPENROUTER_API_KEY is set
+    provider = "openai" if spec["provider"] == "openrouter" else spec["provider"]
+    return LlmFactory.create(provider, _provider_config(spec, base))
+
+def _build_embedder(spec, base):
+    from mem0.utils.factory import EmbedderFactory
+
+    return EmbedderFactory.create(spec["provider"], _provider_config(spec, base), None)
+
+def wrap_providers(memory, config, settings=None, build_llm=_build_llm, build_embedder=_build_embedder):
+    """Replace memory.llm and memory.embedding_model with failover wrappers over the configured providers.
+
+    Args:
+        memory: The Mem0 client
+        config: The config dict the client was built from; its llm and embedder entries
+            are the primaries and the templates for the fallbacks
+        settings: get_failover_settings(), read from the environment if omitted
+        build_llm: Builds an LLM client from a fallback spec and a config template
+        build_embedder: Builds an embedder client from a fallback spec and a config template
+    """
+    settings = settings or get_failover_settings()
+
+    def breaker():
+        return CircuitBreaker(settings["failure_threshold"], settings["reset_after"])
+
+    def group(kind, providers, timeout):
+        return FailoverGroup(
+            kind, providers, timeout=timeout, hedge=settings["hedge"], hedge_percentile=settings["hedge_percentile"],
+            min_hedge_delay=settings["min_hedge_delay"], max_workers=settings["max_workers"],
+        )
+
+    llm = config.get("llm", {})
+    llm_base = dict(llm.get("config", {}))
+    llm_providers = [Provider(_spec_name(llm.get("provider", "openai"), llm_base.get("model")), memory.llm, breaker())]
+    for spec in parse_provider_specs(os.getenv("LLM_FALLBACKS")):
+        client = build_llm(spec, {key: value for key, value in llm_base.items() if not key.endswith("_base_url")})
+        name = _spec_name(spec["provider"], spec["model"] or llm_base.get("model"), spec["base_url"])
+        llm_providers.append(Provider(name, client, breaker()))
+    memory.llm = FailoverLLM(group("llm", llm_providers, settings["llm_timeout"]))
+
+    embedder = config.get("embedder", {})
+    embedder_base = dict(embedder.get("config", {}))
+    model = embedder_base.get("model") or getattr(getattr(memory.embedding_model, "config", None), "model", None)
+    dims = embedder_base.get("embedding_dims") or getattr(getattr(memory.embedding_model, "config", None), "embedding_dims", None)
+    embedder_providers = [
+        Provider(_spec_name(embedder.get("provider", "openai"), model), memory.embedding_model, breaker())
+    ]
+    for spec in parse_provider_specs(os.getenv("EMBEDDING_FALLBACKS")):
+        if spec["model"] and spec["model"] != model:
+            raise ValueError(
+                f"Embedding fallback {spec['provider']}:{spec['model']} serves a different model than the one "
+                f"that indexed the collection ({model}); fallbacks must serve {model}"
+            )
+        base = {key: value for key, value in embedder_base.items() if not key.endswith("_base_url")}
+        client = build_embedder({**spec, "model": model}, {**base, "model": model, "embedding_dims": dims})
+        embedder_providers.append(Provider(_spec_name(spec["provider"], model, spec["base_url"]), client, breaker()))
+    memory.embedding_model = FailoverEmbedder(group("embedding", embedder_providers, settings["embedding_timeout"]), dims)
+    return memory
+
+def provider_stats(memory):
+    """Stats of the failover groups of a Mem0 client, one per kind."""
+    stats = []
+    embedder = getattr(memory, "embedding_model", None)
+    # Unwrap the embedding cache
+    embedder = getattr(embedder, "__dict__", {}).get("embedder", embedder)
+    for component in (getattr(memory, "llm", None), embedder):
+        group = getattr(component, "__dict__", {}).get("group")
+        if isinstance(group, FailoverGroup):
+            stats.append(group.stats())
+    return stats
@@ -0,0 +1,142 @@
+"""
+Stateless streamable-HTTP transport.
+
+Clients POST JSON-RPC messages to one endpoint (``/mcp``) and get the
+responses back in the HTTP response body. No session outlives its request, so
+any worker process behind a load balancer can serve any request and the
+server scales by adding workers (HTTP_WORKERS).
+
+With mcp>=1.8 the SDK's own ``StreamableHTTPSessionManager`` serves the
+endpoint in stateless JSON mode. Older SDKs have no streamable-HTTP support,
+so the same stateless JSON mode is served here: every POST runs a fresh
+server session, primed with the initialize handshake a stateful client would
+have sent earlier, and the server's responses are returned as one JSON body.
+"""
+import contextlib
+
+import anyio
+from mcp import types
+from starlette.responses import JSONResponse, Response
+
+# Request id of the handshake that primes a per-request session
+_PRIMING_ID = "mcp-mem0-stateless-initialize"
+
+def _session_manager_class():
+    try:
+        from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    except ImportError:
+        return None
+    return StreamableHTTPSessionManager
+
+def _wrap(message):
+    # mcp>=1.7 passes SessionMessage objects over the server streams, older versions the bare message
+    try:
+        from mcp.shared.message import SessionMessage
+    except ImportError:
+        return message
+    return SessionMessage(message)
+
+def _unwrap(message):
+    return getattr(message, "message", message)
+
+def _error(request_id, code, message):
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+def _priming_messages():
+    initialize = types.JSONRPCRequest(
+        jsonrpc="2.0",
+        id=_PRIMING_ID,
+        method="initialize",
+        params=types.InitializeRequestParams(
+            protocolVersion=types.LATEST_PROTOCOL_VERSION,
+            capabilities=types.ClientCapabilities(),
+            clientInfo=types.Implementation(name="stateless-http", version="1"),
+        ).model_dump(by_alias=True, exclude_none=True),
+    )
+    initialized = types.JSONRPCNotification(jsonrpc="2.0", method="notifications/initialized")
+    return types.JSONRPCMessage(initialize), types.JSONRPCMessage(initialized)
+
+async def _exchange(server, messages, request_ids):
+    """Run a one-off server session over messages and return the responses to request_ids."""
+    to_server, server_reads = anyio.create_memory_object_stream(len(messages) + 2)
+    server_writes, from_server = anyio.create_memory_object_stream(len(messages) + 2)
+    responses = {}
+    async with anyio.create_task_group() as group:
+        group.start_soon(server.run, server_reads, server_writes, server.create_initialization_options())
+        initialize, initialized = _priming_messages()
+        async with to_server, from_server:
+            await to_server.send(_wrap(initialize))
+            async for message in from_server:
+                if getattr(_unwrap(message).root, "id", None) == _PRIMING_ID:
+                    break
+            await to_server.send(_wrap(initialized))
+            for message in messages:
+                await to_server.send(_wrap(message))
+            async for message in from_server:
+                root = _unwrap(message).root
+                if isinstance(root, (types.JSONRPCResponse, types.JSONRPCError)) and root.id in request_ids:
+                    responses[root.id] = root.model_dump(by_alias=True, mode="json", exclude_none=True)
+                    if len(responses) == len(request_ids):
+                        break
+        # Closing the streams ends the session; the server finishes its handlers and exits its lifespan
+    return responses
+
+async def handle_stateless_request(server, request):
+    """Serve one POST of the streamable-HTTP protocol in stateless JSON-response mode."""
+    if request.method != "POST":
+        # No standalone server-to-client stream without sessions
+        return Response(status_code=405, headers={"Allow": "POST"})
+    try:
+        body = await request.json()
+    except ValueError:
+        return JSONResponse(_error(None, types.PARSE_ERROR, "Parse error"), status_code=400)
+    batch = isinstance(body, list)
+    try:
+        messages = [types.JSONRPCMessage.model_validate(item) for item in (body if batch else [body])]
+    except Exception as e:
+        return JSONResponse(_error(None, types.INVALID_REQUEST, f"Invalid request: {e}"), status_code=400)
+    request_ids = [message.root.id for message in messages if isinstance(message.root, types.JSONRPCRequest)]
+    if not request_ids:
+        # Notifications and responses only
+        return Response(status_code=202)
+    responses = await _exchange(server, messages, set(request_ids))
+    ordered = [responses.get(request_id) or _error(request_id, types.INTERNAL_ERROR, "No response") for request_id in request_ids]
+    return JSONResponse(ordered if batch else ordered[0])
+
+def streamable_http_app(server, hold_context, path="/mcp", routes=(), debug=False):
+    """Starlette app serving the MCP server over stateless streamable HTTP.
+
+    Args:
+        server: The low-level MCP server (``FastMCP._mcp_server``)
+        hold_context: Async context manager entered for the app's lifetime; it keeps the
+            shared lifespan context open between requests
+        path: Endpoint the clients POST to
+        routes: Extra Starlette routes, e.g. /metrics
+        debug: Starlette debug mode
+    """
+    from starlette.applications import Starlette
+    from starlette.routing import Route
+
+    manager_class = _session_manager_class()
+    manager = manager_class(app=server, stateless=True, json_response=True) if manager_class else None
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with contextlib.AsyncExitStack() as stack:
+            await stack.enter_async_context(hold_context())
+            if manager is not None:
+                await stack.enter_async_context(manager.run())
+            yield
+
+    if manager is not None:
+        class Endpoint:
+            async def __call__(self, scope, receive, send):
+                await manager.handle_request(scope, receive, send)
+
+        endpoint = Route(path, endpoint=Endpoint(), methods=["GET", "POST", "DELETE"])
+    else:
+        async def handle(request):
+            return await handle_stateless_request(server, request)
+
+        endpoint = Route(path, endpoint=handle, methods=["GET", "POST", "DELETE"])
+    return Starlette(debug=debug, routes=[endpoint, *routes], lifespan=lifespan)
@@ -0,0 +1,216 @@
+"""
+Hybrid lexical + vector retrieval for search_memories.
+
+Embeddings are good at paraphrases but weak at exact identifiers such as
+ticket numbers, hostnames or API names. In hybrid mode a full-text search runs
+next to the vector search: a Postgres ``tsvector`` query against the pgvector
+table, or an in-process BM25 index for the local vector store. The two ranked
+lists are merged with reciprocal-rank fusion, optionally reordered by a cheap
+token-overlap reranker, and every stage is timed. The lexical stage is dropped
+rather than waited for once the latency budget is spent.
+"""
+from collections import Counter, defaultdict
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import time
+
+from pagination import to_memory_item
+from utils import env_bool, env_int
+
+logger = logging.getLogger(__name__)
+
+# Keeps identifiers like "db-01.prod", "JIRA-1234" or "v2/users" together as one token
+_TOKEN = re.compile(r"\w[\w.\-:/]*\w|\w")
+_PART = re.compile(r"[^\W_]+")
+_TS_CONFIG = re.compile(r"^\w+$")
+
+def tokenize(text):
+    """Lowercase tokens of text: each identifier-like token plus the word parts it is made of."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+class Bm25Index:
+    """In-process BM25 inverted index over memory texts."""
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = defaultdict(dict)
+        self._terms = {}
+        self._lengths = {}
+        self._total_length = 0
+
+    def add(self, doc_id, text):
+        self.remove(doc_id)
+        counts = Counter(tokenize(text))
+        for term, frequency in counts.items():
+            self._postings[term][doc_id] = frequency
+        length = sum(counts.values())
+        self._terms[doc_id] = list(counts)
+        self._lengths[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id):
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in self._terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query, limit, allowed=None):
+        """Return up to limit (doc_id, score) pairs, best first, restricted to allowed doc ids if given."""
+        documents = len(self._lengths)
+        if not documents:
+            return []
+        average_length = self._total_length / documents
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+def get_hybrid_settings():
+    """Read the HYBRID_* search settings."""
+    ts_config = os.getenv("HYBRID_TS_CONFIG", "simple")
+    if not _TS_CONFIG.match(ts_config):
+        raise ValueError(f"Invalid HYBRID_TS_CONFIG: {ts_config}")
+    return {
+        "vector_candidates": env_int("HYBRID_VECTOR_CANDIDATES", 20),
+        "lexical_candidates": env_int("HYBRID_LEXICAL_CANDIDATES", 20),
+        "rrf_k": env_int("HYBRID_RRF_K", 60),
+        "rerank": env_bool("HYBRID_RERANK", False),
+        "budget_ms": env_int("HYBRID_BUDGET_MS", 500),
+        "ts_config": ts_config,
+    }
+
+def _fulltext_search(collection, query, filters, limit, ts_config):
+    from sqlalchemy import text
+
+    # The to_tsvector expression must match the one ensure_fulltext_index creates
+    document = f"to_tsvector('{ts_config}', metadata->>'data')"
+    statement = text(
+        f"SELECT id, metadata, ts_rank_cd({document}, query) AS rank "
+        f"FROM vecs.\"{collection.table.name}\", "
+        f"CAST(replace(CAST(plainto_tsquery('{ts_config}', :query) AS text), '&', '|') AS tsquery) AS query "
+        f"WHERE {document} @@ query AND metadata @> CAST(:filters AS jsonb) "
+        "ORDER BY rank DESC LIMIT :limit"
+    )
+    with collection.client.Session() as session:
+        rows = session.execute(statement, {"query": query, "filters": json.dumps(filters), "limit": limit})
+        return [(str(row[0]), row[1], float(row[2])) for row in rows]
+
+def lexical_search(memory, query, filters, limit, ts_config="simple"):
+    """Full-text search over the memories matching filters.
+
+    Returns:
+        list: Memory items with a "score" (higher is better), or None if the vector store has no text index
+    """
+    vector_store = memory.vector_store
+    if hasattr(vector_store, "lexical_search"):
+        hits = [(hit.id, hit.payload, hit.score) for hit in vector_store.lexical_search(query, limit, filters)]
+    elif hasattr(getattr(vector_store, "collection", None), "table"):
+        hits = _fulltext_search(vector_store.collection, query, filters, limit, ts_config)
+    else:
+        return None
+    return [{**to_memory_item(memory_id, payload), "score": score} for memory_id, payload, score in hits]
+
+def reciprocal_rank_fusion(result_lists, k=60):
+    """Merge ranked lists of memory items; an item scores sum(1 / (k + rank)) over the lists it appears in."""
+    fused, items = defaultdict(float), {}
+    for results in result_lists:
+        for rank, item in enumerate(results, start=1):
+            fused[item["id"]] += 1.0 / (k + rank)
+            items.setdefault(item["id"], item)
+    return [{**items[memory_id], "score": score} for memory_id, score in sorted(fused.items(), key=lambda pair: pair[1], reverse=True)]
+
+def rerank(query, items):
+    """Reorder fused items by how many query tokens (identifiers count in full) each memory contains."""
+    query_tokens = set(tokenize(query))
+    if not query_tokens or not items:
+        return items
+    top = items[0]["score"] or 1.0
+    reranked = []
+    for item in items:
+        coverage = len(query_tokens.intersection(tokenize(item.get("memory") or ""))) / len(query_tokens)
+        reranked.append({**item, "score": item["score"] / top + coverage})
+    return sorted(reranked, key=lambda item: item["score"], reverse=True)
+
+async def hybrid_search(dispatcher, memory, query, filters, limit, settings=None):
+    """Run vector and lexical retrieval concurrently, fuse the results and report per-stage timings.
+
+    Args:
+        dispatcher: The Mem0Dispatcher the blocking searches run on
+        memory: The Mem0 client
+        query: The search query
+        filters: The user_id / agent_id / run_id to search in
+        limit: Number of results to return
+        settings: Overrides for get_hybrid_settings()
+
+    Returns:
+        tuple: (list of memory items, dict of timings in milliseconds)
+    """
+    settings = settings or get_hybrid_settings()
+    started = time.perf_counter()
+    timings = {"budget_ms": settings["budget_ms"]}
+
+    async def timed(stage, func, *args, **kwargs):
+        stage_started = time.perf_counter()
+        result = await dispatcher.run("search", func, *args, **kwargs)
+        timings[f"{stage}_ms"] = round((time.perf_counter() - stage_started) * 1000, 2)
+        return result
+
+    lexical = asyncio.ensure_future(timed(
+        "lexical", lexical_search, memory, query, filters, max(limit, settings["lexical_candidates"]), settings["ts_config"]
+    ))
+    # Retrieve the outcome of a lexical search nobody waits for any more, so its error is not logged as unhandled
+    lexical.add_done_callback(lambda future: future.cancelled() or future.exception())
+    vector = await timed("vector", memory.search, query, limit=max(limit, settings["vector_candidates"]), **filters)
+    vector_items = vector["results"] if isinstance(vector, dict) else vector
+
+    remaining = settings["budget_ms"] / 1000 - (time.perf_counter() - started)
+    try:
+        lexical_items = await asyncio.wait_for(asyncio.shield(lexical), timeout=max(remaining, 0))
+    except asyncio.TimeoutError:
+        # Leave the query running on its worker; its result is simply not used
+        lexical_items = None
+        timings["lexical"] = "timed_out"
+    except Exception as e:
+        # A failing full-text search (database error, unknown ts_config) degrades to vector-only results
+        logger.warning(f"Lexical search failed, returning vector results only: {e}")
+        lexical_items = None
+        timings["lexical"] = "unavailable"
+    if lexical_items is None and "lexical" not in timings:
+        timings["lexical"] = "unavailable"
+
+    stage_started = time.perf_counter()
+    items = reciprocal_rank_fusion([vector_items, lexical_items or []], k=settings["rrf_k"])
+    timings["fusion_ms"] = round((time.perf_counter() - stage_started) * 1000, 2)
+
+    if settings["rerank"]:
+        stage_started = time.perf_counter()
+        items = rerank(query, items)
+        timings["rerank_ms"] = round((time.perf_counter() - stage_started) * 1000, 2)
+
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    timings["within_budget"] = timings["total_ms"] <= settings["budget_ms"]
+    return items[:limit], timings
@@ -0,0 +1,349 @@
+"""
+Memory lifecycle: expiry, access-aware ranking and a cold archive tier.
+
+* Memories saved with a TTL carry an ``expires_at`` timestamp in their
+  payload. Expired memories are dropped from search results right away and
+  deleted by the next sweep.
+* Every memory a search returns has its hit count and last access time
+  recorded in a local SQLite sidecar, so tracking never writes to the vector
+  store. With LIFECYCLE_DECAY_WEIGHT above 0, search ranks a larger candidate
+  set by relevance weighted with recency and frequency of use.
+* The sweep moves memories nobody has retrieved for ARCHIVE_AFTER_DAYS out of
+  the vector store into the sidecar's archive table. The hot index only holds
+  memories that are in use. Archived memories are searched (brute force, per
+  scope) only when a search asks for them, and move back to the vector store
+  when they are found again.
+"""
+from datetime import datetime, timedelta, timezone
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from pagination import page_memories, parse_timestamp, to_memory_item
+from scoping import SCOPE_KEYS
+from utils import env_bool, env_float, env_int
+
+DEFAULT_LIFECYCLE_PATH = os.path.join(os.path.expanduser("~"), ".mem0", "lifecycle.db")
+
+# Hit count at which the frequency signal saturates
+_FREQUENCY_SATURATION = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS access (
+    memory_id TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL,
+    last_accessed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS archive (
+    memory_id TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    expires_at REAL,
+    archived_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archive_scope_idx ON archive (scope);
+"""
+
+def get_lifecycle_settings():
+    """Read the LIFECYCLE_* / ARCHIVE_* / MEMORY_TTL_SECONDS settings."""
+    return {
+        "default_ttl": env_int("MEMORY_TTL_SECONDS", 0),
+        "decay_weight": env_float("LIFECYCLE_DECAY_WEIGHT", 0.0),
+        "half_life_days": env_float("LIFECYCLE_HALF_LIFE_DAYS", 30.0),
+        "candidates": env_int("LIFECYCLE_CANDIDATES", 3),
+        "max_candidates": env_int("LIFECYCLE_MAX_CANDIDATES", 100),
+        "archive_after_days": env_float("ARCHIVE_AFTER_DAYS", 180.0),
+        "restore_on_hit": env_bool("ARCHIVE_RESTORE_ON_HIT", True),
+        "batch_size": env_int("LIFECYCLE_BATCH_SIZE", 200),
+    }
+
+def expiry_metadata(ttl_seconds):
+    """Payload metadata that makes a memory expire ttl_seconds from now ({} for no TTL)."""
+    if not ttl_seconds or ttl_seconds <= 0:
+        return {}
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+    return {"expires_at": expires_at.isoformat()}
+
+def _expires_at(item):
+    value = (item.get("metadata") or {}).get("expires_at") or item.get("expires_at")
+    return parse_timestamp(value).timestamp() if value else None
+
+def is_expired(item, now=None):
+    """Whether a memory item (or raw payload) is past its expires_at."""
+    expires_at = _expires_at(item)
+    return expires_at is not None and expires_at <= (now or time.time())
+
+def _payload_of(item):
+    """Rebuild the vector store payload of a memory item returned by page_memories."""
+    payload = {"data": item.get("memory"), "hash": item.get("hash"), "created_at": item.get("created_at"),
+               "updated_at": item.get("updated_at")}
+    payload.update({key: item[key] for key in SCOPE_KEYS if key in item})
+    payload.update(item.get("metadata") or {})
+    return {key: value for key, value in payload.items() if value is not None}
+
+def _scope_key(payload):
+    return json.dumps({key: payload[key] for key in SCOPE_KEYS if payload.get(key)}, sort_keys=True)
+
+class LifecycleStore:
+    """SQLite sidecar holding per-memory access statistics and the archive tier."""
+
+    def __init__(self, path=DEFAULT_LIFECYCLE_PATH, flush_every=500):
+        """
+        Args:
+            path: Location of the SQLite database file
+            flush_every: Write buffered hits to disk once this many memories have pending hits
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def record_hits(self, memory_ids, now=None):
+        """Count a search hit for each memory; buffered until flush() or flush_every memories are pending."""
+        now = now or time.time()
+        with self._lock:
+            for memory_id in memory_ids:
+                hits, _ = self._pending.get(memory_id, (0, now))
+                self._pending[memory_id] = (hits + 1, now)
+            full = len(self._pending) >= self.flush_every
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write the recorded hits to SQLite."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if pending:
+                self._conn.executemany(
+                    "INSERT INTO access (memory_id, hits, last_accessed_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(memory_id) DO UPDATE SET hits = hits + excluded.hits, "
+                    "last_accessed_at = MAX(last_accessed_at, excluded.last_accessed_at)",
+                    [(memory_id, hits, last) for memory_id, (hits, last) in pending.items()],
+                )
+        return len(pending)
+
+    def access_stats(self, memory_ids):
+        """Return {id: (hits, last_accessed_at)} for the ids that were ever returned by a search."""
+        memory_ids = list(memory_ids)
+        stats = {}
+        with self._lock:
+            for start in range(0, len(memory_ids), 500):
+                chunk = memory_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT memory_id, hits, last_accessed_at FROM access WHERE memory_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                stats.update({row[0]: (row[1], row[2]) for row in rows})
+            for memory_id in memory_ids:
+                if memory_id in self._pending:
+                    hits, last = self._pending[memory_id]
+                    old_hits, old_last = stats.get(memory_id, (0, 0.0))
+                    stats[memory_id] = (old_hits + hits, max(old_last, last))
+        return stats
+
+    def archive(self, records, now=None):
+        """Store (memory_id, payload, vector) records in the archive tier."""
+        now = now or time.time()
+        rows = [
+            (
+                memory_id,
+                _scope_key(payload),
+                json.dumps(payload),
+                np.asarray(vector, dtype=np.float32).tobytes(),
+                _expires_at(payload),
+                now,
+            )
+            for memory_id, payload, vector in records
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO archive VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def search_archive(self, filters, vector, limit):
+        """Brute-force cosine search over the archived memories of the scopes matching filters.
+
+        Returns:
+            list: (memory_id, similarity, payload) tuples, best first
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT memory_id, scope, payload, vector FROM archive WHERE expires_at IS NULL OR expires_at > ?", (now,)
+            ).fetchall()
+        matching = []
+        for memory_id, scope, payload, blob in rows:
+            scope = json.loads(scope)
+            if all(scope.get(key) == value for key, value in filters.items()):
+                matching.append((memory_id, payload, blob))
+        if not matching:
+            return []
+        matrix = np.stack([np.frombuffer(blob, dtype=np.float32) for _, _, blob in matching])
+        query = np.asarray(vector, dtype=np.float32)
+        similarities = matrix @ query / np.maximum(np.linalg.norm(matrix, axis=1) * np.linalg.norm(query), 1e-12)
+        best = np.argsort(-similarities)[:limit]
+        return [(matching[index][0], float(similarities[index]), json.loads(matching[index][1])) for index in best]
+
+    def restore(self, memory_ids):
+        """Remove memories from the archive and return their (memory_id, payload, vector) records."""
+        memory_ids = list(memory_ids)
+        if not memory_ids:
+            return []
+        placeholders = ",".join("?" * len(memory_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT memory_id, payload, vector FROM archive WHERE memory_id IN ({placeholders})", memory_ids
+            ).fetchall()
+            self._conn.execute(f"DELETE FROM archive WHERE memory_id IN ({placeholders})", memory_ids)
+        return [(row[0], json.loads(row[1]), np.frombuffer(row[2], dtype=np.float32).tolist()) for row in rows]
+
+    def forget(self, memory_ids):
+        """Drop access statistics (and any archived copy) of deleted memories."""
+        memory_ids = list(memory_ids)
+        with self._lock:
+            for memory_id in memory_ids:
+                self._pending.pop(memory_id, None)
+            for start in range(0, len(memory_ids), 500):
+                chunk = memory_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                self._conn.execute(f"DELETE FROM access WHERE memory_id IN ({placeholders})", chunk)
+                self._conn.execute(f"DELETE FROM archive WHERE memory_id IN ({placeholders})", chunk)
+
+    def purge_expired_archive(self, now=None):
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM archive WHERE expires_at IS NOT NULL AND expires_at <= ?", (now or time.time(),)
+            )
+        return cursor.rowcount
+
+    def stats(self):
+        with self._lock:
+            tracked = self._conn.execute("SELECT COUNT(*) FROM access").fetchone()[0]
+            archived, archived_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload) + LENGTH(vector)), 0) FROM archive"
+            ).fetchone()
+            pending = len(self._pending)
+        return {"tracked": tracked, "pending_hits": pending, "archived": archived, "archived_bytes": archived_bytes}
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+def decay_rank(items, stats, settings, similarity=None, now=None):
+    """Reorder search items by relevance weighted with how recently and how often they were used.
+
+    An item's score becomes relevance * ((1 - w) + w * max(recency, frequency)), where
+    recency halves every half_life_days since the last access (or creation) and
+    frequency grows with the log of the hit count.
+
+    Args:
+        items: Memory items with "id", "score" and "created_at"
+        stats: {id: (hits, last_accessed_at)} from LifecycleStore.access_stats
+        settings: get_lifecycle_settings()
+        similarity: Turns an item's score into a higher-is-better relevance (defaults to the score)
+    """
+    now = now or time.time()
+    weight = settings["decay_weight"]
+    half_life = max(settings["half_life_days"], 1e-6) * 86400
+    ranked = []
+    for item in items:
+        relevance = similarity(item["score"]) if similarity is not None else item["score"]
+        hits, last_accessed = stats.get(item["id"], (0, None))
+        if last_accessed is None and item.get("created_at"):
+            last_accessed = parse_timestamp(item["created_at"]).timestamp()
+        recency = 0.5 ** (max(now - last_accessed, 0) / half_life) if last_accessed else 0.0
+        frequency = min(1.0, math.log1p(hits) / math.log1p(_FREQUENCY_SATURATION))
+        ranked.append({**item, "score": (relevance or 0.0) * ((1 - weight) + weight * max(recency, frequency))})
+    return sorted(ranked, key=lambda item: item["score"], reverse=True)
+
+def search_archive(memory, store, query, filters, limit, restore=True):
+    """Search the archive tier, moving the memories found back into the vector store if restore is set.
+
+    Returns:
+        list: Memory items with a cosine-similarity "score", best first
+    """
+    from batching import embed_batch
+
+    vector = embed_batch(memory.embedding_model, [query], "search")[0]
+    hits = store.search_archive(filters, vector, limit)
+    if restore and hits:
+        records = store.restore([memory_id for memory_id, _, _ in hits])
+        memory.vector_store.insert(
+            vectors=[record_vector for _, _, record_vector in records],
+            payloads=[payload for _, payload, _ in records],
+            ids=[memory_id for memory_id, _, _ in records],
+        )
+    return [{**to_memory_item(memory_id, payload), "score": score, "archived": True} for memory_id, score, payload in hits]
+
+def sweep(memory, store, settings=None, filters=None, now=None):
+    """Delete expired memories and archive cold ones, one page at a time.
+
+    A memory is cold when neither a search hit nor its creation happened in the
+    last archive_after_days (0 disables archiving).
+
+    Returns:
+        dict: Counts of scanned, expired and archived memories, and the scopes that changed
+    """
+    from compaction import fetch_vectors
+
+    settings = settings or get_lifecycle_settings()
+    now = now or time.time()
+    store.flush()
+    report = {"scanned": 0, "expired": 0, "archived": 0, "expired_archive": store.purge_expired_archive(now)}
+    changed = {}
+    archive_before = now - settings["archive_after_days"] * 86400 if settings["archive_after_days"] > 0 else None
+    cursor = None
+    while True:
+        items, cursor = page_memories(
+            memory, filters or {}, limit=settings["batch_size"], cursor=cursor, include_expired=True
+        )
+        stats = store.access_stats(item["id"] for item in items)
+        expired, cold = [], []
+        for item in items:
+            report["scanned"] += 1
+            if is_expired(item, now):
+                expired.append(item)
+                continue
+            if archive_before is None:
+                continue
+            _, last_accessed = stats.get(item["id"], (0, None))
+            last_used = max(last_accessed or 0.0, parse_timestamp(item["created_at"]).timestamp() if item.get("created_at") else 0.0)
+            if last_used < archive_before:
+                cold.append(item)
+        for item in expired:
+            memory.delete(item["id"])
+            changed[_scope_key(item)] = item
+        store.forget(item["id"] for item in expired)
+        report["expired"] += len(expired)
+        if cold:
+            vectors = fetch_vectors(memory, cold)
+            records = []
+            for item in cold:
+                if item["id"] in vectors:
+                    records.append((item["id"], _payload_of(item), vectors[item["id"]]))
+            store.archive(records, now)
+            for memory_id, payload, _ in records:
+                memory.vector_store.delete(vector_id=memory_id)
+                changed[_scope_key(payload)] = payload
+            report["archived"] += len(records)
+        if cursor is None:
+            break
+    report["changed_scopes"] = [json.loads(scope) for scope in changed]
+    return report
+
+def get_lifecycle_store():
+    """Build the LifecycleStore at LIFECYCLE_PATH, or None when LIFECYCLE_ENABLED is off."""
+    if not env_bool("LIFECYCLE_ENABLED", True):
+        return None
+    return LifecycleStore(os.getenv("LIFECYCLE_PATH") or DEFAULT_LIFECYCLE_PATH)
@@ -0,0 +1,467 @@
+"""
+Embedded vector store for running without Postgres (VECTOR_STORE=local).
+
+Vectors live in a memory-mapped float32 file, so opening a large store only
+maps it instead of reading it, and payloads live in a small SQLite database
+next to it. Searches are exact: NumPy scans the vectors (or the subset a
+filter selects) SCAN_CHUNK rows at a time, keeping a running top-k, so memory
+stays flat however large the collection grows. Scores are cosine distances,
+the same as the ``supabase`` store returns, so lower is closer.
+
+Deleted and updated vectors leave a tombstone behind: the slot is skipped by
+searches but keeps its space. ``vacuum`` moves the live vectors into a compact
+run of slots, giving the space back.
+
+With a VectorCodec (see quantization.py) every vector is also kept as a
+compact code in a second memory-mapped file. The exact scan then reads the
+codes instead of the float vectors and only rescores its shortlist with them.
+"""
+from collections import defaultdict
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+
+import numpy as np
+from pydantic import BaseModel
+
+from mem0.vector_stores.base import VectorStoreBase
+from utils import env_int
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCAL_VECTOR_PATH = os.path.join(os.path.expanduser("~"), ".mem0", "local_vectors")
+
+# Rows scored per NumPy step of a search
+SCAN_CHUNK = 65536
+
+# Files of the HNSW graph earlier versions kept next to the vectors
+_STALE_GRAPH_FILES = ("graph.i32", "upper.npz")
+
+class OutputData(BaseModel):
+    id: str | None
+    score: float | None
+    payload: dict | None
+
+class LocalVectorStore(VectorStoreBase):
+    """Mem0 vector store backed by memory-mapped files in a local directory."""
+
+    # search() reports cosine distance, like Mem0's pgvector stores
+    score_is_distance = True
+
+    def __init__(self, collection_name, embedding_model_dims, path=DEFAULT_LOCAL_VECTOR_PATH, codec=None, rescore=4):
+        """
+        Args:
+            collection_name: Name of the collection; each collection gets its own subdirectory
+            embedding_model_dims: Dimensions of the embedding vectors
+            path: Directory the collections are stored in
+            codec: VectorCodec the exact scan ranks candidates with, or None to scan the float vectors
+            rescore: With a codec, rescore this many times limit candidates with the float vectors
+        """
+        self.root = path
+        self.collection_name = collection_name
+        self.embedding_model_dims = embedding_model_dims
+        self.codec = codec
+        self.rescore = rescore
+        self._codes = None
+        self._lock = threading.RLock()
+        self.create_col(collection_name, embedding_model_dims, "cosine")
+
+    # -- storage --------------------------------------------------------------------------
+
+    def create_col(self, name, vector_size, distance="cosine"):
+        """Open (or create) the collection's files."""
+        with self._lock:
+            self.collection_name = name
+            self.directory = os.path.join(self.root, name)
+            os.makedirs(self.directory, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.directory, "points.db"), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS points (id TEXT PRIMARY KEY, slot INTEGER NOT NULL, payload TEXT NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._conn.commit()
+            meta = dict(self._conn.execute("SELECT key, value FROM meta"))
+            if "vacuum" in meta:
+                # A vacuum committed its new slots but stopped before swapping in the files
+                self._finish_vacuum()
+            if "dims" in meta and int(meta["dims"]) != vector_size:
+                raise ValueError(
+                    f"Local collection {name} stores {meta['dims']}-dimensional vectors, not {vector_size}"
+                )
+            self.dims = vector_size
+            self._next_slot = int(meta.get("next_slot", 0))
+            self._capacity = max(1024, int(meta.get("capacity", 0)))
+            self._vectors = self._open_vectors(self._capacity)
+            self._alive = np.zeros(self._capacity, dtype=bool)
+            if self.codec is not None:
+                stale = meta.get("codes") != self.codec.name or not os.path.exists(self._codes_path())
+                self._codes = self._open_codes(self._capacity)
+                if stale:
+                    self._encode_all()
+            elif "codes" in meta:
+                # Writes made without the codec would leave the codes behind the vectors
+                self._conn.execute("DELETE FROM meta WHERE key = 'codes'")
+                self._conn.commit()
+
+            self._ids, self._slot_ids, self._payloads = {}, {}, {}
+            self._postings = defaultdict(set)
+            self._bm25 = None
+            for point_id, slot, payload in self._conn.execute("SELECT id, slot, payload FROM points"):
+                self._remember(point_id, slot, json.loads(payload))
+            for stale in _STALE_GRAPH_FILES:
+                if os.path.exists(os.path.join(self.directory, stale)):
+                    os.remove(os.path.join(self.directory, stale))
+
+    def _open_vectors(self, capacity):
+        vector_path = os.path.join(self.directory, "vectors.f32")
+        size = capacity * self.dims * 4
+        with open(vector_path, "ab") as handle:
+            if handle.tell() < size:
+                handle.truncate(size)
+        return np.memmap(vector_path, dtype=np.float32, mode="r+", shape=(capacity, self.dims))
+
+    def _codes_path(self):
+        return os.path.join(self.directory, f"codes.{self.codec.name}")
+
+    def _open_codes(self, capacity):
+        size = capacity * self.codec.bytes_per_vector
+        with open(self._codes_path(), "ab") as handle:
+            if handle.tell() < size:
+                handle.truncate(size)
+        return np.memmap(self._codes_path(), dtype=self.codec.dtype, mode="r+", shape=(capacity, self.codec.width))
+
+    def _encode_all(self, chunk=10000):
+        """Encode every stored vector with the codec and drop the codes of any other encoding."""
+        if self._next_slot > chunk:
+            logger.info(f"Encoding {self._next_slot} vectors of local collection {self.collection_name} as {self.codec.name}")
+        for start in range(0, self._next_slot, chunk):
+            end = min(start + chunk, self._next_slot)
+            self._codes[start:end] = self.codec.encode(self._vectors[start:end])
+        self._codes.flush()
+        for name in os.listdir(self.directory):
+            if name.startswith("codes.") and os.path.join(self.directory, name) != self._codes_path():
+                os.remove(os.path.join(self.directory, name))
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('codes', ?)", (self.codec.name,))
+        self._conn.commit()
+
+    def _compact_file(self, name, source, dtype, width, slots, capacity, chunk=10000):
+        """Write source[slots] to the start of a new memory-mapped file next to name; returns its path."""
+        temporary = os.path.join(self.directory, name + ".vacuum")
+        with open(temporary, "wb") as handle:
+            handle.truncate(capacity * width * np.dtype(dtype).itemsize)
+        target = np.memmap(temporary, dtype=dtype, mode="r+", shape=(capacity, width))
+        for start in range(0, len(slots), chunk):
+            selected = slots[start:start + chunk]
+            target[start:start + len(selected)] = source[selected]
+        target.flush()
+        del target
+        return temporary
+
+    def _finish_vacuum(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".vacuum"):
+                os.replace(os.path.join(self.directory, name), os.path.join(self.directory, name[: -len(".vacuum")]))
+        self._conn.execute("DELETE FROM meta WHERE key = 'vacuum'")
+        self._conn.commit()
+
+    def dead_slots(self):
+        """Slots taken by deleted or replaced vectors."""
+        with self._lock:
+            return self._next_slot - len(self._ids)
+
+    def vacuum(self):
+        """Move the live vectors into slots 0..n-1 and shrink the files.
+
+        The compacted files are written next to the current ones and the new slots are
+        committed before the files are swapped in, so an interrupted vacuum is finished
+        the next time the collection is opened.
+
+        Returns:
+            dict: Slots before and after
+        """
+        with self._lock:
+            before = self._next_slot
+            live = sorted(self._slot_ids.items())
+            slots = np.array([slot for slot, _ in live], dtype=np.int64)
+            capacity = 1024
+            while capacity < len(live):
+                capacity *= 2
+            self._compact_file("vectors.f32", self._vectors, np.float32, self.dims, slots, capacity)
+            if self._codes is not None:
+                self._compact_file(
+                    os.path.basename(self._codes_path()), self._codes, self.codec.dtype, self.codec.width, slots, capacity
+                )
+            self._conn.executemany(
+                "UPDATE points SET slot = ? WHERE id = ?", [(slot, point_id) for slot, (_, point_id) in enumerate(live)]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("next_slot", str(len(live))), ("capacity", str(capacity)), ("vacuum", "1")],
+            )
+            self._conn.commit()
+            self._vectors.flush()
+            del self._vectors
+            self._codes = None
+            self._conn.close()
+            self.create_col(self.collection_name, self.dims)
+            return {"slots_before": before, "slots_after": self._next_slot}
+
+    def _grow(self, needed):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+        self._vectors.flush()
+        del self._vectors
+        self._vectors = self._open_vectors(capacity)
+        if self._codes is not None:
+            self._codes.flush()
+            del self._codes
+            self._codes = self._open_codes(capacity)
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - self._capacity, dtype=bool)])
+        self._capacity = capacity
+
+    def _remember(self, point_id, slot, payload):
+        self._ids[point_id] = slot
+        self._slot_ids[slot] = point_id
+        self._alive[slot] = True
+        self._payloads[point_id] = payload
+        for key, value in payload.items():
+            if isinstance(value, (str, int, float, bool)):
+                self._postings[(key, value)].add(slot)
+        if self._bm25 is not None:
+            self._bm25.add(point_id, payload.get("data") or "")
+
+    def _forget(self, point_id):
+        slot = self._ids.pop(point_id)
+        del self._slot_ids[slot]
+        self._alive[slot] = False
+        for key, value in self._payloads.pop(point_id).items():
+            if isinstance(value, (str, int, float, bool)):
+                self._postings[(key, value)].discard(slot)
+        if self._bm25 is not None:
+            self._bm25.remove(point_id)
+        return slot
+
+    def _commit(self):
+        self._vectors.flush()
+        if self._codes is not None:
+            self._codes.flush()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("dims", str(self.dims)), ("next_slot", str(self._next_slot)), ("capacity", str(self._capacity))],
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def _write(self, point_ids, vectors, payloads):
+        vectors = self._normalize(vectors)
+        start = self._next_slot
+        self._grow(start + len(point_ids))
+        self._vectors[start:start + len(point_ids)] = vectors
+        if self._codes is not None:
+            self._codes[start:start + len(point_ids)] = self.codec.encode(vectors)
+        rows = []
+        for offset, (point_id, payload) in enumerate(zip(point_ids, payloads)):
+            if point_id in self._ids:
+                self._forget(point_id)
+            self._remember(point_id, start + offset, payload)
+            rows.append((point_id, start + offset, json.dumps(payload)))
+        self._next_slot = start + len(point_ids)
+        # The vectors are flushed before the rows that point at them are committed
+        self._vectors.flush()
+        if self._codes is not None:
+            self._codes.flush()
+        self._conn.executemany("INSERT OR REPLACE INTO points (id, slot, payload) VALUES (?, ?, ?)", rows)
+        self._commit()
+
+    # -- Mem0 vector store interface ------------------------------------------------------
+
+    def insert(self, vectors, payloads=None, ids=None):
+        with self._lock:
+            ids = ids or [str(uuid.uuid4()) for _ in vectors]
+            payloads = payloads or [{} for _ in vectors]
+            self._write(list(ids), vectors, [dict(payload) for payload in payloads])
+
+    def _candidates(self, filters):
+        if not filters:
+            return None
+        sets = []
+        for key, value in filters.items():
+            if isinstance(value, (str, int, float, bool)):
+                sets.append(self._postings.get((key, value), set()))
+            else:
+                sets.append({slot for point_id, slot in self._ids.items() if self._payloads[point_id].get(key) == value})
+        return set.intersection(*sorted(sets, key=len))
+
+    def _scan(self, distances_of, slots, count):
+        """The count closest (distance, slot) pairs, nearest first, scoring SCAN_CHUNK slots at a time.
+
+        Args:
+            distances_of: Maps a slice or an array of slots to their distances from the query
+            slots: Sorted array of the slots to consider, or None for every live slot
+            count: Pairs to return
+        """
+        best_distances = np.empty(0, dtype=np.float32)
+        best_slots = np.empty(0, dtype=np.int64)
+        total = self._next_slot if slots is None else slots.size
+        for start in range(0, total, SCAN_CHUNK):
+            end = min(start + SCAN_CHUNK, total)
+            if slots is None:
+                # Contiguous rows read straight from the memmap; tombstones are masked out afterwards
+                alive = self._alive[start:end]
+                chunk_distances = distances_of(slice(start, end))[alive]
+                chunk_slots = np.arange(start, end, dtype=np.int64)[alive]
+            else:
+                chunk_slots = slots[start:end]
+                chunk_distances = distances_of(chunk_slots)
+            best_distances = np.concatenate([best_distances, chunk_distances])
+            best_slots = np.concatenate([best_slots, chunk_slots])
+            if best_distances.size > count:
+                keep = np.argpartition(best_distances, count - 1)[:count]
+                best_distances, best_slots = best_distances[keep], best_slots[keep]
+        order = np.argsort(best_distances, kind="stable")
+        return [(float(best_distances[i]), int(best_slots[i])) for i in order]
+
+    def search(self, query, vectors, limit=5, filters=None):
+        with self._lock:
+            query_vector = self._normalize(vectors)[0]
+            candidates = self._candidates(filters)
+            if candidates is not None:
+                slots = np.sort(np.fromiter(candidates, dtype=np.int64, count=len(candidates)))
+                matching = slots.size
+            else:
+                slots, matching = None, len(self._ids)
+            if matching == 0 or limit <= 0:
+                return []
+            shortlist = limit * self.rescore
+            if self._codes is not None and matching > shortlist:
+                # Rank on the compact codes, then rescore the shortlist with the float vectors
+                hits = self._scan(lambda rows: self.codec.distances(self._codes[rows], query_vector), slots, shortlist)
+                slots = np.sort(np.array([slot for _, slot in hits], dtype=np.int64))
+            return self._output(self._scan(lambda rows: 1.0 - self._vectors[rows] @ query_vector, slots, limit))
+
+    def _output(self, hits):
+        return [
+            OutputData(id=self._slot_ids[slot], score=distance, payload=dict(self._payloads[self._slot_ids[slot]]))
+            for distance, slot in hits
+        ]
+
+    def lexical_search(self, query, limit, filters=None):
+        """BM25 search over the stored memory texts; the index is built on first use."""
+        from hybrid_search import Bm25Index
+
+        with self._lock:
+            if self._bm25 is None:
+                self._bm25 = Bm25Index()
+                for point_id, payload in self._payloads.items():
+                    self._bm25.add(point_id, payload.get("data") or "")
+            candidates = self._candidates(filters)
+            allowed = {self._slot_ids[slot] for slot in candidates} if candidates is not None else None
+            return [
+                OutputData(id=point_id, score=score, payload=dict(self._payloads[point_id]))
+                for point_id, score in self._bm25.search(query, limit, allowed)
+            ]
+
+    def delete(self, vector_id):
+        with self._lock:
+            if vector_id not in self._ids:
+                return
+            self._forget(vector_id)
+            self._conn.execute("DELETE FROM points WHERE id = ?", (vector_id,))
+            self._conn.commit()
+
+    def update(self, vector_id, vector=None, payload=None):
+        with self._lock:
+            if vector_id not in self._ids:
+                return
+            payload = dict(payload) if payload is not None else self._payloads[vector_id]
+            if vector is None:
+                slot = self._forget(vector_id)
+                self._remember(vector_id, slot, payload)
+                self._conn.execute("UPDATE points SET payload = ? WHERE id = ?", (json.dumps(payload), vector_id))
+                self._conn.commit()
+            else:
+                self._write([vector_id], [vector], [payload])
+
+    def get(self, vector_id):
+        with self._lock:
+            if vector_id not in self._ids:
+                return None
+            return OutputData(id=vector_id, score=None, payload=dict(self._payloads[vector_id]))
+
+    def get_vectors(self, vector_ids):
+        """Return {id: vector} for the ids that exist; vectors come back unit-normalized."""
+        with self._lock:
+            return {
+                vector_id: self._vectors[self._ids[vector_id]].tolist()
+                for vector_id in vector_ids
+                if vector_id in self._ids
+            }
+
+    def list_cols(self):
+        return [name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name))]
+
+    def delete_col(self):
+        with self._lock:
+            self.close()
+            for name in os.listdir(self.directory):
+                os.remove(os.path.join(self.directory, name))
+            os.rmdir(self.directory)
+
+    def col_info(self):
+        with self._lock:
+            return {
+                "name": self.collection_name,
+                "count": len(self._ids),
+                "dimension": self.dims,
+                "slots": self._next_slot,
+                "index": {"method": "brute_force", "metric": "cosine"},
+                "vector_bytes": self._next_slot * self.dims * 4,
+                "codes": {**self.codec.describe(), "bytes": self._next_slot * self.codec.bytes_per_vector}
+                if self.codec is not None else None,
+            }
+
+    def list(self, filters=None, limit=None):
+        with self._lock:
+            candidates = self._candidates(filters)
+            slots = sorted(candidates) if candidates is not None else sorted(self._slot_ids)
+            if limit:
+                slots = slots[:limit]
+            # Wrapped in a list like the supabase and qdrant stores, which Mem0's get_all expects
+            return [[
+                OutputData(id=self._slot_ids[slot], score=None, payload=dict(self._payloads[self._slot_ids[slot]]))
+                for slot in slots
+            ]]
+
+    def close(self):
+        """Flush the memory-mapped files and close the payload database."""
+        with self._lock:
+            self._vectors.flush()
+            if self._codes is not None:
+                self._codes.flush()
+            self._conn.close()
+
+def build_local_vector_store(collection_name, embedding_model_dims, codec=None):
+    """Build the LocalVectorStore configured by the LOCAL_VECTOR_* settings.
+
+    Args:
+        collection_name: Name of the collection
+        embedding_model_dims: Dimensions of the embedding vectors
+        codec: VectorCodec for the exact scan (see quantization.build_codec), or None
+    """
+    return LocalVectorStore(
+        collection_name,
+        embedding_model_dims,
+        path=os.getenv("LOCAL_VECTOR_PATH") or DEFAULT_LOCAL_VECTOR_PATH,
+        codec=codec,
+        rescore=max(1, env_int("VECTOR_RESCORE_FACTOR", 4)),
+    )
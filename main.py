@@ -3,23 +3,433 @@ from contextlib import asynccontextmanager
 from collections.abc import AsyncIterator
 from dataclasses import dataclass
 from dotenv import load_dotenv
-from mem0 import Memory
+from typing import TYPE_CHECKING
 import asyncio
+import functools
 import json
+import logging
 import os
+import time
 
-from utils import get_mem0_client
+from admission import AdmissionController, admission_controlled, get_admission_controller
+from batching import SaveBatcher, embed_batch, get_save_batch_size, ingest_batch
+from budget import char_budget, dumps, get_budget_settings, pack
+from compaction import compact_in_background
+from dispatch import Mem0Dispatcher, get_dispatcher
+from embedding_cache import EmbeddingCache, get_embedding_cache
+from http_transport import streamable_http_app
+from hybrid_search import get_hybrid_settings, hybrid_search
+from lifecycle import (
+    LifecycleStore,
+    decay_rank,
+    expiry_metadata,
+    get_lifecycle_settings,
+    get_lifecycle_store,
+    is_expired,
+    search_archive,
+    sweep,
+)
+from metrics import REGISTRY, context_collector, instrument_memory, instrument_tool, metrics_endpoint, record_error
+from multi_search import get_multi_search_settings, merge_results, search_vector, search_vectors, supports_multi_query
+from pagination import encode_cursor, get_memories as fetch_memories, page_memories, parse_fields, project
+from prefilter import SAVE_MODES, score_similarity
+from reembed import Reembedder, build_embedder, get_reembed_settings, open_registry
+from search_cache import SearchResultCache, get_search_cache
+from save_queue import SaveQueue, SaveQueueWorker, get_save_queue
+from scoping import resolve_scope, set_session_scope
+from shared_state import get_http_workers, get_shared_backend
+from utils import env_bool, env_float, env_int, get_mem0_client
+from vector_indexes import (
+    apply_search_params,
+    ensure_ann_index,
+    ensure_fulltext_index,
+    ensure_scope_indexes,
+    get_ann_index_settings,
+)
+
+if TYPE_CHECKING:
+    # Importing mem0 and SQLAlchemy takes seconds; they load with the client, off the startup path
+    from db_pool import InstrumentedQueuePool
+    from mem0 import Memory
 
 load_dotenv()
 
-# Default user ID for memory operations
-DEFAULT_USER_ID = "user"
+logger = logging.getLogger(__name__)
 
 # Create a dataclass for our application context
 @dataclass
 class Mem0Context:
-    """Context for the Mem0 MCP server."""
-    mem0_client: Memory
+    """Context for the Mem0 MCP server.
+
+    The context is handed out before the Mem0 client exists; tools that need the
+    client wait on _ready(context), which resolves once startup_task has built it.
+    """
+    dispatcher: Mem0Dispatcher
+    save_queue: SaveQueue
+    save_worker: SaveQueueWorker
+    mem0_client: "Memory | None" = None
+    startup_task: asyncio.Task | None = None
+    startup_timings: dict | None = None
+    save_mode: str = "sync"
+    save_batcher: SaveBatcher | None = None
+    embedding_cache: EmbeddingCache | None = None
+    search_cache: SearchResultCache | None = None
+    db_pool: "InstrumentedQueuePool | None" = None
+    compaction_task: asyncio.Task | None = None
+    lifecycle: LifecycleStore | None = None
+    lifecycle_task: asyncio.Task | None = None
+    shared: object | None = None
+    admission: AdmissionController | None = None
+    reembed_task: asyncio.Task | None = None
+    cutover_task: asyncio.Task | None = None
+
+def _after_write(context: Mem0Context, filters: dict):
+    """Invalidate cached search results for the scopes whose memories just changed."""
+    if context.search_cache is not None:
+        context.search_cache.invalidate(filters)
+
+async def _save_text(context: Mem0Context, text: str, filters: dict, mode: str = "infer", metadata: dict | None = None):
+    """Save a single text on the worker pool and return Mem0's result.
+
+    "raw" and "auto" saves skip the batcher: they store the text with just an
+    embedding (auto only when the prefilter finds extraction unnecessary).
+    Saves with extra metadata (such as an expiry) skip it too, since a batch
+    shares one set of metadata.
+    """
+    if mode != "infer":
+        outcome = await context.dispatcher.run(
+            "add", ingest_batch, context.mem0_client, [text], filters, mode=mode, metadata=metadata
+        )
+        result = {"results": outcome["events"], **outcome["items"][0]}
+        if result["status"] != "duplicate":
+            _after_write(context, filters)
+        return result
+    if context.save_batcher is not None and not metadata:
+        result = await context.save_batcher.submit(text, filters)
+    else:
+        messages = [{"role": "user", "content": text}]
+        result = await context.dispatcher.run(
+            "add", context.mem0_client.add, messages, metadata=metadata, **filters
+        )
+    _after_write(context, filters)
+    return result
+
+async def _is_leader(context: Mem0Context, job: str, interval: float) -> bool:
+    """Whether this worker process runs the next round of a periodic job; always true without a shared backend."""
+    if context.shared is None:
+        return True
+    return await asyncio.to_thread(context.shared.try_lock, job, interval)
+
+async def _compact_periodically(context: Mem0Context, interval: float):
+    """Compact near-duplicate memories every interval seconds, one page at a time."""
+    while True:
+        await asyncio.sleep(interval)
+        if not await _is_leader(context, "compaction", interval):
+            continue
+        try:
+            report = await compact_in_background(
+                context.dispatcher, context.mem0_client, on_change=functools.partial(_after_write, context),
+                lifecycle=context.lifecycle,
+            )
+            logger.info(f"Memory compaction: {json.dumps(report)}")
+        except Exception as e:
+            logger.warning(f"Memory compaction failed: {e}")
+
+async def _sweep_periodically(context: Mem0Context, interval: float):
+    """Delete expired memories and archive cold ones every interval seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        if not await _is_leader(context, "lifecycle", interval):
+            continue
+        try:
+            report = await context.dispatcher.run("lifecycle", sweep, context.mem0_client, context.lifecycle)
+            for scope in report.pop("changed_scopes"):
+                _after_write(context, scope)
+            logger.info(f"Memory lifecycle sweep: {json.dumps(report)}")
+        except Exception as e:
+            logger.warning(f"Memory lifecycle sweep failed: {e}")
+
+async def _switch_client(context: Mem0Context) -> "Memory":
+    """Build a client on the collection the embedding registry now marks active and serve from it.
+
+    Returns:
+        The previous client, whose vector store the caller closes once nothing uses it
+    """
+    loop = asyncio.get_running_loop()
+    mem0_client = await loop.run_in_executor(
+        None, functools.partial(get_mem0_client, embedding_cache=context.embedding_cache)
+    )
+    instrument_memory(mem0_client)
+    await loop.run_in_executor(None, _prepare_vector_store, mem0_client)
+    previous = context.mem0_client
+    context.mem0_client = mem0_client
+    context.db_pool = _vector_store_pool(mem0_client)
+    if context.save_batcher is not None:
+        context.save_batcher.memory = mem0_client
+    # Cached results hold the ids and scores of the old collection
+    if context.search_cache is not None:
+        context.search_cache.clear()
+    logger.info(f"Now serving {mem0_client.collection_name}")
+    return previous
+
+async def _reembed_in_background(context: Mem0Context, settings: dict):
+    """Re-embed the served collection with the configured model, then switch to it.
+
+    Writes that reach the old collection while the switch happens are copied
+    over by a catch-up pass, REEMBED_POLL_SECONDS after it, when the other
+    worker processes have switched too.
+    """
+    target = context.mem0_client.embedding_target
+    registry = await asyncio.to_thread(open_registry)
+    try:
+        embedder = await asyncio.to_thread(build_embedder, target)
+        job = await context.dispatcher.run(
+            "reembed", Reembedder, context.mem0_client.vector_store, target, embedder, registry,
+            settings["batch_size"], settings["rate"],
+        )
+        if not await asyncio.to_thread(job.claim):
+            logger.info(f"Another process is re-embedding into {job.name}; waiting for its cutover")
+            return
+        logger.info(f"Re-embedding {context.mem0_client.collection_name} into {job.name}")
+        while await context.dispatcher.run("reembed", job.run_batch):
+            await asyncio.sleep(job.pause())
+        await context.dispatcher.run("reembed", job.finish)
+        previous = await _switch_client(context)
+        await asyncio.sleep(settings["poll_seconds"])
+        synced = await context.dispatcher.run(
+            "reembed", job.catch_up, previous.vector_store, context.mem0_client.vector_store
+        )
+        logger.info(f"Copied {synced} memories written during the switch to {job.name}")
+        close = getattr(previous.vector_store, "close", None)
+        if close is not None:
+            await asyncio.to_thread(close)
+    except Exception as e:
+        logger.warning(f"Re-embedding failed, it resumes from its checkpoint on the next start: {e}")
+    finally:
+        await asyncio.to_thread(registry.close)
+
+async def _watch_cutover(context: Mem0Context, interval: float):
+    """Switch to the new model's collection once a re-embedding elsewhere has made it active."""
+    served = context.mem0_client.collection_name
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            registry = await asyncio.to_thread(open_registry)
+            try:
+                active = await asyncio.to_thread(registry.active)
+            finally:
+                registry.close()
+            if context.mem0_client.collection_name != served:
+                # This process ran the re-embedding and has switched already
+                return
+            if active is None or active["collection"] == served:
+                continue
+            previous = await _switch_client(context)
+            close = getattr(previous.vector_store, "close", None)
+            if close is not None:
+                # Calls that already hold the old client finish against the old store first
+                await asyncio.sleep(interval)
+                await asyncio.to_thread(close)
+            return
+        except Exception as e:
+            logger.warning(f"Could not check the embedding registry: {e}")
+
+def _vector_store_pool(mem0_client: "Memory") -> "InstrumentedQueuePool | None":
+    engine = getattr(getattr(mem0_client.vector_store, "db", None), "engine", None)
+    pool = getattr(engine, "pool", None)
+    if pool is None:
+        return None
+    from db_pool import InstrumentedQueuePool
+
+    return pool if isinstance(pool, InstrumentedQueuePool) else None
+
+def _prepare_vector_store(mem0_client: "Memory"):
+    """Tune searches and add missing indexes on the pgvector table; a failure only costs search speed."""
+    collection = getattr(mem0_client.vector_store, "collection", None)
+    if collection is None or not hasattr(collection, "table"):
+        return
+    apply_search_params(
+        collection, probes=env_int("VECTOR_INDEX_PROBES", 10), ef_search=env_int("VECTOR_INDEX_EF_SEARCH", 40)
+    )
+    if env_bool("VECTOR_METADATA_INDEX", True):
+        try:
+            created = ensure_scope_indexes(collection)
+            if created:
+                logger.info(f"Created vector store indexes: {', '.join(created)}")
+        except Exception as e:
+            logger.warning(f"Could not create vector store indexes: {e}")
+    if env_bool("HYBRID_FULLTEXT_INDEX", True):
+        try:
+            ensure_fulltext_index(collection, get_hybrid_settings()["ts_config"])
+        except Exception as e:
+            logger.warning(f"Could not create the full-text index: {e}")
+    codec = getattr(mem0_client.vector_store, "codec", None)
+    if codec is not None:
+        from quantization import describe_pg_encoding, ensure_pg_encoded_index
+
+        try:
+            if env_bool("VECTOR_INDEX_ON_STARTUP", False):
+                settings = get_ann_index_settings()
+                encoded = ensure_pg_encoded_index(collection, codec, settings["m"], settings["ef_construction"])
+            else:
+                encoded = describe_pg_encoding(collection, codec)
+            if encoded["index"] is None:
+                logger.warning(f"No {codec.name} index yet, searches scan the table; run mem0-encode migrate")
+        except Exception as e:
+            logger.warning(f"Could not check the {codec.name} index: {e}")
+    elif env_bool("VECTOR_INDEX_ON_STARTUP", False):
+        try:
+            index = ensure_ann_index(collection, **get_ann_index_settings())
+            logger.info(f"Vector index {index['name']} ({index['index_bytes']} bytes, rebuilt: {index['rebuilt']})")
+        except Exception as e:
+            logger.warning(f"Could not build the vector index: {e}")
+
+async def _start_client(context: Mem0Context):
+    """Build the Mem0 client and start everything that needs it; runs as context.startup_task."""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    timings = {}
+    # Create the Memory client with the helper function in utils.py
+    mem0_client = await loop.run_in_executor(
+        None, functools.partial(get_mem0_client, embedding_cache=context.embedding_cache)
+    )
+    built = time.perf_counter()
+    timings["client_s"] = round(built - started, 3)
+    instrument_memory(mem0_client)
+    await loop.run_in_executor(None, _prepare_vector_store, mem0_client)
+    timings["vector_store_s"] = round(time.perf_counter() - built, 3)
+    db_pool = _vector_store_pool(mem0_client)
+    if db_pool is not None:
+        from db_pool import warm_up_pool
+
+        # Open the pooled connections now rather than on the first searches after a deploy
+        warmed = await loop.run_in_executor(
+            None, warm_up_pool, mem0_client.vector_store.db.engine, env_int("DB_POOL_WARMUP", db_pool.size())
+        )
+        logger.info(f"Warmed up {warmed} database connections")
+    context.mem0_client = mem0_client
+    context.db_pool = db_pool
+    batch_window = env_float("SAVE_BATCH_WINDOW_MS", 0) / 1000
+    if batch_window > 0:
+        context.save_batcher = SaveBatcher(
+            context.dispatcher, mem0_client, window=batch_window, max_batch_size=get_save_batch_size()
+        )
+    compaction_interval = env_float("COMPACTION_INTERVAL", 0)
+    if compaction_interval > 0:
+        context.compaction_task = asyncio.create_task(_compact_periodically(context, compaction_interval))
+    lifecycle_interval = env_float("LIFECYCLE_INTERVAL", 0)
+    if context.lifecycle is not None and lifecycle_interval > 0:
+        context.lifecycle_task = asyncio.create_task(_sweep_periodically(context, lifecycle_interval))
+    if getattr(mem0_client, "embedding_target", None) is not None:
+        reembed = get_reembed_settings()
+        if reembed["on_startup"]:
+            context.reembed_task = asyncio.create_task(_reembed_in_background(context, reembed))
+        if reembed["poll_seconds"] > 0:
+            context.cutover_task = asyncio.create_task(_watch_cutover(context, reembed["poll_seconds"]))
+    timings["ready_s"] = round(time.perf_counter() - started, 3)
+    context.startup_timings = timings
+    logger.info(f"Mem0 client ready: {json.dumps(timings)}")
+
+async def _ready(context: Mem0Context) -> Mem0Context:
+    """Wait until the Mem0 client is built, starting (or retrying a failed) build if needed.
+
+    Raises:
+        TimeoutError: The client is not ready after STARTUP_WAIT_TIMEOUT seconds
+    """
+    task = context.startup_task
+    if task is None or (task.done() and not task.cancelled() and task.exception() is not None):
+        context.startup_task = task = asyncio.create_task(_start_client(context))
+    if not task.done():
+        timeout = env_float("STARTUP_WAIT_TIMEOUT", 60.0)
+        try:
+            # Shielded so a caller giving up does not cancel the build for everyone else
+            await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"the memory backend is still starting after {timeout:g}s; try again shortly")
+    task.result()
+    return context
+
+async def _open_context() -> Mem0Context:
+    """Set up the worker pool, caches and the deferred save queue, and start building the Mem0 client.
+
+    With MEM0_CLIENT_INIT=background (the default) the client is built in the
+    background, so the MCP handshake completes while mem0 is imported and the
+    database is reached; "lazy" waits for the first tool call (or queued save)
+    and "eager" builds it before the server answers anything.
+    """
+    dispatcher = get_dispatcher()
+    # Worker processes of a multi-worker HTTP server share caches and the save queue
+    shared = get_shared_backend("local" if get_http_workers() > 1 else "none")
+    embedding_cache = get_embedding_cache(shared)
+    save_queue = get_save_queue(shared)
+
+    async def save_queued(item):
+        # Starts the client build if nothing has yet (MEM0_CLIENT_INIT=lazy, or after a failed start)
+        await _ready(context)
+        return await _save_text(context, item["text"], item["scope"], item["mode"], item["metadata"])
+
+    save_worker = SaveQueueWorker(
+        save_queue, save_queued, concurrency=env_int("SAVE_QUEUE_WORKERS", 2),
+        stale_after=env_float("SAVE_QUEUE_STALE_AFTER", 600.0 if shared is not None else 0.0),
+    )
+    context = Mem0Context(
+        dispatcher=dispatcher,
+        save_queue=save_queue,
+        save_worker=save_worker,
+        save_mode=os.getenv("SAVE_MODE", "sync"),
+        embedding_cache=embedding_cache,
+        search_cache=get_search_cache(shared),
+        lifecycle=get_lifecycle_store(),
+        shared=shared,
+        admission=get_admission_controller(),
+    )
+    # Deferred saves, including tickets left over from a previous run, are worked off from the start
+    save_worker.start()
+    init = os.getenv("MEM0_CLIENT_INIT", "background")
+    if init != "lazy":
+        context.startup_task = asyncio.create_task(_start_client(context))
+    if init == "eager":
+        await context.startup_task
+    REGISTRY.set_collector("context", context_collector(context))
+    return context
+
+async def _close_context(context: Mem0Context):
+    """Drain deferred saves, then release the worker pool and the queue database."""
+    REGISTRY.set_collector("context", None)
+    if context.startup_task is not None and not context.startup_task.done():
+        context.startup_task.cancel()
+    if context.startup_task is not None:
+        await asyncio.gather(context.startup_task, return_exceptions=True)
+    for task in (context.compaction_task, context.lifecycle_task, context.reembed_task, context.cutover_task):
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    # Without a client the queued saves cannot be made now; they stay queued for the next start
+    drain_timeout = env_float("SAVE_QUEUE_DRAIN_TIMEOUT", 30.0) if context.mem0_client is not None else 0
+    await context.save_worker.drain(timeout=drain_timeout)
+    if context.save_batcher is not None:
+        await context.save_batcher.close()
+    # Let calls that are already running finish before the pool goes away
+    await asyncio.get_running_loop().run_in_executor(None, context.dispatcher.shutdown)
+    context.save_queue.close()
+    if context.lifecycle is not None:
+        context.lifecycle.close()
+    if context.mem0_client is not None:
+        close_vector_store = getattr(context.mem0_client.vector_store, "close", None)
+        if close_vector_store is not None:
+            await asyncio.get_running_loop().run_in_executor(None, close_vector_store)
+    if context.embedding_cache is not None:
+        context.embedding_cache.close()
+    if context.shared is not None:
+        context.shared.close()
+
+# The SSE transport enters the lifespan once per connected client, so the
+# context is shared and reference counted: every session uses the same Mem0
+# client and the same worker pool, which is what makes the per-operation
+# limits hold across clients.
+_shared_context: Mem0Context | None = None
+_shared_context_users = 0
+_shared_context_lock = asyncio.Lock()
 
 @asynccontextmanager
 async def mem0_lifespan(server: FastMCP) -> AsyncIterator[Mem0Context]:
@@ -30,16 +440,24 @@ async def mem0_lifespan(server: FastMCP) -> AsyncIterator[Mem0Context]:
         server: The FastMCP server instance
         
     Yields:
-        Mem0Context: The context containing the Mem0 client
+        Mem0Context: The context containing the Mem0 client, the worker pool and the save queue
     """
-    # Create and return the Memory client with the helper function in utils.py
-    mem0_client = get_mem0_client()
-    
+    global _shared_context, _shared_context_users
+
+    async with _shared_context_lock:
+        if _shared_context is None:
+            _shared_context = await _open_context()
+        _shared_context_users += 1
+        context = _shared_context
+
     try:
-        yield Mem0Context(mem0_client=mem0_client)
+        yield context
     finally:
-        # No explicit cleanup needed for the Mem0 client
-        pass
+        async with _shared_context_lock:
+            _shared_context_users -= 1
+            if _shared_context_users == 0:
+                _shared_context = None
+                await _close_context(context)
 
 # Initialize FastMCP server with the Mem0 client as context
 mcp = FastMCP(
@@ -51,7 +469,18 @@ mcp = FastMCP(
 )        
 
 @mcp.tool()
-async def save_memory(ctx: Context, text: str) -> str:
+@instrument_tool
+@admission_controlled
+async def save_memory(
+    ctx: Context,
+    text: str,
+    deferred: bool | None = None,
+    mode: str | None = None,
+    ttl_seconds: int | None = None,
+    user_id: str | None = None,
+    agent_id: str | None = None,
+    run_id: str | None = None,
+) -> str:
     """Save information to your long-term memory.
 
     This tool is designed to store any type of information that might be useful in the future.
@@ -60,40 +489,419 @@ async def save_memory(ctx: Context, text: str) -> str:
     Args:
         ctx: The MCP server provided context which includes the Mem0 client
         text: The content to store in memory, including any relevant details and context
+        deferred: Queue the save and return a ticket ID immediately instead of waiting for
+            the memory to be processed (defaults to the server's SAVE_MODE)
+        mode: "infer" extracts facts with the LLM, "raw" stores the text verbatim (fast; use for
+            notes that are already single facts), "auto" decides per text (defaults to SAVE_INFER_MODE)
+        ttl_seconds: Forget the memory after this many seconds; use for short-lived context such as
+            the current task (defaults to MEMORY_TTL_SECONDS, 0 keeps it forever)
+        user_id: Save for this user instead of the connection's or server's default
+        agent_id: Save for this agent
+        run_id: Save for this run / session
     """
     try:
-        mem0_client = ctx.request_context.lifespan_context.mem0_client
-        messages = [{"role": "user", "content": text}]
-        mem0_client.add(messages, user_id=DEFAULT_USER_ID)
+        context = ctx.request_context.lifespan_context
+        mode = mode or os.getenv("SAVE_INFER_MODE", "infer")
+        if mode not in SAVE_MODES:
+            return f"Error saving memory: unknown mode {mode}; use infer, raw or auto"
+        filters = resolve_scope(ctx, user_id, agent_id, run_id).filters()
+        if ttl_seconds is None:
+            ttl_seconds = get_lifecycle_settings()["default_ttl"]
+        metadata = expiry_metadata(ttl_seconds) or None
+        if deferred is None:
+            deferred = context.save_mode == "deferred"
+        if deferred:
+            ticket_id = await asyncio.to_thread(context.save_queue.enqueue, text, filters, mode, metadata)
+            context.save_worker.notify()
+            return f"Queued memory for saving (ticket: {ticket_id}). Use get_save_status to check on it."
+        await _ready(context)
+        result = await _save_text(context, text, filters, mode, metadata)
+        if result.get("status") == "duplicate":
+            return f"Memory already stored (id: {result['id']}); nothing saved"
         return f"Successfully saved memory: {text[:100]}..." if len(text) > 100 else f"Successfully saved memory: {text}"
     except Exception as e:
+        record_error(e)
         return f"Error saving memory: {str(e)}"
 
 @mcp.tool()
-async def get_all_memories(ctx: Context) -> str:
-    """Get all stored memories for the user.
+@instrument_tool
+@admission_controlled
+async def save_memories(
+    ctx: Context,
+    texts: list[str],
+    infer: bool = True,
+    mode: str | None = None,
+    ttl_seconds: int | None = None,
+    user_id: str | None = None,
+    agent_id: str | None = None,
+    run_id: str | None = None,
+) -> str:
+    """Save many pieces of information to your long-term memory in one call.
+
+    Prefer this over calling save_memory repeatedly: the texts are processed in groups that
+    share one extraction prompt and one batched embedding request, which is much faster.
+
+    Args:
+        ctx: The MCP server provided context which includes the Mem0 client
+        texts: The contents to store, one memory per entry
+        infer: Extract facts with the LLM (default) or store each text verbatim
+        mode: "infer", "raw" or "auto" (decide per text whether extraction is needed); overrides infer
+        ttl_seconds: Forget the memories after this many seconds (defaults to MEMORY_TTL_SECONDS)
+        user_id: Save for this user instead of the connection's or server's default
+        agent_id: Save for this agent
+        run_id: Save for this run / session
+
+    Returns a JSON object with a per-item result (in input order) and the memories that
+    were added, updated or deleted.
+    """
+    try:
+        context = await _ready(ctx.request_context.lifespan_context)
+        if mode is not None and mode not in SAVE_MODES:
+            return f"Error saving memories: unknown mode {mode}; use infer, raw or auto"
+        filters = resolve_scope(ctx, user_id, agent_id, run_id).filters()
+        if ttl_seconds is None:
+            ttl_seconds = get_lifecycle_settings()["default_ttl"]
+        metadata = expiry_metadata(ttl_seconds) or None
+        batch_size = get_save_batch_size()
+        batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+        outcomes = await asyncio.gather(
+            *(
+                context.dispatcher.run("add", ingest_batch, context.mem0_client, batch, filters, infer, mode, metadata)
+                for batch in batches
+            ),
+            return_exceptions=True,
+        )
+        _after_write(context, filters)
+        items, events = [], []
+        for batch_number, (batch, outcome) in enumerate(zip(batches, outcomes)):
+            if isinstance(outcome, Exception):
+                batch_items = [{"status": "error", "error": str(outcome)} for _ in batch]
+            else:
+                batch_items = outcome["items"]
+                events.extend(outcome["events"])
+            for item in batch_items:
+                items.append({"index": len(items), "batch": batch_number, **item})
+        failed = sum(1 for item in items if item["status"] == "error")
+        return json.dumps({"succeeded": len(items) - failed, "failed": failed, "items": items, "memories": events})
+    except Exception as e:
+        record_error(e)
+        return f"Error saving memories: {str(e)}"
+
+@mcp.tool()
+@instrument_tool
+async def set_memory_scope(
+    ctx: Context,
+    user_id: str | None = None,
+    agent_id: str | None = None,
+    run_id: str | None = None,
+) -> str:
+    """Set the user, agent and run that later memory calls on this connection default to.
+
+    Tool arguments and request metadata still take precedence over this scope. Ids left
+    empty fall back to the server's defaults. Not available on the stateless streamable-http
+    transport, where every request is a new connection.
+
+    Args:
+        ctx: The MCP server provided context
+        user_id: The user whose memories to read and write
+        agent_id: The agent whose memories to read and write
+        run_id: The run / session whose memories to read and write
+    """
+    try:
+        set_session_scope(ctx, user_id, agent_id, run_id)
+        return json.dumps(resolve_scope(ctx).filters())
+    except Exception as e:
+        record_error(e)
+        return f"Error setting memory scope: {str(e)}"
+
+@mcp.tool()
+@instrument_tool
+async def get_save_status(ctx: Context, ticket_id: str) -> str:
+    """Check on a memory that was queued with a deferred save_memory call.
+
+    Args:
+        ctx: The MCP server provided context which includes the save queue
+        ticket_id: The ticket ID returned by save_memory
+
+    Returns the ticket's status (pending, processing, done or failed) as JSON, with the
+    number of attempts, the last error and, once done, the memories Mem0 stored.
+    """
+    try:
+        context = ctx.request_context.lifespan_context
+        status = await asyncio.to_thread(context.save_queue.status, ticket_id)
+        if status is None:
+            return f"Error checking save status: unknown ticket {ticket_id}"
+        return json.dumps(status, indent=2)
+    except Exception as e:
+        record_error(e)
+        return f"Error checking save status: {str(e)}"
+
+@mcp.tool()
+@instrument_tool
+async def get_cache_stats(ctx: Context) -> str:
+    """Report hit/miss counters for the server's caches.
+
+    Args:
+        ctx: The MCP server provided context which includes the caches
+
+    Returns a JSON object with one entry per enabled cache.
+    """
+    try:
+        context = ctx.request_context.lifespan_context
+        stats = {}
+        if context.embedding_cache is not None:
+            stats["embedding_cache"] = context.embedding_cache.stats()
+        if context.search_cache is not None:
+            stats["search_cache"] = context.search_cache.stats()
+        return json.dumps(stats, indent=2)
+    except Exception as e:
+        record_error(e)
+        return f"Error retrieving cache stats: {str(e)}"
+
+@mcp.tool()
+@instrument_tool
+async def get_pool_stats(ctx: Context) -> str:
+    """Report database connection pool usage: checkouts, new connections and time spent waiting.
+
+    Args:
+        ctx: The MCP server provided context which includes the connection pool
+
+    Returns a JSON object with the pool counters, or an error if the vector store has no pool.
+    """
+    try:
+        context = await _ready(ctx.request_context.lifespan_context)
+        if context.db_pool is None:
+            return "Error retrieving pool stats: the vector store does not use a database connection pool"
+        return json.dumps(context.db_pool.stats(), indent=2)
+    except Exception as e:
+        record_error(e)
+        return f"Error retrieving pool stats: {str(e)}"
+
+@mcp.tool()
+@instrument_tool
+@admission_controlled
+async def get_all_memories(
+    ctx: Context,
+    limit: int = 50,
+    cursor: str | None = None,
+    since: str | None = None,
+    fields: str = "id,memory,created_at",
+    user_id: str | None = None,
+    agent_id: str | None = None,
+    run_id: str | None = None,
+    max_chars: int | None = None,
+    max_tokens: int | None = None,
+    max_result_chars: int | None = None,
+) -> str:
+    """Get all stored memories for the user, one page at a time.
     
     Call this tool when you need complete context of all previously memories.
+    Keep calling it with the returned next_cursor until next_cursor is null to read everything.
 
     Args:
         ctx: The MCP server provided context which includes the Mem0 client
+        limit: Maximum number of memories per page (default: 50)
+        cursor: The next_cursor value from the previous page; omit for the first page
+        since: Only return memories created at or after this ISO 8601 timestamp
+        fields: Comma separated fields to include for each memory (default: id,memory,created_at).
+            Available: id, memory, hash, created_at, updated_at, user_id, agent_id, run_id, metadata
+        user_id: List this user's memories instead of the connection's or server's default
+        agent_id: Only list memories of this agent
+        run_id: Only list memories of this run / session
+        max_chars: End the page early once the response would exceed this many characters
+        max_tokens: End the page early once the response would exceed about this many tokens
+        max_result_chars: Shorten each memory text to at most this many characters
 
-    Returns a JSON formatted list of all stored memories, including when they were created
-    and their content. Results are paginated with a default of 50 items per page.
+    Returns a compact JSON object {"memories": [...], "next_cursor": ...}, ordered from oldest to newest.
+    Shortened memories are marked "truncated": true; get_memories returns their full text.
     """
     try:
-        mem0_client = ctx.request_context.lifespan_context.mem0_client
-        memories = mem0_client.get_all(user_id=DEFAULT_USER_ID)
-        if isinstance(memories, dict) and "results" in memories:
-            flattened_memories = [memory["memory"] for memory in memories["results"]]
-        else:
-            flattened_memories = memories
-        return json.dumps(flattened_memories, indent=2)
+        context = await _ready(ctx.request_context.lifespan_context)
+        selected_fields = parse_fields(fields)
+        filters = resolve_scope(ctx, user_id, agent_id, run_id).filters()
+        memories, next_cursor = await context.dispatcher.run(
+            "get_all", page_memories, context.mem0_client, filters,
+            limit=max(1, limit), cursor=cursor, since=since,
+        )
+        entries = [project(memory, selected_fields) for memory in memories]
+        defaults = get_budget_settings()
+        budget = char_budget(
+            max_chars if max_chars is not None else defaults["max_chars"],
+            max_tokens if max_tokens is not None else defaults["max_tokens"],
+        )
+        max_result_chars = max_result_chars if max_result_chars is not None else defaults["max_result_chars"]
+        if budget is None and not max_result_chars:
+            return json.dumps({"memories": entries, "next_cursor": next_cursor}, separators=(",", ":"))
+        # The page ends at the first memory that does not fit, so the next page resumes there
+        longest_cursor = encode_cursor(memories[-1]["created_at"], memories[-1]["id"]) if memories else None
+        envelope = len(dumps({"memories": [], "next_cursor": longest_cursor})) - len("[]")
+        packed, omitted = pack(
+            entries, budget, max_result_chars=max_result_chars, stop_at_overflow=True, envelope=envelope,
+        )
+        if omitted:
+            last = memories[len(packed) - 1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        return dumps({"memories": packed, "next_cursor": next_cursor})
     except Exception as e:
+        record_error(e)
         return f"Error retrieving memories: {str(e)}"
 
 @mcp.tool()
-async def search_memories(ctx: Context, query: str, limit: int = 3) -> str:
+@instrument_tool
+@admission_controlled
+async def get_memories(
+    ctx: Context,
+    memory_ids: list[str],
+    fields: str = "id,memory,created_at",
+    user_id: str | None = None,
+    agent_id: str | None = None,
+    run_id: str | None = None,
+) -> str:
+    """Get memories by id with their full text.
+
+    Call this tool for results that search_memories or get_all_memories returned with "truncated": true
+    when the shortened text is not enough.
+
+    Args:
+        ctx: The MCP server provided context which includes the Mem0 client
+        memory_ids: Ids of the memories to fetch
+        fields: Comma separated fields to include for each memory (default: id,memory,created_at).
+            Available: id, memory, hash, created_at, updated_at, user_id, agent_id, run_id, metadata
+        user_id: Fetch this user's memories instead of the connection's or server's default
+        agent_id: Only return memories of this agent
+        run_id: Only return memories of this run / session
+
+    Returns a compact JSON object {"memories": [...], "missing": [...]}; missing lists the ids that
+    do not exist, have expired or belong to another scope.
+    """
+    try:
+        context = await _ready(ctx.request_context.lifespan_context)
+        selected_fields = parse_fields(fields)
+        filters = resolve_scope(ctx, user_id, agent_id, run_id).filters()
+        memories, missing = await context.dispatcher.run(
+            "get_all", fetch_memories, context.mem0_client, memory_ids, filters
+        )
+        response = {"memories": [project(memory, selected_fields) for memory in memories], "missing": missing}
+        return json.dumps(response, separators=(",", ":"))
+    except Exception as e:
+        record_error(e)
+        return f"Error retrieving memories: {str(e)}"
+
+async def _run_search(context: Mem0Context, query: str, filters: dict, limit: int, mode: str):
+    """Run one search without the cache; returns Mem0-style results and the stage timings."""
+    if mode == "hybrid":
+        items, timings = await hybrid_search(context.dispatcher, context.mem0_client, query, filters, limit)
+        return {"results": items}, timings
+    started = time.perf_counter()
+    memories = await context.dispatcher.run("search", context.mem0_client.search, query, limit=limit, **filters)
+    elapsed = round((time.perf_counter() - started) * 1000, 2)
+    return memories, {"vector_ms": elapsed, "total_ms": elapsed}
+
+async def _cached_search(context: Mem0Context, query: str, filters: dict, limit: int, mode: str = "vector"):
+    """Search through the result cache, falling back to Mem0 on a miss; returns (results, timings)."""
+    cache = context.search_cache
+    if cache is None:
+        return await _run_search(context, query, filters, limit, mode)
+
+    generation = cache.generation(filters)
+    memories = cache.get(filters, query, limit, mode)
+    if memories is not None:
+        return memories, {"cache": "hit"}
+    query_vector = None
+    if cache.similarity_threshold:
+        # Served by the embedding cache when Mem0 embeds the same query below
+        query_vector = await context.dispatcher.run(
+            "search", context.mem0_client.embedding_model.embed, query, "search"
+        )
+        memories = cache.get_similar(filters, limit, query_vector, mode)
+        if memories is not None:
+            return memories, {"cache": "similar_hit"}
+    memories, timings = await _run_search(context, query, filters, limit, mode)
+    cache.put(filters, query, limit, memories, generation, query_vector, mode)
+    return memories, timings
+
+async def _search_unexpired(context: Mem0Context, query: str, filters: dict, candidates: int, mode: str,
+                           found: tuple | None = None):
+    """Search for candidates memories, widening the search while expired ones take up its results.
+
+    Mem0 cuts the results to the requested number before _apply_lifecycle can drop expired
+    memories, and those stay in the vector store until a lifecycle sweep deletes them.
+
+    Args:
+        found: (results, timings) of a search for candidates that already ran, e.g. as part of a batch
+
+    Returns:
+        tuple: (Mem0-style results with at least candidates unexpired memories where the scope has
+        them, timings)
+    """
+    wanted = candidates
+    max_candidates = max(candidates, get_lifecycle_settings()["max_candidates"])
+    if found is None:
+        found = await _cached_search(context, query, filters, candidates, mode)
+    memories, timings = found
+    while isinstance(memories, dict) and "results" in memories and candidates < max_candidates:
+        results = memories["results"]
+        expired = sum(1 for item in results if is_expired(item))
+        # Fewer results than asked for means the scope has no more memories
+        if len(results) < candidates or len(results) - expired >= wanted:
+            break
+        candidates = min(max_candidates, candidates * 2)
+        memories, timings = await _cached_search(context, query, filters, candidates, mode)
+        timings = {**timings, "widened_to": candidates}
+    return memories, timings
+
+async def _apply_lifecycle(context: Mem0Context, results: list, query: str, filters: dict, limit: int, mode: str,
+                           include_archived: bool, timings: dict) -> list:
+    """Drop expired memories, rank by recency and frequency of use, add archive hits and record the hits."""
+    settings = get_lifecycle_settings()
+    now = time.time()
+    results = [item for item in results if not is_expired(item, now)]
+    if mode == "vector":
+        # Scores become higher-is-better similarities, comparable with archive hits and across vector stores
+        vector_store = context.mem0_client.vector_store
+        for item in results:
+            item["score"] = score_similarity(vector_store, item.get("score"))
+    if context.lifecycle is not None and settings["decay_weight"] > 0:
+        stats = await asyncio.to_thread(context.lifecycle.access_stats, [item["id"] for item in results])
+        results = decay_rank(results, stats, settings, now=now)
+    results = results[:limit]
+    if include_archived and context.lifecycle is not None:
+        started = time.perf_counter()
+        archived = await context.dispatcher.run(
+            "search", search_archive, context.mem0_client, context.lifecycle, query, filters, limit,
+            restore=settings["restore_on_hit"],
+        )
+        timings["archive_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        timings["archived_hits"] = len(archived)
+        if archived and settings["restore_on_hit"]:
+            _after_write(context, filters)
+        if mode == "vector" and settings["decay_weight"] <= 0:
+            # Archive scores are cosine similarities, comparable with the hot results
+            results = sorted(results + archived, key=lambda item: item["score"] or 0.0, reverse=True)[:limit]
+        else:
+            results = results + archived
+    if context.lifecycle is not None:
+        await asyncio.to_thread(context.lifecycle.record_hits, [item["id"] for item in results])
+    return results
+
+@mcp.tool()
+@instrument_tool
+@admission_controlled
+async def search_memories(
+    ctx: Context,
+    query: str,
+    limit: int = 3,
+    user_id: str | None = None,
+    agent_id: str | None = None,
+    run_id: str | None = None,
+    mode: str | None = None,
+    include_archived: bool = False,
+    report_timings: bool = False,
+    max_chars: int | None = None,
+    max_tokens: int | None = None,
+    max_result_chars: int | None = None,
+    snippets: bool | None = None,
+) -> str:
     """Search memories using semantic search.
 
     This tool should be called to find relevant information from your memory. Results are ranked by relevance.
@@ -103,26 +911,314 @@ async def search_memories(ctx: Context, query: str, limit: int = 3) -> str:
         ctx: The MCP server provided context which includes the Mem0 client
         query: Search query string describing what you're looking for. Can be natural language.
         limit: Maximum number of results to return (default: 3)
+        user_id: Search this user's memories instead of the connection's or server's default
+        agent_id: Only search memories of this agent
+        run_id: Only search memories of this run / session
+        mode: "vector" for pure semantic search, or "hybrid" to also match exact words and
+            identifiers such as ticket numbers or hostnames (defaults to the server's SEARCH_MODE)
+        include_archived: Also search memories archived after going unused for a long time;
+            slower, so only set it when the regular search comes up empty
+        report_timings: Return {"memories": [...], "timings": {...}} with per-stage latencies
+        max_chars: Keep the response under this many characters, packing the best results first
+        max_tokens: Keep the response under about this many tokens, packing the best results first
+        max_result_chars: Shorten each memory text to at most this many characters
+        snippets: Shorten texts to the passage around the query terms instead of cutting their ends
+
+    With any of the size options (or the server's RESPONSE_* defaults) the response is a compact
+    {"results": [{"id", "score", "memory"}, ...], "omitted": n} instead of a list of texts; shortened
+    texts are marked "truncated": true and get_memories returns them in full.
     """
     try:
-        mem0_client = ctx.request_context.lifespan_context.mem0_client
-        memories = mem0_client.search(query, user_id=DEFAULT_USER_ID, limit=limit)
+        context = await _ready(ctx.request_context.lifespan_context)
+        mode = mode or os.getenv("SEARCH_MODE", "vector")
+        if mode not in ("vector", "hybrid"):
+            return f"Error searching memories: unknown mode {mode}; use vector or hybrid"
+        filters = resolve_scope(ctx, user_id, agent_id, run_id).filters()
+        settings = get_lifecycle_settings()
+        # Rank a larger candidate set when recency and frequency of use reorder the results
+        candidates = limit * max(1, settings["candidates"]) if settings["decay_weight"] > 0 else limit
+        memories, timings = await _search_unexpired(context, query, filters, candidates, mode)
+        timings = dict(timings)
         if isinstance(memories, dict) and "results" in memories:
-            flattened_memories = [memory["memory"] for memory in memories["results"]]
+            results = await _apply_lifecycle(
+                context, [dict(item) for item in memories["results"]], query, filters, limit, mode,
+                include_archived, timings,
+            )
+            flattened_memories = [memory["memory"] for memory in results]
         else:
+            results = None
             flattened_memories = memories
+        defaults = get_budget_settings()
+        budget = char_budget(
+            max_chars if max_chars is not None else defaults["max_chars"],
+            max_tokens if max_tokens is not None else defaults["max_tokens"],
+        )
+        max_result_chars = max_result_chars if max_result_chars is not None else defaults["max_result_chars"]
+        snippets = snippets if snippets is not None else defaults["snippets"]
+        if results is not None and (budget is not None or max_result_chars or snippets):
+            entries = [
+                {"id": item["id"], "score": round(item["score"], 4) if item.get("score") is not None else None,
+                 "memory": item["memory"]}
+                for item in results
+            ]
+            response = {"results": [], "omitted": len(entries)}
+            if report_timings:
+                response["timings"] = timings
+            envelope = len(dumps(response)) - len("[]")
+            response["results"], response["omitted"] = pack(
+                entries, budget, query=query if snippets else None, max_result_chars=max_result_chars,
+                envelope=envelope,
+            )
+            return dumps(response)
+        if report_timings:
+            return json.dumps({"memories": flattened_memories, "timings": timings}, indent=2)
         return json.dumps(flattened_memories, indent=2)
     except Exception as e:
+        record_error(e)
+        return f"Error searching memories: {str(e)}"
+
+async def _cached_searches(context: Mem0Context, queries: list[str], filters: dict, limit: int, mode: str):
+    """Search several queries through the result cache, embedding and looking up the misses together.
+
+    Returns:
+        tuple: (one Mem0-style result per query, timings)
+    """
+    if mode == "hybrid":
+        # Hybrid search embeds each query itself; the searches still run concurrently
+        outcomes = await asyncio.gather(*(_cached_search(context, query, filters, limit, mode) for query in queries))
+        return [memories for memories, _ in outcomes], {"searches": [timings for _, timings in outcomes]}
+    started = time.perf_counter()
+    cache = context.search_cache
+    generation = cache.generation(filters) if cache is not None else None
+    results = [cache.get(filters, query, limit, mode) if cache is not None else None for query in queries]
+    timings = {"cache_hits": sum(result is not None for result in results)}
+    misses = [index for index, result in enumerate(results) if result is None]
+    if misses:
+        stage_started = time.perf_counter()
+        # One provider request for every query the cache could not answer
+        vectors = await context.dispatcher.run(
+            "search", embed_batch, context.mem0_client.embedding_model, [queries[index] for index in misses], "search"
+        )
+        timings["embed_ms"] = round((time.perf_counter() - stage_started) * 1000, 2)
+        vectors = dict(zip(misses, vectors))
+        if cache is not None and cache.similarity_threshold:
+            for index in misses:
+                results[index] = cache.get_similar(filters, limit, vectors[index], mode)
+            misses = [index for index in misses if results[index] is None]
+            timings["similar_hits"] = len(vectors) - len(misses)
+    if misses:
+        stage_started = time.perf_counter()
+        if supports_multi_query(context.mem0_client):
+            found = await context.dispatcher.run(
+                "search", search_vectors, context.mem0_client, [vectors[index] for index in misses], filters, limit,
+                probes=env_int("VECTOR_INDEX_PROBES", 10), ef_search=env_int("VECTOR_INDEX_EF_SEARCH", 40),
+            )
+        else:
+            found = await asyncio.gather(*(
+                context.dispatcher.run(
+                    "search", search_vector, context.mem0_client, queries[index], vectors[index], filters, limit
+                )
+                for index in misses
+            ))
+        timings["vector_ms"] = round((time.perf_counter() - stage_started) * 1000, 2)
+        for index, memories in zip(misses, found):
+            results[index] = memories
+            if cache is not None:
+                cache.put(filters, queries[index], limit, memories, generation, vectors[index], mode)
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return results, timings
+
+@mcp.tool()
+@instrument_tool
+@admission_controlled
+async def search_memories_batch(
+    ctx: Context,
+    queries: list[str],
+    limit: int = 3,
+    user_id: str | None = None,
+    agent_id: str | None = None,
+    run_id: str | None = None,
+    mode: str | None = None,
+    include_archived: bool = False,
+    report_timings: bool = False,
+    max_chars: int | None = None,
+    max_tokens: int | None = None,
+    max_result_chars: int | None = None,
+    snippets: bool | None = None,
+) -> str:
+    """Run several memory searches in one call.
+
+    Call this tool instead of several search_memories calls in a row, e.g. to load the context for a
+    new task with a handful of related queries. A memory found by more than one query is returned once.
+
+    Args:
+        ctx: The MCP server provided context which includes the Mem0 client
+        queries: Search queries, each describing something you're looking for in natural language
+        limit: Maximum number of results per query (default: 3)
+        user_id: Search this user's memories instead of the connection's or server's default
+        agent_id: Only search memories of this agent
+        run_id: Only search memories of this run / session
+        mode: "vector" for pure semantic search, or "hybrid" to also match exact words and
+            identifiers such as ticket numbers or hostnames (defaults to the server's SEARCH_MODE)
+        include_archived: Also search memories archived after going unused for a long time
+        report_timings: Add per-stage latencies as "timings"
+        max_chars: Keep the response under this many characters, packing the best results first
+        max_tokens: Keep the response under about this many tokens, packing the best results first
+        max_result_chars: Shorten each memory text to at most this many characters
+        snippets: Shorten texts to the passage around the query terms instead of cutting their ends
+
+    Returns a compact JSON object {"results": [{"query", "hits": [{"id", "score"}, ...]}, ...],
+    "memories": [{"id", "memory"}, ...], "omitted": n}. hits are ranked by relevance per query and
+    refer to memories by id; memories holds each text once, those that rank highest for any query first.
+    Memories that do not fit the size options are left out of both and counted in omitted; shortened
+    texts are marked "truncated": true and get_memories returns them in full.
+    """
+    try:
+        context = await _ready(ctx.request_context.lifespan_context)
+        mode = mode or os.getenv("SEARCH_MODE", "vector")
+        if mode not in ("vector", "hybrid"):
+            return f"Error searching memories: unknown mode {mode}; use vector or hybrid"
+        # Repeated queries are searched once
+        distinct = list(dict.fromkeys(query for query in queries if query.strip()))
+        if not distinct:
+            return "Error searching memories: no queries given"
+        max_queries = get_multi_search_settings()["max_queries"]
+        if len(distinct) > max_queries:
+            return f"Error searching memories: {len(distinct)} queries, at most {max_queries} per call"
+        filters = resolve_scope(ctx, user_id, agent_id, run_id).filters()
+        settings = get_lifecycle_settings()
+        candidates = limit * max(1, settings["candidates"]) if settings["decay_weight"] > 0 else limit
+        found, timings = await _cached_searches(context, distinct, filters, candidates, mode)
+        found = [
+            memories for memories, _ in await asyncio.gather(*(
+                _search_unexpired(context, query, filters, candidates, mode, found=(memories, {}))
+                for query, memories in zip(distinct, found)
+            ))
+        ]
+        per_query = await asyncio.gather(*(
+            _apply_lifecycle(
+                context, [dict(item) for item in memories["results"]], query, filters, limit, mode,
+                include_archived, timings,
+            )
+            for query, memories in zip(distinct, found)
+        ))
+        hits, entries = merge_results(per_query)
+        defaults = get_budget_settings()
+        budget = char_budget(
+            max_chars if max_chars is not None else defaults["max_chars"],
+            max_tokens if max_tokens is not None else defaults["max_tokens"],
+        )
+        max_result_chars = max_result_chars if max_result_chars is not None else defaults["max_result_chars"]
+        snippets = snippets if snippets is not None else defaults["snippets"]
+        response = {
+            "results": [{"query": query, "hits": query_hits} for query, query_hits in zip(distinct, hits)],
+            "memories": [],
+            "omitted": 0,
+        }
+        if report_timings:
+            response["timings"] = timings
+        envelope = len(dumps(response)) - len("[]")
+        response["memories"], response["omitted"] = pack(
+            entries, budget, query=" ".join(distinct) if snippets else None, max_result_chars=max_result_chars,
+            envelope=envelope,
+        )
+        if response["omitted"]:
+            kept = {entry["id"] for entry in response["memories"]}
+            for result in response["results"]:
+                result["hits"] = [hit for hit in result["hits"] if hit["id"] in kept]
+        return dumps(response)
+    except Exception as e:
+        record_error(e)
         return f"Error searching memories: {str(e)}"
 
+def _sse_app():
+    """The Starlette app FastMCP.run_sse_async serves, plus the /metrics route."""
+    from mcp.server.sse import SseServerTransport
+    from starlette.applications import Starlette
+    from starlette.routing import Mount, Route
+
+    sse = SseServerTransport("/messages/")
+
+    async def handle_sse(request):
+        async with sse.connect_sse(request.scope, request.receive, request._send) as streams:
+            await mcp._mcp_server.run(streams[0], streams[1], mcp._mcp_server.create_initialization_options())
+
+    routes = [
+        Route("/sse", endpoint=handle_sse),
+        Mount("/messages/", app=sse.handle_post_message),
+        *_metrics_routes(),
+    ]
+    return Starlette(debug=mcp.settings.debug, routes=routes)
+
+def _metrics_routes():
+    from starlette.routing import Route
+
+    if not env_bool("METRICS_ENABLED", True):
+        return []
+    return [Route(os.getenv("METRICS_PATH", "/metrics"), endpoint=metrics_endpoint)]
+
+def http_app():
+    """The stateless streamable-HTTP app, plus the /metrics route.
+
+    Also the app factory every worker process imports when HTTP_WORKERS > 1.
+    """
+    return streamable_http_app(
+        mcp._mcp_server,
+        functools.partial(mem0_lifespan, mcp),
+        path=os.getenv("HTTP_PATH", "/mcp"),
+        routes=_metrics_routes(),
+        debug=mcp.settings.debug,
+    )
+
+def run_http_workers(factory: str = "main:http_app"):
+    """Serve the streamable-HTTP app from HTTP_WORKERS processes, each with its own event loop and Mem0 client."""
+    import uvicorn
+
+    uvicorn.run(
+        factory, factory=True, host=mcp.settings.host, port=int(mcp.settings.port),
+        workers=get_http_workers(), log_level=mcp.settings.log_level.lower(),
+    )
+
+def _metrics_app():
+    from starlette.applications import Starlette
+
+    return Starlette(routes=_metrics_routes())
+
+def _uvicorn_server(app, port):
+    import uvicorn
+
+    config = uvicorn.Config(app, host=mcp.settings.host, port=port, log_level=mcp.settings.log_level.lower())
+    return uvicorn.Server(config)
+
+async def _serve(app, port):
+    await _uvicorn_server(app, port).serve()
+
 async def main():
     transport = os.getenv("TRANSPORT", "sse")
     if transport == 'sse':
-        # Run the MCP server with sse transport
-        await mcp.run_sse_async()
+        # Run the MCP server with sse transport, serving /metrics on the same port
+        await _serve(_sse_app(), mcp.settings.port)
+    elif transport == "streamable-http":
+        # Stateless JSON-RPC over POST /mcp; HTTP_WORKERS > 1 is started by run_http_workers instead
+        await _serve(http_app(), int(mcp.settings.port))
     else:
-        # Run the MCP server with stdio transport
-        await mcp.run_stdio_async()
+        # Run the MCP server with stdio transport; stdout is the protocol stream,
+        # so metrics need a port of their own
+        metrics_port = env_int("METRICS_PORT", 0)
+        metrics_server = metrics_task = None
+        if metrics_port and env_bool("METRICS_ENABLED", True):
+            metrics_server = _uvicorn_server(_metrics_app(), metrics_port)
+            metrics_task = asyncio.create_task(metrics_server.serve())
+        try:
+            await mcp.run_stdio_async()
+        finally:
+            # The metrics port closes with the protocol stream
+            if metrics_server is not None:
+                metrics_server.should_exit = True
+                await asyncio.gather(metrics_task, return_exceptions=True)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if os.getenv("TRANSPORT") == "streamable-http" and get_http_workers() > 1:
+        run_http_workers()
+    else:
+        asyncio.run(main())
@@ -0,0 +1,401 @@
+"""
+Prometheus-style metrics and optional OpenTelemetry tracing.
+
+Every MCP tool is timed with ``instrument_tool`` and every Mem0 stage it goes
+through (LLM extraction, embedding, vector search, upsert ...) with ``stage``,
+so a slow ``save_memory`` can be attributed to the LLM, the embedder or the
+database. Queue depths, in-flight operations, cache hit ratios and connection
+pool usage are read from the shared Mem0Context when ``/metrics`` is scraped.
+
+The exposition format is written here rather than pulled in from
+prometheus_client, so the metrics cost no extra dependency. Spans are exported
+only when OTEL_EXPORTER_OTLP_ENDPOINT is set and the OpenTelemetry SDK and OTLP
+exporter are installed.
+"""
+from contextlib import contextmanager
+import asyncio
+import bisect
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+
+from failover import provider_stats
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans cache hits (sub-millisecond) up to slow LLM extractions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """A monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple((name, labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observations per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = tuple((name, labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        samples = []
+        for key, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", key + (("le", _format_value(float(bound))),), cumulative))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, cumulative))
+        return samples
+
+class MetricsRegistry:
+    """Holds the metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def set_collector(self, name, collect):
+        """Register (or replace, or with None remove) a callable read at scrape time.
+
+        The callable returns a list of (metric name, help text, type, [(labels dict, value), ...]).
+        """
+        with self._lock:
+            if collect is None:
+                self._collectors.pop(name, None)
+            else:
+                self._collectors[name] = collect
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        with self._lock:
+            collectors = list(self._collectors.items())
+        for collector_name, collect in collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                logger.warning(f"Metrics collector {collector_name} failed: {e}")
+                continue
+            for name, documentation, kind, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+TOOL_DURATION = REGISTRY.histogram(
+    "mem0_mcp_tool_duration_seconds", "Time spent in each MCP tool call.", ["tool"]
+)
+TOOL_CALLS = REGISTRY.counter(
+    "mem0_mcp_tool_calls_total", "MCP tool calls by outcome.", ["tool", "status"]
+)
+TOOL_ERRORS = REGISTRY.counter(
+    "mem0_mcp_tool_errors_total", "MCP tool calls that returned an error, by exception type.", ["tool", "error_type"]
+)
+STAGE_DURATION = REGISTRY.histogram(
+    "mem0_mcp_stage_duration_seconds", "Time spent in each Mem0 stage (extract, embed, search, upsert ...).", ["stage"]
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "mem0_mcp_stage_errors_total", "Mem0 stage calls that raised, by exception type.", ["stage", "error_type"]
+)
+
+# The tool call the current task (and the worker threads it dispatches to) runs for
+_current_call = contextvars.ContextVar("mem0_mcp_tool_call", default=None)
+
+_tracer = None
+_tracing_configured = False
+
+def get_tracer():
+    """Return an OpenTelemetry tracer when OTEL_EXPORTER_OTLP_ENDPOINT is set, otherwise None."""
+    global _tracer, _tracing_configured
+    if _tracing_configured:
+        return _tracer
+    _tracing_configured = True
+    if not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return None
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning(
+            "OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-sdk and "
+            "opentelemetry-exporter-otlp-proto-http are not installed; tracing is disabled"
+        )
+        return None
+    # The exporter reads the endpoint, headers and timeout from the standard OTEL_* variables
+    provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "mcp-mem0")}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("mcp-mem0")
+    return _tracer
+
+@contextmanager
+def _span(name, **attributes):
+    tracer = get_tracer()
+    if tracer is None:
+        yield None
+        return
+    with tracer.start_as_current_span(name, attributes=attributes) as span:
+        yield span
+
+def record_error(error):
+    """Count an exception a tool turned into an error message against the running tool call."""
+    call = _current_call.get()
+    if call is None:
+        return
+    call["error_type"] = type(error).__name__
+    TOOL_ERRORS.inc(tool=call["tool"], error_type=call["error_type"])
+
+def instrument_tool(func):
+    """Time an async MCP tool and count its calls, errors and error types.
+
+    Tools report failures as "Error ..." strings; those count as errors even when
+    the tool did not pass the exception to record_error.
+    """
+    tool = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        call = {"tool": tool, "error_type": None}
+        token = _current_call.set(call)
+        started = time.perf_counter()
+        try:
+            with _span(f"tool {tool}", **{"mcp.tool": tool}) as span:
+                result = await func(*args, **kwargs)
+                failed = call["error_type"] is not None or (isinstance(result, str) and result.startswith("Error"))
+                if failed and span is not None:
+                    span.set_attribute("error.type", call["error_type"] or "error_response")
+            return result
+        except BaseException as e:
+            failed = True
+            call["error_type"] = call["error_type"] or type(e).__name__
+            TOOL_ERRORS.inc(tool=tool, error_type=call["error_type"])
+            raise
+        finally:
+            _current_call.reset(token)
+            TOOL_DURATION.observe(time.perf_counter() - started, tool=tool)
+            if failed and call["error_type"] is None:
+                TOOL_ERRORS.inc(tool=tool, error_type="error_response")
+            TOOL_CALLS.inc(tool=tool, status="error" if failed else "ok")
+
+    return wrapper
+
+@contextmanager
+def stage(name):
+    """Time one Mem0 stage and count the exceptions it raises."""
+    started = time.perf_counter()
+    try:
+        with _span(f"stage {name}", **{"mem0.stage": name}):
+            yield
+    except Exception as e:
+        STAGE_ERRORS.inc(stage=name, error_type=type(e).__name__)
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - started, stage=name)
+
+def _timed(name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with stage(name):
+            return method(*args, **kwargs)
+
+    wrapper.__mem0_stage__ = name
+    return wrapper
+
+# (component attribute on Memory, method, stage name)
+MEMORY_STAGES = (
+    ("llm", "generate_response", "extract"),
+    ("embedding_model", "embed", "embed"),
+    ("embedding_model", "embed_batch", "embed"),
+    ("vector_store", "search", "search"),
+    ("vector_store", "lexical_search", "search"),
+    ("vector_store", "list", "list"),
+    ("vector_store", "insert", "upsert"),
+    ("vector_store", "update", "upsert"),
+    ("vector_store", "delete", "delete"),
+)
+
+def instrument_memory(memory):
+    """Time the LLM, embedder and vector store calls a Mem0 client makes, per stage."""
+    for component_name, method_name, stage_name in MEMORY_STAGES:
+        component = getattr(memory, component_name, None)
+        method = getattr(component, method_name, None)
+        if method is None or getattr(method, "__mem0_stage__", None):
+            continue
+        setattr(component, method_name, _timed(stage_name, method))
+    return memory
+
+def context_collector(context):
+    """Build a scrape-time collector for queue depths, cache hit ratios and pool usage of a Mem0Context."""
+
+    def collect():
+        families = [(
+            "mem0_mcp_ready", "1 once the Mem0 client is built and tools stop waiting for it.", "gauge",
+            [({}, 0 if context.mem0_client is None else 1)],
+        )]
+        if context.startup_timings:
+            families.append((
+                "mem0_mcp_startup_seconds", "Time spent building the Mem0 client, by phase.", "gauge",
+                [({"phase": phase.removesuffix("_s")}, seconds) for phase, seconds in context.startup_timings.items()],
+            ))
+        depth = context.save_queue.depth()
+        families.append((
+            "mem0_mcp_save_queue_items", "Deferred saves in the queue by status.", "gauge",
+            [({"status": status}, count) for status, count in depth.items()],
+        ))
+        operations = context.dispatcher.stats()["operations"]
+        families.append((
+            "mem0_mcp_operations_in_flight", "Mem0 calls running on the worker pool per operation.", "gauge",
+            [({"operation": operation}, stats["in_flight"]) for operation, stats in operations.items()],
+        ))
+        families.append((
+            "mem0_mcp_operations_waiting", "Mem0 calls waiting for a concurrency slot per operation.", "gauge",
+            [({"operation": operation}, stats["waiting"]) for operation, stats in operations.items()],
+        ))
+        if context.admission is not None:
+            admission = context.admission.stats()
+            families.append((
+                "mem0_mcp_admission_calls", "Tool calls running and queued under admission control.", "gauge",
+                [({"state": "running"}, admission["running"]), ({"state": "queued"}, admission["queued"])],
+            ))
+            families.append((
+                "mem0_mcp_admission_rejections_total", "Tool calls rejected by admission control by reason.", "counter",
+                [({"tool": entry["tool"], "reason": entry["reason"]}, entry["count"]) for entry in admission["rejected"]],
+            ))
+        caches = {}
+        if context.embedding_cache is not None:
+            caches["embedding"] = context.embedding_cache.stats()
+        if context.search_cache is not None:
+            caches["search"] = context.search_cache.stats()
+        if caches:
+            families.append((
+                "mem0_mcp_cache_hit_ratio", "Share of cache lookups answered from the cache.", "gauge",
+                [({"cache": cache}, stats["hit_rate"]) for cache, stats in caches.items()],
+            ))
+            families.append((
+                "mem0_mcp_cache_entries", "Entries held in memory per cache.", "gauge",
+                [({"cache": cache}, stats["entries"]) for cache, stats in caches.items()],
+            ))
+        groups = provider_stats(context.mem0_client) if context.mem0_client is not None else []
+        if groups:
+            families.append((
+                "mem0_mcp_provider_requests_total", "LLM and embedding provider requests by outcome.", "counter",
+                [({"kind": group["kind"], "provider": provider["provider"], "outcome": outcome}, provider[outcome])
+                 for group in groups for provider in group["providers"] for outcome in ("success", "failure", "timeout")],
+            ))
+            families.append((
+                "mem0_mcp_provider_circuit_open", "1 while a provider's circuit breaker is open.", "gauge",
+                [({"kind": group["kind"], "provider": provider["provider"]}, int(provider["state"] == "open"))
+                 for group in groups for provider in group["providers"]],
+            ))
+            families.append((
+                "mem0_mcp_provider_hedges_total", "Requests also sent to the next provider because the first was slow.",
+                "counter", [({"kind": group["kind"]}, group["hedges"]) for group in groups],
+            ))
+            families.append((
+                "mem0_mcp_provider_hedge_wins_total", "Hedged requests answered first by the backup provider.",
+                "counter", [({"kind": group["kind"]}, group["hedge_wins"]) for group in groups],
+            ))
+        if context.db_pool is not None:
+            pool = context.db_pool.stats()
+            families.append((
+                "mem0_mcp_db_pool_connections", "Database connections by state.", "gauge",
+                [({"state": "checked_out"}, pool["checked_out"]), ({"state": "checked_in"}, pool["checked_in"])],
+            ))
+            families.append((
+                "mem0_mcp_db_pool_checkouts_total", "Database connections checked out of the pool.", "counter",
+                [({}, pool["checkouts"])],
+            ))
+            families.append((
+                "mem0_mcp_db_pool_wait_seconds_total",
+                "Time spent queueing for a free pooled database connection, excluding opening new ones.", "counter",
+                [({}, pool["wait_seconds_total"])],
+            ))
+            families.append((
+                "mem0_mcp_db_pool_timeouts_total", "Connection checkouts that timed out.", "counter",
+                [({}, pool["timeouts"])],
+            ))
+        return families
+
+    return collect
+
+async def metrics_endpoint(request):
+    """Starlette endpoint serving REGISTRY in the Prometheus text format."""
+    from starlette.responses import PlainTextResponse
+
+    # Collectors read SQLite and pool state, so render off the event loop
+    body = await asyncio.to_thread(REGISTRY.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
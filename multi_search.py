@@ -0,0 +1,99 @@
+"""
+Several searches in one call, for agents that load their context with a handful of related queries.
+
+The queries are embedded in one batched provider request (served from the
+embedding cache where possible). On pgvector the lookups then run as one SQL
+statement that takes the nearest neighbours of every query vector through a
+LATERAL join, so each query still uses the ANN index. Other vector stores, and
+tables searched through a compact encoding, get one lookup per query, run
+concurrently on the worker pool by the caller.
+"""
+import json
+
+from pagination import to_memory_item
+from transfer import collection_of
+from utils import env_int
+
+def get_multi_search_settings():
+    return {"max_queries": env_int("SEARCH_BATCH_MAX_QUERIES", 20)}
+
+def _vector_text(vector):
+    return "[" + ",".join(repr(float(value)) for value in vector) + "]"
+
+def _result(memory_id, payload, score):
+    """A search hit in the shape Mem0's search returns."""
+    return {**to_memory_item(memory_id, payload or {}), "score": score}
+
+def supports_multi_query(memory):
+    """Whether search_vectors can answer every query with one SQL statement."""
+    return collection_of(memory.vector_store) is not None and getattr(memory.vector_store, "codec", None) is None
+
+def search_vectors(memory, vectors, filters, limit, probes=10, ef_search=40):
+    """Nearest neighbours of several query vectors with one pgvector statement.
+
+    Args:
+        memory: The Mem0 client; its vector store must pass supports_multi_query
+        vectors: The query vectors
+        filters: The user_id / agent_id / run_id to search in
+        limit: Hits per query
+        probes: IVFFlat lists to scan per query (VECTOR_INDEX_PROBES)
+        ef_search: HNSW candidate list size (VECTOR_INDEX_EF_SEARCH); raised to limit if smaller
+
+    Returns:
+        list: One Mem0-style {"results": [...]} per query vector, closest first
+    """
+    from sqlalchemy import text
+
+    collection = collection_of(memory.vector_store)
+    statement = text(
+        "SELECT queries.ordinal, hits.id, hits.distance, hits.metadata "
+        "FROM unnest(CAST(:vectors AS vector[])) WITH ORDINALITY AS queries(query_vec, ordinal) "
+        "CROSS JOIN LATERAL ("
+        f'SELECT id, vec <=> queries.query_vec AS distance, metadata FROM vecs."{collection.table.name}" '
+        "WHERE metadata @> CAST(:filters AS jsonb) ORDER BY vec <=> queries.query_vec LIMIT :limit"
+        ") AS hits ORDER BY queries.ordinal, hits.distance"
+    )
+    vector_array = "{" + ",".join(f'"{_vector_text(vector)}"' for vector in vectors) + "}"
+    results = [[] for _ in vectors]
+    with collection.client.Session() as session, session.begin():
+        # The same search parameters vecs' query sets; HNSW returns at most ef_search rows per query
+        session.execute(text(f"SET LOCAL ivfflat.probes = {int(probes)}"))
+        session.execute(text(f"SET LOCAL hnsw.ef_search = {max(int(ef_search), limit)}"))
+        rows = session.execute(statement, {"vectors": vector_array, "filters": json.dumps(filters), "limit": limit})
+        for ordinal, memory_id, distance, payload in rows:
+            results[ordinal - 1].append(_result(str(memory_id), payload, float(distance)))
+    return [{"results": items} for items in results]
+
+def search_vector(memory, query, vector, filters, limit):
+    """One lookup with an already embedded query, returned like Mem0's search."""
+    hits = memory.vector_store.search(query=query, vectors=vector, limit=limit, filters=filters)
+    return {"results": [_result(hit.id, hit.payload, hit.score) for hit in hits]}
+
+def merge_results(per_query):
+    """Per-query hit lists that reference each memory's text only once.
+
+    Args:
+        per_query: One ranked list of result items per query
+
+    Returns:
+        tuple: (per-query lists of {"id", "score"}, the distinct memories ordered by
+        their best rank across the queries, so the first ones are the ones that
+        matter to most queries)
+    """
+    best = {}
+    hits = []
+    for items in per_query:
+        hits.append([
+            {"id": item["id"], "score": round(item["score"], 4) if item.get("score") is not None else None}
+            for item in items
+        ])
+        for rank, item in enumerate(items):
+            if item["id"] not in best:
+                best[item["id"]] = (rank, len(best), item)
+            elif rank < best[item["id"]][0]:
+                best[item["id"]] = (rank, best[item["id"]][1], item)
+    memories = [
+        {"id": item["id"], "memory": item["memory"]}
+        for _, _, item in sorted(best.values(), key=lambda entry: entry[:2])
+    ]
+    return hits, memories
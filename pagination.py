@@ -0,0 +1,159 @@
+"""
+Cursor-based pagination over a user's memories.
+
+Memories are ordered by (created_at, id). A page is fetched with a keyset
+query straight against the pgvector table when the vector store is the vecs
+based ``supabase`` provider, so only one page of rows ever leaves Postgres.
+Other vector stores fall back to listing the user's memories and slicing them
+in Python. Cursors are opaque URL-safe strings that encode the last
+(created_at, id) of the previous page. Memories past their ``expires_at`` are
+left out of the pages unless asked for, so a page is still full and its
+cursor moves past them.
+"""
+from datetime import datetime, timezone
+import base64
+import json
+
+from utils import env_int
+
+# Fields a client can request through the ``fields`` projection
+MEMORY_FIELDS = ("id", "memory", "hash", "created_at", "updated_at", "user_id", "agent_id", "run_id", "metadata")
+
+# Payload keys that Mem0 keeps out of the "metadata" field of a memory
+RESERVED_KEYS = {"data", "hash", "created_at", "updated_at", "user_id", "agent_id", "run_id"}
+
+def encode_cursor(created_at, memory_id):
+    raw = json.dumps([created_at, memory_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, memory_id = json.loads(raw)
+        return parse_timestamp(created_at), memory_id
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 timestamp; naive timestamps are taken as UTC."""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def parse_fields(fields):
+    """Turn a comma separated field list into a tuple, rejecting unknown names."""
+    requested = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = [field for field in requested if field not in MEMORY_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}; choose from {', '.join(MEMORY_FIELDS)}")
+    return requested or ("id", "memory", "created_at")
+
+def to_memory_item(memory_id, payload):
+    """Convert a vector store payload into the item shape Mem0's get_all returns."""
+    item = {
+        "id": memory_id,
+        "memory": payload.get("data"),
+        "hash": payload.get("hash"),
+        "created_at": payload.get("created_at"),
+        "updated_at": payload.get("updated_at"),
+    }
+    for key in ("user_id", "agent_id", "run_id"):
+        if key in payload:
+            item[key] = payload[key]
+    metadata = {key: value for key, value in payload.items() if key not in RESERVED_KEYS}
+    if metadata:
+        item["metadata"] = metadata
+    return item
+
+def project(item, fields):
+    return {field: item.get(field) for field in fields if field in item}
+
+def _page_from_sql(collection, filters, limit, after, since, expired_before):
+    from sqlalchemy import TIMESTAMP, cast, or_, select, tuple_
+
+    table = collection.table
+    created_at = cast(table.c.metadata["created_at"].astext, TIMESTAMP(timezone=True))
+    stmt = select(table.c.id, table.c.metadata).where(table.c.metadata.contains(filters))
+    if expired_before is not None:
+        expires_at = cast(table.c.metadata["expires_at"].astext, TIMESTAMP(timezone=True))
+        stmt = stmt.where(or_(expires_at.is_(None), expires_at > expired_before))
+    if since is not None:
+        stmt = stmt.where(created_at >= since)
+    if after is not None:
+        stmt = stmt.where(tuple_(created_at, table.c.id) > tuple_(after[0], after[1]))
+    stmt = stmt.order_by(created_at, table.c.id).limit(limit + 1)
+    with collection.client.Session() as session:
+        return [(row[0], row[1]) for row in session.execute(stmt)]
+
+def _page_from_listing(vector_store, filters, limit, after, since, expired_before):
+    scan_limit = env_int("GET_ALL_SCAN_LIMIT", 100000)
+    records = vector_store.list(filters=filters, limit=scan_limit)
+    if records and isinstance(records[0], list):
+        records = records[0]
+    rows = []
+    for record in records:
+        payload = record.payload or {}
+        if not payload.get("created_at"):
+            continue
+        key = (parse_timestamp(payload["created_at"]), str(record.id))
+        if since is not None and key[0] < since:
+            continue
+        if after is not None and key <= after:
+            continue
+        expires_at = payload.get("expires_at")
+        if expired_before is not None and expires_at and parse_timestamp(expires_at) <= expired_before:
+            continue
+        rows.append((key, str(record.id), payload))
+    rows.sort(key=lambda row: row[0])
+    return [(memory_id, payload) for _, memory_id, payload in rows[:limit + 1]]
+
+def page_memories(memory, filters, limit=50, cursor=None, since=None, include_expired=False):
+    """Fetch one page of memories matching filters, ordered by (created_at, id).
+
+    Args:
+        memory: The Mem0 client
+        filters: Payload filters, e.g. {"user_id": "user"}
+        limit: Maximum number of memories in the page
+        cursor: The next_cursor returned with the previous page
+        since: Only return memories created at or after this ISO 8601 timestamp
+        include_expired: Also return memories past their expires_at, e.g. to delete them
+
+    Returns:
+        tuple: (list of memory items, cursor for the next page or None)
+    """
+    after = decode_cursor(cursor) if cursor else None
+    since = parse_timestamp(since) if since else None
+    expired_before = None if include_expired else datetime.now(timezone.utc)
+    collection = getattr(memory.vector_store, "collection", None)
+    if collection is not None and hasattr(collection, "table"):
+        rows = _page_from_sql(collection, filters, limit, after, since, expired_before)
+    else:
+        rows = _page_from_listing(memory.vector_store, filters, limit, after, since, expired_before)
+
+    items = [to_memory_item(memory_id, payload) for memory_id, payload in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return items, next_cursor
+
+def get_memories(memory, memory_ids, filters):
+    """Fetch memories by id, skipping the ones that do not exist, have expired or fall outside filters.
+
+    Returns:
+        tuple: (list of memory items in the order of memory_ids, list of ids not returned)
+    """
+    items, missing = [], []
+    for memory_id in dict.fromkeys(memory_ids):
+        try:
+            record = memory.vector_store.get(vector_id=memory_id)
+        except Exception:
+            record = None
+        payload = getattr(record, "payload", None) or {}
+        if record is None or any(payload.get(key) != value for key, value in filters.items()):
+            missing.append(memory_id)
+            continue
+        if payload.get("expires_at") and parse_timestamp(payload["expires_at"]) <= datetime.now(timezone.utc):
+            missing.append(memory_id)
+            continue
+        items.append(to_memory_item(record.id, payload))
+    return items, missing
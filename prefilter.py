@@ -0,0 +1,111 @@
+"""
+Decides per text whether a save needs Mem0's LLM extraction at all.
+
+``save_memory`` normally sends every text through fact extraction and the
+update prompt, which takes seconds and two LLM round-trips. Many writes are
+already atomic facts or structured notes and gain nothing from it. In ``auto``
+mode each text is embedded once and routed with cheap local checks:
+
+* a near-identical memory already exists in the scope: nothing is written
+* a closely related memory exists: extraction runs, so the LLM can update or
+  merge it instead of adding a conflicting fact
+* structured content (JSON, ``key: value`` lines) or a short single statement:
+  stored verbatim with the embedding already computed
+* anything longer or made of several sentences: extraction runs
+"""
+import json
+import re
+
+import numpy as np
+
+from batching import embed_batch
+from utils import env_float, env_int
+
+INFER = "infer"
+RAW = "raw"
+AUTO = "auto"
+SAVE_MODES = (INFER, RAW, AUTO)
+
+# The routes auto mode picks for a text; "skip" writes nothing
+SKIP = "skip"
+
+_KEY_VALUE_LINE = re.compile(r"^\s*[-*]?\s*[\w .\-/]{1,40}\s*[:=]\s*\S")
+_SENTENCE_END = re.compile(r"[.!?](?:\s+|$)")
+
+def get_prefilter_settings():
+    """Read the SAVE_AUTO_* thresholds."""
+    return {
+        "max_chars": env_int("SAVE_AUTO_MAX_CHARS", 280),
+        "duplicate_similarity": env_float("SAVE_AUTO_DUPLICATE_SIMILARITY", 0.97),
+        "related_similarity": env_float("SAVE_AUTO_RELATED_SIMILARITY", 0.85),
+    }
+
+def content_route(text, max_chars=280):
+    """Route a text by its shape alone.
+
+    Returns:
+        tuple: (RAW or INFER, reason)
+    """
+    stripped = text.strip()
+    if stripped[:1] in "{[":
+        try:
+            json.loads(stripped)
+            return RAW, "structured"
+        except ValueError:
+            pass
+    lines = [line for line in stripped.splitlines() if line.strip()]
+    if len(lines) > 1 and all(_KEY_VALUE_LINE.match(line) for line in lines):
+        return RAW, "structured"
+    if len(stripped) > max_chars:
+        return INFER, "long"
+    if len(lines) > 1 or len(_SENTENCE_END.findall(stripped.rstrip(".!?") + ".")) > 1:
+        return INFER, "multiple_sentences"
+    return RAW, "atomic"
+
+def score_similarity(vector_store, score):
+    """Turn a vector store search score into a cosine similarity."""
+    if score is None:
+        return None
+    score_is_distance = getattr(vector_store, "score_is_distance", None)
+    if score_is_distance is None:
+        # Mem0's pgvector-backed stores return the cosine distance, the others a similarity
+        score_is_distance = type(vector_store).__name__ in ("Supabase", "PGVector")
+    return 1.0 - score if score_is_distance else score
+
+def plan_saves(memory, texts, filters, settings=None):
+    """Choose how to save each text: verbatim, through LLM extraction, or not at all.
+
+    Args:
+        memory: The Mem0 client
+        texts: The texts to save
+        filters: The user_id / agent_id / run_id the memories belong to
+        settings: Overrides for get_prefilter_settings()
+
+    Returns:
+        list: One {"mode", "reason", "vector", "similar_id", "similarity"} dict per text, in input order
+    """
+    settings = settings or get_prefilter_settings()
+    vectors = embed_batch(memory.embedding_model, texts, "add")
+    normalized = np.asarray(vectors, dtype=np.float32)
+    normalized /= np.maximum(np.linalg.norm(normalized, axis=1, keepdims=True), 1e-12)
+    plans = []
+    for index, (text, vector) in enumerate(zip(texts, vectors)):
+        plan = {"mode": None, "reason": None, "vector": vector, "similar_id": None, "similarity": None}
+        hits = memory.vector_store.search(query=text, vectors=vector, limit=1, filters=filters)
+        if hits:
+            plan["similar_id"] = hits[0].id
+            plan["similarity"] = score_similarity(memory.vector_store, hits[0].score)
+        similarity = plan["similarity"] or 0.0
+        # Earlier texts of the same batch are not in the vector store yet
+        kept = [earlier for earlier in range(index) if plans[earlier]["mode"] != SKIP]
+        in_batch = float(np.max(normalized[kept] @ normalized[index])) if kept else 0.0
+        if similarity >= settings["duplicate_similarity"]:
+            plan["mode"], plan["reason"] = SKIP, "duplicate"
+        elif in_batch >= settings["duplicate_similarity"]:
+            plan["mode"], plan["reason"], plan["similar_id"] = SKIP, "duplicate_in_batch", None
+        elif similarity >= settings["related_similarity"]:
+            plan["mode"], plan["reason"] = INFER, "related"
+        else:
+            plan["mode"], plan["reason"] = content_route(text, settings["max_chars"])
+        plans.append(plan)
+    return plans
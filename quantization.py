@@ -0,0 +1,371 @@
+"""
+Compact vector encodings for search: half precision, int8, binary and Matryoshka truncation.
+
+Full float32 vectors (1536 dimensions for text-embedding-3-small) make the
+vector index large, so searches are bound by memory bandwidth. With
+VECTOR_ENCODING and VECTOR_INDEX_DIMS a search first ranks candidates on a
+compact code of every vector: float16, int8 or one bit per dimension, of the
+whole vector or of its first VECTOR_INDEX_DIMS dimensions for models trained
+to keep most of their meaning there (Matryoshka embeddings). The
+VECTOR_RESCORE_FACTOR * limit best candidates are then rescored exactly with
+their full float vectors, which stay stored, so recall stays close to exact
+search.
+
+``supabase`` store: the codes are an HNSW expression index on the pgvector
+table (``halfvec`` or ``bit``, pgvector >= 0.7; pgvector has no int8 type).
+``local`` store: the codes are a memory-mapped file next to the float
+vectors, scanned instead of them by the brute-force search.
+
+Run ``python quantization.py --help`` (or ``mem0-encode``) to build the
+index or re-encode a local collection, see its size, and measure recall.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from utils import env_int
+
+logger = logging.getLogger(__name__)
+
+ENCODINGS = ("float32", "float16", "int8", "binary")
+
+# Models trained so that a prefix of the embedding is an embedding itself
+MATRYOSHKA_MODELS = ("text-embedding-3-small", "text-embedding-3-large", "nomic-embed-text")
+
+# Rows widened to float32 at a time when scoring float16 / int8 codes
+_CHUNK_ROWS = 2048
+
+# Bits set in every byte value, for Hamming distances between packed codes
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+class VectorCodec:
+    """Encodes unit vectors into compact codes and ranks codes against a query by approximate cosine distance."""
+
+    def __init__(self, encoding="float32", dims=None, full_dims=None):
+        """
+        Args:
+            encoding: float32, float16, int8 or binary
+            dims: Leading dimensions kept (Matryoshka truncation), or None for all of them
+            full_dims: Dimensions of the embedding model
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown vector encoding {encoding}; choose from {', '.join(ENCODINGS)}")
+        if dims and full_dims and dims > full_dims:
+            raise ValueError(f"VECTOR_INDEX_DIMS {dims} exceeds the model's {full_dims} dimensions")
+        self.encoding = encoding
+        self.full_dims = full_dims
+        self.dims = dims or full_dims
+
+    @property
+    def name(self):
+        return f"{self.encoding}-{self.dims}"
+
+    @property
+    def dtype(self):
+        return {"float32": np.float32, "float16": np.float16, "int8": np.int8, "binary": np.uint8}[self.encoding]
+
+    @property
+    def width(self):
+        """Array columns per encoded vector."""
+        return (self.dims + 7) // 8 if self.encoding == "binary" else self.dims
+
+    @property
+    def bytes_per_vector(self):
+        return self.width * np.dtype(self.dtype).itemsize
+
+    def _prefix(self, vectors):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))[:, :self.dims]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def encode(self, vectors):
+        """Codes for a (n, full_dims) array of vectors."""
+        prefix = self._prefix(vectors)
+        if self.encoding == "binary":
+            return np.packbits(prefix > 0, axis=1)
+        if self.encoding == "int8":
+            return np.clip(np.rint(prefix * 127), -127, 127).astype(np.int8)
+        return prefix.astype(self.dtype)
+
+    def distances(self, codes, query):
+        """Approximate cosine distances (Hamming distance / dims for binary) between codes and a query vector."""
+        query = self._prefix(query)[0]
+        if self.encoding == "binary":
+            differing = _POPCOUNT[np.bitwise_xor(codes, np.packbits(query > 0))].sum(axis=1)
+            return differing / self.dims
+        scale = 127.0 if self.encoding == "int8" else 1.0
+        similarities = np.empty(len(codes), dtype=np.float32)
+        # NumPy has no BLAS kernels for float16 or int8: widen cache-sized chunks instead of the whole matrix
+        for start in range(0, len(codes), _CHUNK_ROWS):
+            similarities[start:start + _CHUNK_ROWS] = codes[start:start + _CHUNK_ROWS].astype(np.float32) @ query
+        return 1.0 - similarities / scale
+
+    def describe(self):
+        return {"encoding": self.encoding, "dims": self.dims, "bytes_per_vector": self.bytes_per_vector}
+
+def get_encoding_settings():
+    """Read the VECTOR_ENCODING / VECTOR_INDEX_DIMS / VECTOR_RESCORE_FACTOR settings."""
+    return {
+        "encoding": os.getenv("VECTOR_ENCODING", "float32"),
+        "dims": env_int("VECTOR_INDEX_DIMS", 0) or None,
+        "rescore": max(1, env_int("VECTOR_RESCORE_FACTOR", 4)),
+    }
+
+def build_codec(full_dims, model=None, settings=None):
+    """The codec the settings ask for, or None when vectors are searched as stored (float32, all dimensions).
+
+    Raises:
+        ValueError: Truncation was asked for a model that is not a Matryoshka model
+    """
+    settings = settings or get_encoding_settings()
+    codec = VectorCodec(settings["encoding"], settings["dims"], full_dims)
+    if codec.dims != full_dims and not any((model or "").startswith(name) for name in MATRYOSHKA_MODELS):
+        raise ValueError(
+            f"VECTOR_INDEX_DIMS truncates embeddings, which only works for Matryoshka models "
+            f"({', '.join(MATRYOSHKA_MODELS)}), not {model}"
+        )
+    if codec.encoding == "float32" and codec.dims == full_dims:
+        return None
+    return codec
+
+# -- pgvector ---------------------------------------------------------------------------------
+
+# (pgvector type, operator class, distance operator) per encoding
+_PG_ENCODINGS = {
+    "float32": ("vector", "vector_cosine_ops", "<=>"),
+    "float16": ("halfvec", "halfvec_cosine_ops", "<=>"),
+    "binary": ("bit", "bit_hamming_ops", "<~>"),
+}
+
+def _pg_encoding(codec):
+    if codec.encoding not in _PG_ENCODINGS:
+        raise ValueError("pgvector has no int8 vector type; use VECTOR_ENCODING=float16 or binary")
+    return _PG_ENCODINGS[codec.encoding]
+
+def pg_expression(codec, column):
+    """SQL expression encoding a vector column or parameter the way the index stores it."""
+    pg_type = _pg_encoding(codec)[0]
+    source = column if codec.dims == codec.full_dims else f"subvector({column}, 1, {codec.dims})"
+    if codec.encoding == "binary":
+        return f"binary_quantize({source})::bit({codec.dims})"
+    return f"({source})::{pg_type}({codec.dims})"
+
+def pg_index_name(table_name, codec):
+    return f"{table_name}_{codec.encoding}_{codec.dims}_hnsw_idx"
+
+def pg_index_statement(table_name, codec, m=16, ef_construction=64):
+    """The CREATE INDEX statement for the HNSW index over the codes of a collection table."""
+    opclass = _pg_encoding(codec)[1]
+    return (
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{pg_index_name(table_name, codec)}" ON vecs."{table_name}" '
+        f"USING hnsw (({pg_expression(codec, 'vec')}) {opclass}) WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+    )
+
+def _relation_sizes(session, table_name):
+    from sqlalchemy import text
+
+    rows = session.execute(
+        text(
+            "SELECT c.relname, pg_relation_size(c.oid) FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_class t ON t.oid = i.indrelid WHERE t.relnamespace = 'vecs'::regnamespace AND t.relname = :table"
+        ),
+        {"table": table_name},
+    )
+    return {row[0]: row[1] for row in rows}
+
+def describe_pg_encoding(collection, codec):
+    """Sizes of the float vector index and of the encoded index of a vecs collection."""
+    from sqlalchemy import text
+
+    table_name = collection.table.name
+    with collection.client.Session() as session:
+        sizes = _relation_sizes(session, table_name)
+        table_bytes = session.execute(text(f"SELECT pg_total_relation_size('vecs.\"{table_name}\"')")).scalar()
+    name = pg_index_name(table_name, codec)
+    return {
+        **codec.describe(),
+        "index": name if name in sizes else None,
+        "index_bytes": sizes.get(name),
+        "float_index_bytes": sum(size for index, size in sizes.items() if index.startswith("ix_vector")),
+        "table_bytes": table_bytes,
+    }
+
+def ensure_pg_encoded_index(collection, codec, m=16, ef_construction=64, drop_float_index=False):
+    """Build the HNSW index over the codes if it is missing, CONCURRENTLY so writes continue.
+
+    Args:
+        collection: The vecs collection (``memory.vector_store.collection``)
+        codec: The VectorCodec searches use
+        m: HNSW connections per node
+        ef_construction: HNSW candidate list size while building
+        drop_float_index: Also drop vecs' index over the float vectors, which encoded searches do not use
+
+    Returns:
+        dict: describe_pg_encoding after the change, and whether the index was built
+    """
+    from sqlalchemy import text
+
+    table_name = collection.table.name
+    name = pg_index_name(table_name, codec)
+    with collection.client.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        sizes = _relation_sizes(connection, table_name)
+        built = name not in sizes
+        if built:
+            started = time.perf_counter()
+            logger.info(f"Building {codec.name} index {name} on vecs.{table_name}")
+            connection.execute(text(pg_index_statement(table_name, codec, m, ef_construction)))
+            logger.info(f"Built {name} in {time.perf_counter() - started:.1f}s")
+        if drop_float_index:
+            for index in sizes:
+                if index.startswith("ix_vector"):
+                    connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS vecs."{index}"'))
+            collection._index = None
+    return {**describe_pg_encoding(collection, codec), "built": built}
+
+def pg_encoded_search(collection, codec, vector, limit, filters=None, rescore=4, ef_search=40):
+    """Rank candidates on the encoded index and rescore the best rescore * limit with the float vectors.
+
+    Returns:
+        list: (id, cosine distance, metadata) tuples, closest first
+    """
+    from sqlalchemy import text
+
+    candidates = limit * rescore
+    operator = _pg_encoding(codec)[2]
+    statement = text(
+        f"SELECT id, vec <=> CAST(:vector AS vector) AS distance, metadata FROM ("
+        f'SELECT id, vec, metadata FROM vecs."{collection.table.name}" WHERE metadata @> CAST(:filters AS jsonb) '
+        f"ORDER BY {pg_expression(codec, 'vec')} {operator} {pg_expression(codec, 'CAST(:vector AS vector)')} "
+        f"LIMIT :candidates) AS candidates ORDER BY distance LIMIT :limit"
+    )
+    vector_text = "[" + ",".join(repr(float(value)) for value in vector) + "]"
+    with collection.client.Session() as session, session.begin():
+        # HNSW returns at most ef_search rows, so it has to cover the candidate list
+        session.execute(text(f"SET LOCAL hnsw.ef_search = {max(int(ef_search), candidates)}"))
+        rows = session.execute(statement, {
+            "vector": vector_text, "filters": json.dumps(filters or {}), "candidates": candidates, "limit": limit,
+        })
+        return [(str(row[0]), float(row[1]), row[2]) for row in rows]
+
+def enable_encoded_search(vector_store, codec, rescore=4, ef_search=40):
+    """Route the searches of Mem0's supabase store through pg_encoded_search."""
+    from mem0.vector_stores.supabase import OutputData
+
+    _pg_encoding(codec)
+    collection = vector_store.collection
+
+    def search(query, vectors, limit=5, filters=None):
+        rows = pg_encoded_search(collection, codec, vectors, limit, filters, rescore, ef_search)
+        return [OutputData(id=memory_id, score=distance, payload=payload) for memory_id, distance, payload in rows]
+
+    vector_store.search = search
+    vector_store.codec = codec
+    return vector_store
+
+def evaluate_pg_encoding(collection, codec, sample_size=100, k=10, rescore_factors=(1, 2, 4, 8), ef_search=40):
+    """Recall@k and latency of encoded search with each rescore factor, against exact float search."""
+    from sqlalchemy import text
+    from vector_indexes import _percentiles
+
+    table_name = collection.table.name
+    exact_query = text(f'SELECT id FROM vecs."{table_name}" ORDER BY vec <=> CAST(:vector AS vector) LIMIT :k')
+    with collection.client.Session() as session:
+        samples = [
+            row[0] for row in session.execute(
+                text(f'SELECT vec::text FROM vecs."{table_name}" ORDER BY random() LIMIT :n'), {"n": sample_size}
+            )
+        ]
+        session.rollback()
+        if not samples:
+            raise ValueError(f"Collection {table_name} is empty")
+        exact = []
+        with session.begin():
+            session.execute(text("SET LOCAL enable_indexscan = off"))
+            for vector in samples:
+                exact.append({row[0] for row in session.execute(exact_query, {"vector": vector, "k": k})})
+
+    vectors = [json.loads(sample) for sample in samples]
+    runs = []
+    for factor in rescore_factors:
+        hits, latencies = 0, []
+        for vector, truth in zip(vectors, exact):
+            started = time.perf_counter()
+            ids = [row[0] for row in pg_encoded_search(collection, codec, vector, k, None, factor, ef_search)]
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits += len(truth.intersection(ids))
+        runs.append({"rescore": factor, "recall": round(hits / sum(len(truth) for truth in exact), 4), **_percentiles(latencies)})
+    return {**describe_pg_encoding(collection, codec), "sample_size": len(samples), "k": k, "runs": runs}
+
+def main():
+    """Command line entry point: build or inspect the encoded index and measure its recall."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    settings = get_encoding_settings()
+    parser = argparse.ArgumentParser(description="Re-encode the Mem0 collection for compact search")
+    parser.add_argument("--store", choices=("supabase", "local"), default=os.getenv("VECTOR_STORE", "supabase"))
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--collection", default="mem0_memories")
+    parser.add_argument("--full-dims", type=int, default=1536 if os.getenv("LLM_PROVIDER", "openai") == "openai" else 768)
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL_CHOICE"))
+    parser.add_argument("--encoding", choices=ENCODINGS, default=settings["encoding"])
+    parser.add_argument("--dims", type=int, default=settings["dims"], help="Matryoshka truncation (default: all)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show the encoding and the index or file sizes")
+    migrate = commands.add_parser("migrate", help="Build the encoded index (supabase) or encode the vectors (local)")
+    migrate.add_argument("--m", type=int, default=env_int("VECTOR_INDEX_M", 16))
+    migrate.add_argument("--ef-construction", type=int, default=env_int("VECTOR_INDEX_EF_CONSTRUCTION", 64))
+    migrate.add_argument("--drop-float-index", action="store_true", help="Drop the index over the float vectors")
+    evaluate = commands.add_parser("evaluate", help="Measure recall and latency against exact search (supabase)")
+    evaluate.add_argument("--sample", type=int, default=100)
+    evaluate.add_argument("--k", type=int, default=10)
+    evaluate.add_argument("--rescore", default="1,2,4,8", help="Comma separated rescore factors")
+    args = parser.parse_args()
+
+    model = args.model or ("text-embedding-3-small" if args.full_dims == 1536 else "nomic-embed-text")
+    codec = build_codec(
+        args.full_dims, model, {"encoding": args.encoding, "dims": args.dims, "rescore": settings["rescore"]}
+    )
+    if codec is None:
+        parser.error("Choose a compact --encoding or --dims; float32 at full dimensions is how vectors are stored")
+
+    if args.store == "local":
+        from local_store import build_local_vector_store
+
+        if args.command == "evaluate":
+            parser.error("Use benchmarks/vector_encoding.py to measure the local store")
+        # Opening the store with a new codec encodes every stored vector
+        store = build_local_vector_store(args.collection, args.full_dims, codec=codec)
+        try:
+            result = store.col_info()
+        finally:
+            store.close()
+        print(json.dumps(result, indent=2))
+        return
+
+    import vecs
+
+    if not args.database_url:
+        parser.error("Set DATABASE_URL or pass --database-url")
+    client = vecs.create_client(args.database_url)
+    try:
+        collection = client.get_collection(args.collection)
+        if args.command == "status":
+            result = describe_pg_encoding(collection, codec)
+        elif args.command == "migrate":
+            result = ensure_pg_encoded_index(collection, codec, args.m, args.ef_construction, args.drop_float_index)
+        else:
+            factors = [int(value) for value in args.rescore.split(",")]
+            result = evaluate_pg_encoding(
+                collection, codec, args.sample, args.k, factors, env_int("VECTOR_INDEX_EF_SEARCH", 40)
+            )
+    finally:
+        client.disconnect()
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
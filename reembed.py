@@ -0,0 +1,527 @@
+"""
+Re-embedding memories into a shadow collection when the embedding model changes.
+
+A collection's vectors only make sense to the model that produced them. A
+small registry next to the vectors (a table in the Postgres database, or a
+SQLite file in LOCAL_VECTOR_PATH) records which provider, model and
+dimensions each collection was embedded with, and which collection is active.
+The first start with this registry records the configured model for
+``mem0_memories``.
+
+When EMBEDDING_MODEL_CHOICE (or the provider) later differs from the active
+collection's model, the server keeps serving the active collection with the
+model it was built with. The re-embedding job then copies every memory into
+a shadow collection named after the new model, embedding the texts in
+batches. It runs inside the server with REEMBED_ON_STARTUP, or from the
+command line:
+
+    python reembed.py status
+    python reembed.py run --rate 50
+
+The job is resumable: it walks the source in id order and checkpoints the
+last id after every batch. REEMBED_RATE caps the texts embedded per second.
+Once the copy is done, sync passes re-embed memories that were added or
+changed in the meantime and delete the ones that were removed. The vector
+index is then built, and the registry switches the active collection in one
+transaction. Servers notice the switch within REEMBED_POLL_SECONDS and move
+searches and writes to a client built on the new collection. A catch-up pass
+then copies writes that reached the old collection around the switch, without
+undoing deletes or updates already made in the new one.
+The old collection is kept, marked retired, until it is dropped by hand.
+"""
+from datetime import datetime, timezone
+import argparse
+import json
+import logging
+import os
+import re
+import socket
+import time
+
+from transfer import collection_of, copy_records, iter_records
+from utils import env_bool, env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION = "mem0_memories"
+REGISTRY_TABLE = "mem0_mcp_embeddings"
+
+# Embedder config keys for a provider's base URL
+_BASE_URL_KEYS = {"openai": "openai_base_url", "ollama": "ollama_base_url"}
+# A claimed job whose owner has not checkpointed for this long may be taken over
+_CLAIM_TTL = 300
+# Sync passes before the cutover; each one only handles what changed during the previous one
+_SYNC_PASSES = 3
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {REGISTRY_TABLE} (
+    collection TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    dims INTEGER NOT NULL,
+    base_url TEXT,
+    state TEXT NOT NULL,
+    cursor TEXT,
+    copied INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    heartbeat DOUBLE PRECISION,
+    updated_at TEXT NOT NULL
+)
+"""
+
+def get_reembed_settings():
+    """Read the REEMBED_* settings."""
+    return {
+        "on_startup": env_bool("REEMBED_ON_STARTUP", False),
+        "batch_size": env_int("REEMBED_BATCH_SIZE", 200),
+        "rate": env_float("REEMBED_RATE", 0.0),
+        "poll_seconds": env_float("REEMBED_POLL_SECONDS", 30.0),
+    }
+
+def embedder_spec(config, dims):
+    """Provider, model, dimensions and base URL of the embedder a Mem0 config builds."""
+    embedder = config.get("embedder") or {}
+    provider = embedder.get("provider", "openai")
+    settings = embedder.get("config") or {}
+    return {
+        "provider": provider,
+        # Mem0 falls back to OpenAI's text-embedding-3-small when no embedder is configured
+        "model": settings.get("model") or "text-embedding-3-small",
+        "dims": dims,
+        "base_url": settings.get(_BASE_URL_KEYS.get(provider, "openai_base_url")),
+    }
+
+def same_embeddings(a, b):
+    return (a["provider"], a["model"], int(a["dims"])) == (b["provider"], b["model"], int(b["dims"]))
+
+def embedder_config(spec):
+    """The Mem0 embedder config entry that builds the embedder of spec."""
+    config = {"model": spec["model"], "embedding_dims": int(spec["dims"])}
+    if spec.get("base_url"):
+        config[_BASE_URL_KEYS.get(spec["provider"], "openai_base_url")] = spec["base_url"]
+    # The key of the previous provider, once LLM_API_KEY belongs to the new one
+    if spec["provider"] == "openai" and os.getenv("EMBEDDING_PREVIOUS_API_KEY"):
+        config["api_key"] = os.getenv("EMBEDDING_PREVIOUS_API_KEY")
+    return {"provider": spec["provider"], "config": config}
+
+def shadow_name(spec):
+    """Collection that holds the vectors of the model in spec, e.g. mem0_memories_text_embedding_3_small_1536."""
+    slug = re.sub(r"[^a-z0-9]+", "_", spec["model"].lower()).strip("_")
+    return f"{DEFAULT_COLLECTION}_{slug}_{int(spec['dims'])}"
+
+class EmbeddingRegistry:
+    """Which collection holds the vectors of which embedding model, and the progress of re-embedding jobs."""
+
+    def __init__(self, engine):
+        """
+        Args:
+            engine: SQLAlchemy engine of the database the registry table lives in
+        """
+        from sqlalchemy import text
+
+        self.engine = engine
+        self._text = text
+        with engine.begin() as connection:
+            connection.execute(text(_SCHEMA))
+
+    def _rows(self, where="", **params):
+        with self.engine.connect() as connection:
+            result = connection.execute(self._text(f"SELECT * FROM {REGISTRY_TABLE} {where}"), params)
+            return [dict(row._mapping) for row in result]
+
+    def rows(self):
+        return self._rows("ORDER BY updated_at")
+
+    def get(self, collection):
+        rows = self._rows("WHERE collection = :collection", collection=collection)
+        return rows[0] if rows else None
+
+    def active(self):
+        rows = self._rows("WHERE state = 'active'")
+        return rows[0] if rows else None
+
+    def register(self, collection, spec, state):
+        """Add a collection unless it is already registered."""
+        with self.engine.begin() as connection:
+            connection.execute(self._text(
+                f"INSERT INTO {REGISTRY_TABLE} (collection, provider, model, dims, base_url, state, copied, updated_at) "
+                "VALUES (:collection, :provider, :model, :dims, :base_url, :state, 0, :now) "
+                "ON CONFLICT (collection) DO NOTHING"
+            ), {"collection": collection, "state": state, "now": _now(), **spec})
+
+    def claim(self, collection, owner, ttl=_CLAIM_TTL):
+        """Take the job of filling collection unless another owner checkpointed it within ttl seconds."""
+        now = time.time()
+        with self.engine.begin() as connection:
+            result = connection.execute(self._text(
+                f"UPDATE {REGISTRY_TABLE} SET owner = :owner, heartbeat = :now "
+                "WHERE collection = :collection AND state = 'building' "
+                "AND (owner IS NULL OR owner = :owner OR heartbeat < :expired)"
+            ), {"collection": collection, "owner": owner, "now": now, "expired": now - ttl})
+            return result.rowcount == 1
+
+    def reopen(self, collection):
+        """Start a retired collection over; it missed every write since it was retired."""
+        with self.engine.begin() as connection:
+            connection.execute(self._text(
+                f"UPDATE {REGISTRY_TABLE} SET state = 'building', cursor = NULL, copied = 0, updated_at = :now "
+                "WHERE collection = :collection AND state = 'retired'"
+            ), {"collection": collection, "now": _now()})
+
+    def checkpoint(self, collection, cursor, copied, owner):
+        with self.engine.begin() as connection:
+            connection.execute(self._text(
+                f"UPDATE {REGISTRY_TABLE} SET cursor = :cursor, copied = :copied, heartbeat = :heartbeat, "
+                "updated_at = :now WHERE collection = :collection AND owner = :owner"
+            ), {"collection": collection, "cursor": cursor, "copied": copied, "heartbeat": time.time(),
+                "now": _now(), "owner": owner})
+
+    def cutover(self, collection):
+        """Make collection the active one and retire the previous one, in one transaction."""
+        with self.engine.begin() as connection:
+            connection.execute(self._text(
+                f"UPDATE {REGISTRY_TABLE} SET state = 'retired', updated_at = :now WHERE state = 'active'"
+            ), {"now": _now()})
+            connection.execute(self._text(
+                f"UPDATE {REGISTRY_TABLE} SET state = 'active', owner = NULL, updated_at = :now "
+                "WHERE collection = :collection"
+            ), {"collection": collection, "now": _now()})
+
+    def close(self):
+        self.engine.dispose()
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+def open_registry(vector_store=None):
+    """Open the registry of the configured vector store (VECTOR_STORE, DATABASE_URL, LOCAL_VECTOR_PATH)."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import NullPool
+
+    if (vector_store or os.getenv("VECTOR_STORE", "supabase")) == "local":
+        from local_store import DEFAULT_LOCAL_VECTOR_PATH
+
+        path = os.getenv("LOCAL_VECTOR_PATH") or DEFAULT_LOCAL_VECTOR_PATH
+        os.makedirs(path, exist_ok=True)
+        url = f"sqlite:///{os.path.join(path, 'embeddings.db')}"
+    else:
+        url = os.environ.get("DATABASE_URL", "")
+    # Read a few times per minute at most; no pool to keep open
+    return EmbeddingRegistry(create_engine(url, poolclass=NullPool))
+
+def resolve_collection(config, dims, vector_store=None):
+    """Choose the collection to serve and the embedder to serve it with.
+
+    Registers DEFAULT_COLLECTION with the configured embedder on first use. When
+    the configured embedder differs from the active collection's, config["embedder"]
+    is switched to the active collection's so its vectors stay searchable.
+
+    Returns:
+        tuple: (collection name, its dimensions, the configured embedder spec to
+        re-embed into, or None when the active collection already uses it)
+    """
+    target = embedder_spec(config, dims)
+    registry = open_registry(vector_store)
+    try:
+        active = registry.active()
+        if active is None:
+            registry.register(DEFAULT_COLLECTION, target, "active")
+            return DEFAULT_COLLECTION, dims, None
+        if same_embeddings(active, target):
+            return active["collection"], dims, None
+        logger.warning(
+            f"The embedder changed from {active['provider']}:{active['model']} to {target['provider']}:"
+            f"{target['model']}; serving {active['collection']} with the old model until it is re-embedded "
+            "(REEMBED_ON_STARTUP or mem0-reembed run)"
+        )
+        config["embedder"] = embedder_config(active)
+        return active["collection"], int(active["dims"]), target
+    finally:
+        registry.close()
+
+def build_embedder(spec):
+    from mem0.utils.factory import EmbedderFactory
+
+    entry = embedder_config(spec)
+    # The new model's key is the current one, not EMBEDDING_PREVIOUS_API_KEY
+    entry["config"].pop("api_key", None)
+    return EmbedderFactory.create(entry["provider"], entry["config"], None)
+
+def open_collection(vector_store, name, dims):
+    """Open (or create) collection name next to vector_store: a vecs collection, or a local store."""
+    if collection_of(vector_store) is not None:
+        return vector_store.db.get_or_create_collection(name=name, dimension=dims)
+    from local_store import build_local_vector_store
+
+    return build_local_vector_store(name, dims)
+
+def _payloads(store, ids):
+    """{id: payload} of the ids that exist in a vector store or vecs collection."""
+    collection = collection_of(store)
+    if collection is None:
+        found = {}
+        for memory_id in ids:
+            record = store.get(vector_id=memory_id)
+            if record is not None:
+                found[memory_id] = record.payload or {}
+        return found
+    from sqlalchemy import text
+
+    with collection.client.Session() as session:
+        rows = session.execute(
+            text(f'SELECT id, metadata FROM vecs."{collection.table.name}" WHERE id = ANY(:ids)'), {"ids": list(ids)}
+        )
+        return {row[0]: row[1] for row in rows}
+
+_EPOCH = datetime.min.replace(tzinfo=timezone.utc)
+
+def _timestamp(value):
+    """A payload's ISO timestamp as an aware datetime; missing or unreadable ones sort first."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return _EPOCH
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+def _changed_at(payload):
+    return _timestamp((payload or {}).get("updated_at") or (payload or {}).get("created_at"))
+
+def _write(store, records):
+    collection = collection_of(store)
+    if collection is not None:
+        return copy_records(collection, records, "replace")
+    ids, payloads, vectors = zip(*records)
+    store.insert(vectors=list(vectors), payloads=list(payloads), ids=list(ids))
+    return len(records)
+
+def _delete(store, ids):
+    collection = collection_of(store)
+    if collection is None:
+        for memory_id in ids:
+            store.delete(vector_id=memory_id)
+        return
+    from sqlalchemy import text
+
+    with collection.client.Session() as session:
+        session.execute(text(f'DELETE FROM vecs."{collection.table.name}" WHERE id = ANY(:ids)'), {"ids": list(ids)})
+        session.commit()
+
+class Reembedder:
+    """Copies a collection into the shadow collection of another embedding model, a batch at a time."""
+
+    def __init__(self, source, target, embedder, registry, batch_size=200, rate=0.0, owner=None):
+        """
+        Args:
+            source: The vector store being served (``memory.vector_store``)
+            target: Embedder spec of the new model (see embedder_spec)
+            embedder: Embedder of the new model
+            registry: The EmbeddingRegistry
+            batch_size: Memories embedded and written per batch
+            rate: Texts embedded per second at most (0 for no limit)
+            owner: Name this job checkpoints under; defaults to host:pid
+        """
+        from batching import embed_batch
+
+        self.source = source
+        self.target = target
+        self.embedder = embedder
+        self.registry = registry
+        self.batch_size = batch_size
+        self.rate = rate
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.name = shadow_name(target)
+        self._embed_batch = embed_batch
+        registry.register(self.name, target, "building")
+        registry.reopen(self.name)
+        row = registry.get(self.name)
+        self.cursor = row["cursor"]
+        self.copied = row["copied"]
+        self.shadow = open_collection(source, self.name, int(target["dims"]))
+        self._records = None
+        # Start of the last sync pass; catch_up copies what changed after it
+        self.synced_at = None
+        self._started = time.monotonic()
+        self._embedded = 0
+        self.report = {"collection": self.name, "copied": self.copied, "resumed_after": self.cursor,
+                       "synced": 0, "deleted": 0}
+
+    def claim(self):
+        """Whether this job may run; false while another process is running it."""
+        return self.registry.claim(self.name, self.owner)
+
+    def _embed(self, records):
+        texts = [payload.get("data") or "" for _, payload, _ in records]
+        vectors = self._embed_batch(self.embedder, texts, "add")
+        self._embedded += len(texts)
+        dims = int(self.target["dims"])
+        for (memory_id, _, _), vector in zip(records, vectors):
+            if len(vector) != dims:
+                raise ValueError(f"{self.target['model']} returned {len(vector)} dimensions for {memory_id}, not {dims}")
+        return [(memory_id, payload, vector) for (memory_id, payload, _), vector in zip(records, vectors)]
+
+    def pause(self):
+        """Seconds to wait before the next batch to stay within the rate limit."""
+        if not self.rate:
+            return 0.0
+        return max(0.0, self._embedded / self.rate - (time.monotonic() - self._started))
+
+    def run_batch(self):
+        """Embed and write the next batch of the copy; returns False once the copy is complete."""
+        if self._records is None:
+            self._records = iter_records(self.source, None, self.batch_size, after=self.cursor, vectors=False)
+        chunk = next(self._records, None)
+        if not chunk:
+            return False
+        _write(self.shadow, self._embed(chunk))
+        self.cursor = chunk[-1][0]
+        self.copied += len(chunk)
+        self.report["copied"] = self.copied
+        self.registry.checkpoint(self.name, self.cursor, self.copied, self.owner)
+        return True
+
+    def sync(self):
+        """Bring the shadow collection up to date: re-embed new and changed memories, delete removed ones.
+
+        Returns:
+            int: Memories written or deleted
+        """
+        self.synced_at = datetime.now(timezone.utc)
+        changes = 0
+        for chunk in iter_records(self.source, None, self.batch_size, vectors=False):
+            existing = _payloads(self.shadow, [memory_id for memory_id, _, _ in chunk])
+            changed = [record for record in chunk if existing.get(record[0]) != record[1]]
+            if changed:
+                _write(self.shadow, self._embed(changed))
+                changes += len(changed)
+                self.report["synced"] += len(changed)
+            time.sleep(self.pause())
+        for chunk in iter_records(self.shadow, None, self.batch_size, vectors=False):
+            ids = [memory_id for memory_id, _, _ in chunk]
+            removed = set(ids) - set(_payloads(self.source, ids))
+            if removed:
+                _delete(self.shadow, removed)
+                changes += len(removed)
+                self.report["deleted"] += len(removed)
+        return changes
+
+    def catch_up(self, source, target):
+        """Copy writes that reached source after the last sync pass into target, which now takes writes itself.
+
+        Only memories added or updated in source since that pass are copied. A
+        memory target already holds a newer copy of is left alone, and so is one
+        that existed before the pass but is missing from target: it was deleted
+        there after the cutover.
+
+        Args:
+            source: The retired collection's store
+            target: The store of the now active collection
+
+        Returns:
+            int: Memories written
+        """
+        since = self.synced_at
+        changes = 0
+        for chunk in iter_records(source, None, self.batch_size, vectors=False):
+            late = [record for record in chunk if _changed_at(record[1]) > since]
+            if not late:
+                continue
+            existing = _payloads(target, [memory_id for memory_id, _, _ in late])
+            copy = []
+            for memory_id, payload, vector in late:
+                if memory_id in existing:
+                    if _changed_at(payload) > _changed_at(existing[memory_id]):
+                        copy.append((memory_id, payload, vector))
+                elif _timestamp(payload.get("created_at")) > since:
+                    copy.append((memory_id, payload, vector))
+            if copy:
+                _write(target, self._embed(copy))
+                changes += len(copy)
+                self.report["synced"] += len(copy)
+        return changes
+
+    def _build_indexes(self):
+        collection = collection_of(self.shadow)
+        if collection is None:
+            return
+        from quantization import build_codec, ensure_pg_encoded_index, get_encoding_settings
+        from vector_indexes import build_ann_index, get_ann_index_settings
+
+        settings = get_ann_index_settings()
+        self.report["index"] = build_ann_index(collection, **settings)
+        codec = build_codec(int(self.target["dims"]), self.target["model"], get_encoding_settings())
+        if codec is not None:
+            ensure_pg_encoded_index(collection, codec, settings["m"], settings["ef_construction"])
+
+    def finish(self):
+        """Sync, build the vector index and make the shadow collection the active one."""
+        for _ in range(_SYNC_PASSES):
+            if self.sync() == 0:
+                break
+        self._build_indexes()
+        close = getattr(self.shadow, "close", None)
+        if close is not None:
+            # The server opens the collection anew; a local store must not be open twice
+            close()
+        self.registry.cutover(self.name)
+        self.report["seconds"] = round(time.monotonic() - self._started, 3)
+        logger.info(f"Re-embedding done, {self.name} is now active: {json.dumps(self.report, default=str)}")
+        return self.report
+
+    def run(self):
+        """Copy, sync and cut over in the foreground."""
+        while self.run_batch():
+            time.sleep(self.pause())
+        return self.finish()
+
+def collection_progress(registry, source=None):
+    """Registry rows, with the source row count when source (the active vector store) is given."""
+    rows = registry.rows()
+    total = None
+    if source is not None:
+        collection = collection_of(source)
+        if collection is not None:
+            from sqlalchemy import text
+
+            with collection.client.Session() as session:
+                total = session.execute(text(f'SELECT count(*) FROM vecs."{collection.table.name}"')).scalar()
+        elif hasattr(source, "col_info"):
+            total = source.col_info().get("count")
+    return {"source_rows": total, "collections": rows}
+
+def main():
+    settings = get_reembed_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show the registered collections and the progress of a re-embedding")
+    run = commands.add_parser("run", help="Re-embed into the configured model's collection and switch to it")
+    run.add_argument("--batch-size", type=int, default=settings["batch_size"])
+    run.add_argument("--rate", type=float, default=settings["rate"], help="texts embedded per second at most")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    from utils import get_mem0_client
+
+    load_dotenv()
+    memory = get_mem0_client()
+    registry = open_registry()
+    try:
+        if args.command == "status":
+            report = collection_progress(registry, memory.vector_store)
+        elif memory.embedding_target is None:
+            report = {"message": "The active collection already uses the configured embedding model"}
+        else:
+            job = Reembedder(memory.vector_store, memory.embedding_target, build_embedder(memory.embedding_target),
+                             registry, args.batch_size, args.rate)
+            if not job.claim():
+                parser.error(f"Another process is re-embedding into {job.name}")
+            report = job.run()
+    finally:
+        registry.close()
+        close = getattr(memory.vector_store, "close", None)
+        if close is not None:
+            close()
+    print(json.dumps(report, indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
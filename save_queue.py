@@ -0,0 +1,441 @@
+"""
+Durable write-behind queue for deferred save_memory calls.
+
+In deferred mode ``save_memory`` only records the text in a local SQLite
+database (WAL journal) and returns a ticket ID. A background worker started by
+the lifespan drains the queue through Mem0, so LLM extraction and embedding
+happen off the agent's critical path. Tickets survive restarts: anything left
+pending or in progress when the server stops is picked up again next time.
+
+Worker processes on one host can share the SQLite file. Workers spread over
+several hosts use ``RedisSaveQueue`` instead (SHARED_BACKEND=redis).
+"""
+from datetime import datetime, timezone
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from utils import env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+DEFAULT_SAVE_QUEUE_PATH = os.path.join(os.path.expanduser("~"), ".mem0", "mcp_save_queue.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS save_queue (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    scope TEXT,
+    mode TEXT,
+    metadata TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS save_queue_status_idx ON save_queue (status, available_at, created_at);
+"""
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+class SaveQueue:
+    """SQLite-backed queue of texts waiting to be saved to Mem0."""
+
+    def __init__(self, path=DEFAULT_SAVE_QUEUE_PATH, max_attempts=3, retry_backoff=5.0):
+        """
+        Args:
+            path: Location of the SQLite database file
+            max_attempts: How many times a save is tried before it is marked failed
+            retry_backoff: Base delay in seconds before a failed save is retried
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # A ticket is only handed out once its row is on disk
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(save_queue)")}
+        if "scope" not in columns:
+            # Queues created before saves were scoped only carry a user_id
+            self._conn.execute("ALTER TABLE save_queue ADD COLUMN scope TEXT")
+        if "mode" not in columns:
+            self._conn.execute("ALTER TABLE save_queue ADD COLUMN mode TEXT")
+        if "metadata" not in columns:
+            self._conn.execute("ALTER TABLE save_queue ADD COLUMN metadata TEXT")
+
+    def enqueue(self, text, filters, mode="infer", metadata=None):
+        """Persist a save request for the user_id / agent_id / run_id in filters and return its ticket ID."""
+        ticket_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO save_queue (id, user_id, text, scope, mode, metadata, status, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    ticket_id, filters.get("user_id", ""), text, json.dumps(filters), mode,
+                    json.dumps(metadata) if metadata else None, PENDING, now, now, now,
+                ),
+            )
+        return ticket_id
+
+    def claim(self):
+        """Mark the oldest ready item as processing and return it, or None if nothing is ready."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, user_id, text, scope, mode, metadata, attempts FROM save_queue "
+                    "WHERE status = ? AND available_at <= ? ORDER BY created_at LIMIT 1",
+                    (PENDING, now),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE save_queue SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (PROCESSING, now, row["id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        scope = json.loads(row["scope"]) if row["scope"] else {"user_id": row["user_id"]}
+        return {
+            "id": row["id"],
+            "scope": scope,
+            "mode": row["mode"] or "infer",
+            "metadata": json.loads(row["metadata"]) if row["metadata"] else None,
+            "text": row["text"],
+            "attempts": row["attempts"] + 1,
+        }
+
+    def complete(self, ticket_id, result=None):
+        """Mark a claimed item as saved, keeping the Mem0 result for get_save_status."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE save_queue SET status = ?, result = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (DONE, json.dumps(result, default=str), time.time(), ticket_id),
+            )
+
+    def fail(self, ticket_id, error):
+        """Record a failed attempt; the item is retried with backoff until max_attempts is reached."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM save_queue WHERE id = ?", (ticket_id,)).fetchone()
+            if row is None:
+                return
+            if row["attempts"] >= self.max_attempts:
+                self._conn.execute(
+                    "UPDATE save_queue SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                    (FAILED, error, now, ticket_id),
+                )
+            else:
+                delay = self.retry_backoff * (2 ** (row["attempts"] - 1))
+                self._conn.execute(
+                    "UPDATE save_queue SET status = ?, error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+                    (PENDING, error, now + delay, now, ticket_id),
+                )
+
+    def requeue_stale(self, older_than=0.0):
+        """Return items left in processing by a previous run to the pending state.
+
+        Args:
+            older_than: Only requeue items claimed at least this many seconds ago, so
+                items other worker processes are saving right now are left alone
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE save_queue SET status = ?, updated_at = ? WHERE status = ? AND updated_at <= ?",
+                (PENDING, now, PROCESSING, now - older_than),
+            )
+        return cursor.rowcount
+
+    def status(self, ticket_id):
+        """Return the state of a ticket, or None if the ticket is unknown."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, attempts, error, result, created_at, updated_at FROM save_queue WHERE id = ?",
+                (ticket_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "ticket_id": row["id"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "error": row["error"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "created_at": _isoformat(row["created_at"]),
+            "updated_at": _isoformat(row["updated_at"]),
+        }
+
+    def depth(self):
+        """Return the number of queued items per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM save_queue GROUP BY status").fetchall()
+        counts = {PENDING: 0, PROCESSING: 0, DONE: 0, FAILED: 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Atomically move the oldest ready ticket from the pending to the processing set
+_CLAIM_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 1)
+if #ids == 0 then return nil end
+redis.call('ZREM', KEYS[1], ids[1])
+redis.call('ZADD', KEYS[2], ARGV[1], ids[1])
+local ticket = ARGV[2] .. ids[1]
+redis.call('HINCRBY', ticket, 'attempts', 1)
+redis.call('HSET', ticket, 'status', 'processing', 'updated_at', ARGV[1])
+return ids[1]
+"""
+
+class RedisSaveQueue:
+    """SaveQueue with the same interface, kept in a Redis-compatible server shared by every worker host.
+
+    Each ticket is a hash; ready tickets sit in a sorted set scored by the time
+    they become available, claimed ones in a second set scored by claim time.
+    """
+
+    def __init__(self, client, prefix="mem0", max_attempts=3, retry_backoff=5.0, result_ttl=7 * 86400):
+        """
+        Args:
+            client: A redis.Redis client
+            prefix: Prefix of every key the queue uses
+            max_attempts: How many times a save is tried before it is marked failed
+            retry_backoff: Base delay in seconds before a failed save is retried
+            result_ttl: Seconds a finished ticket stays available to get_save_status
+        """
+        self.client = client
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.result_ttl = result_ttl
+        self._ticket_prefix = f"{prefix}:save_queue:ticket:"
+        self._pending = f"{prefix}:save_queue:pending"
+        self._processing = f"{prefix}:save_queue:processing"
+        self._finished = f"{prefix}:save_queue:finished"
+        self._claim = client.register_script(_CLAIM_SCRIPT)
+
+    def _field(self, ticket, name):
+        value = ticket.get(name.encode())
+        return value.decode() if value is not None else None
+
+    def enqueue(self, text, filters, mode="infer", metadata=None):
+        ticket_id = uuid.uuid4().hex
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.hset(self._ticket_prefix + ticket_id, mapping={
+            "text": text,
+            "scope": json.dumps(filters),
+            "mode": mode,
+            "metadata": json.dumps(metadata) if metadata else "",
+            "status": PENDING,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        })
+        pipe.zadd(self._pending, {ticket_id: now})
+        pipe.execute()
+        return ticket_id
+
+    def claim(self):
+        ticket_id = self._claim(keys=[self._pending, self._processing], args=[time.time(), self._ticket_prefix])
+        if ticket_id is None:
+            return None
+        ticket_id = ticket_id.decode()
+        ticket = self.client.hgetall(self._ticket_prefix + ticket_id)
+        metadata = self._field(ticket, "metadata")
+        return {
+            "id": ticket_id,
+            "scope": json.loads(self._field(ticket, "scope")),
+            "mode": self._field(ticket, "mode") or "infer",
+            "metadata": json.loads(metadata) if metadata else None,
+            "text": self._field(ticket, "text"),
+            "attempts": int(self._field(ticket, "attempts")),
+        }
+
+    def _finish(self, ticket_id, status, fields):
+        key = self._ticket_prefix + ticket_id
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={"status": status, "updated_at": time.time(), **fields})
+        pipe.zrem(self._processing, ticket_id)
+        pipe.hincrby(self._finished, status, 1)
+        pipe.expire(key, self.result_ttl)
+        pipe.execute()
+
+    def complete(self, ticket_id, result=None):
+        self._finish(ticket_id, DONE, {"result": json.dumps(result, default=str), "error": ""})
+
+    def fail(self, ticket_id, error):
+        attempts = self.client.hget(self._ticket_prefix + ticket_id, "attempts")
+        if attempts is None:
+            return
+        attempts = int(attempts)
+        if attempts >= self.max_attempts:
+            self._finish(ticket_id, FAILED, {"error": error})
+            return
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.hset(self._ticket_prefix + ticket_id, mapping={"status": PENDING, "error": error, "updated_at": now})
+        pipe.zrem(self._processing, ticket_id)
+        pipe.zadd(self._pending, {ticket_id: now + self.retry_backoff * (2 ** (attempts - 1))})
+        pipe.execute()
+
+    def requeue_stale(self, older_than=0.0):
+        now = time.time()
+        stale = self.client.zrangebyscore(self._processing, "-inf", now - older_than)
+        for ticket_id in stale:
+            if self.client.zrem(self._processing, ticket_id):
+                self.client.hset(self._ticket_prefix + ticket_id.decode(), mapping={"status": PENDING, "updated_at": now})
+                self.client.zadd(self._pending, {ticket_id: now})
+        return len(stale)
+
+    def status(self, ticket_id):
+        ticket = self.client.hgetall(self._ticket_prefix + ticket_id)
+        if not ticket:
+            return None
+        result = self._field(ticket, "result")
+        return {
+            "ticket_id": ticket_id,
+            "status": self._field(ticket, "status"),
+            "attempts": int(self._field(ticket, "attempts")),
+            "error": self._field(ticket, "error") or None,
+            "result": json.loads(result) if result else None,
+            "created_at": _isoformat(float(self._field(ticket, "created_at"))),
+            "updated_at": _isoformat(float(self._field(ticket, "updated_at"))),
+        }
+
+    def depth(self):
+        finished = {key.decode(): int(value) for key, value in self.client.hgetall(self._finished).items()}
+        return {
+            PENDING: self.client.zcard(self._pending),
+            PROCESSING: self.client.zcard(self._processing),
+            DONE: finished.get(DONE, 0),
+            FAILED: finished.get(FAILED, 0),
+        }
+
+    def close(self):
+        # The client belongs to the shared backend, which closes it
+        pass
+
+class SaveQueueWorker:
+    """Background tasks that drain a SaveQueue through an async save callable."""
+
+    def __init__(self, queue, save, concurrency=2, poll_interval=1.0, stale_after=0.0):
+        """
+        Args:
+            queue: The SaveQueue to drain
+            save: Async callable taking a claimed item and returning the Mem0 result
+            concurrency: Number of items saved in parallel
+            poll_interval: Seconds between checks for items whose retry delay has passed
+            stale_after: On start, only requeue items left in processing for this many seconds;
+                set it when other worker processes share the queue
+        """
+        self.queue = queue
+        self.save = save
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._wakeup = asyncio.Event()
+        self._draining = False
+        self._tasks = []
+
+    def start(self):
+        requeued = self.queue.requeue_stale(self.stale_after)
+        if requeued:
+            logger.info(f"Requeued {requeued} saves left in progress by a previous run")
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    def notify(self):
+        """Wake the workers after a new item was enqueued."""
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                item = await asyncio.to_thread(self.queue.claim)
+            except Exception as e:
+                # A locked or unreachable queue database must not stop the worker for good
+                logger.warning(f"Could not claim a deferred save: {e}")
+                item = None
+            if item is None:
+                if self._draining:
+                    return
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            try:
+                result = await self.save(item)
+            except Exception as e:
+                logger.warning(f"Deferred save {item['id']} failed (attempt {item['attempts']}): {e}")
+                await asyncio.to_thread(self.queue.fail, item["id"], str(e))
+            else:
+                await asyncio.to_thread(self.queue.complete, item["id"], result)
+
+    async def drain(self, timeout=30.0):
+        """Save everything that is ready, then stop; give up after timeout seconds.
+
+        Items still pending after the timeout stay in the database and are
+        processed the next time the server starts.
+        """
+        self._draining = True
+        self._wakeup.set()
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            # Idle workers are cancelled too (right away with timeout=0); only unsaved items are worth a warning
+            depth = self.queue.depth()
+            if depth[PENDING] or depth[PROCESSING]:
+                logger.warning(f"Save queue drain timed out; remaining items resume on next start: {depth}")
+        self._tasks = []
+
+def get_save_queue(shared=None):
+    """Build the SaveQueue configured by the SAVE_QUEUE_* settings; a RedisSaveQueue with a Redis shared backend."""
+    from shared_state import RedisBackend
+
+    if isinstance(shared, RedisBackend):
+        return RedisSaveQueue(
+            shared.client,
+            prefix=shared.prefix,
+            max_attempts=env_int("SAVE_QUEUE_MAX_ATTEMPTS", 3),
+            retry_backoff=env_float("SAVE_QUEUE_RETRY_BACKOFF", 5.0),
+        )
+    return SaveQueue(
+        path=os.getenv("SAVE_QUEUE_PATH") or DEFAULT_SAVE_QUEUE_PATH,
+        max_attempts=env_int("SAVE_QUEUE_MAX_ATTEMPTS", 3),
+        retry_backoff=env_float("SAVE_QUEUE_RETRY_BACKOFF", 5.0),
+    )
@@ -0,0 +1,102 @@
+"""
+Resolution of the user_id / agent_id / run_id scope a tool call operates on.
+
+Each id is taken from, in order of precedence:
+
+1. the tool argument,
+2. the request's ``_meta`` (e.g. ``{"_meta": {"user_id": "alice"}}``),
+3. the scope set for the current connection with the ``set_memory_scope`` tool
+   (not available on the stateless streamable-HTTP transport),
+4. the DEFAULT_USER_ID / DEFAULT_AGENT_ID / DEFAULT_RUN_ID settings.
+
+Mem0 requires at least one id, so DEFAULT_USER_ID falls back to "user".
+"""
+from dataclasses import dataclass
+from itertools import combinations
+from weakref import WeakKeyDictionary
+import os
+
+SCOPE_KEYS = ("user_id", "agent_id", "run_id")
+
+@dataclass(frozen=True)
+class MemoryScope:
+    """The Mem0 entity ids a memory operation is restricted to."""
+    user_id: str | None = None
+    agent_id: str | None = None
+    run_id: str | None = None
+
+    def filters(self) -> dict:
+        """Return the ids that are set, as Mem0 keyword arguments / payload filters."""
+        return {key: getattr(self, key) for key in SCOPE_KEYS if getattr(self, key)}
+
+    def key(self) -> tuple:
+        """Hashable identity of the scope, used by caches and batchers."""
+        return scope_key(self.filters())
+
+def scope_key(filters: dict) -> tuple:
+    return tuple(sorted((key, value) for key, value in filters.items() if key in SCOPE_KEYS and value))
+
+def covering_keys(filters: dict) -> list[tuple]:
+    """Return the keys of every scope whose results can include memories written under filters.
+
+    A memory written for (user, agent) shows up in searches scoped to the user, to
+    the agent, to both, or to nothing narrower than those, i.e. every subset.
+    """
+    items = scope_key(filters)
+    return [subset for size in range(len(items) + 1) for subset in combinations(items, size)]
+
+# Scopes set with set_memory_scope, per client connection
+_session_scopes = WeakKeyDictionary()
+
+def _default_scope() -> MemoryScope:
+    return MemoryScope(
+        user_id=os.getenv("DEFAULT_USER_ID", "user"),
+        agent_id=os.getenv("DEFAULT_AGENT_ID") or None,
+        run_id=os.getenv("DEFAULT_RUN_ID") or None,
+    )
+
+def _request_meta(ctx) -> dict:
+    meta = getattr(ctx.request_context, "meta", None)
+    if meta is None:
+        return {}
+    values = meta.model_dump() if hasattr(meta, "model_dump") else dict(meta)
+    return {key: values[key] for key in SCOPE_KEYS if values.get(key)}
+
+def _session(ctx):
+    return getattr(ctx.request_context, "session", None)
+
+def set_session_scope(ctx, user_id=None, agent_id=None, run_id=None) -> MemoryScope:
+    """Remember a scope for every later tool call on the same connection."""
+    if os.getenv("TRANSPORT") == "streamable-http":
+        # Every stateless HTTP request is a new session, so the scope would be forgotten at once
+        raise ValueError(
+            "the streamable-http transport is stateless; pass user_id / agent_id / run_id with each call "
+            "or in the request _meta instead"
+        )
+    scope = MemoryScope(user_id=user_id or None, agent_id=agent_id or None, run_id=run_id or None)
+    session = _session(ctx)
+    if session is None:
+        raise ValueError("No client session to attach the scope to")
+    _session_scopes[session] = scope
+    return scope
+
+def resolve_scope(ctx, user_id=None, agent_id=None, run_id=None) -> MemoryScope:
+    """Resolve the scope of a tool call from its arguments, request metadata and session.
+
+    Args:
+        ctx: The MCP server provided context
+        user_id: Explicit user id from the tool call, if any
+        agent_id: Explicit agent id from the tool call, if any
+        run_id: Explicit run id from the tool call, if any
+    """
+    explicit = {"user_id": user_id, "agent_id": agent_id, "run_id": run_id}
+    meta = _request_meta(ctx)
+    session = _session(ctx)
+    session_scope = _session_scopes.get(session) if session is not None else None
+    default = _default_scope()
+
+    resolved = {}
+    for key in SCOPE_KEYS:
+        sources = (explicit.get(key), meta.get(key), getattr(session_scope, key, None), getattr(default, key))
+        resolved[key] = next((source for source in sources if source), None)
+    return MemoryScope(**resolved)
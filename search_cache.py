@@ -0,0 +1,175 @@
+"""
+Short-lived cache of whole search_memories results.
+
+Results are cached per (scope, query, limit, search mode) for a few seconds, where the
+scope is the user_id / agent_id / run_id the search is filtered on. Every
+write bumps the generation counter of each scope whose searches could see the
+new memory and drops their entries, and a search that started before such a
+write never stores its (possibly stale) result.
+Optionally, a query whose embedding is close enough to a cached query's
+embedding is answered from that entry, so slightly reworded queries skip the
+vector store round-trip as well.
+
+With a shared backend (see shared_state.py) the generation counters live in
+the backend, so a write handled by one worker process also invalidates what
+the other workers have cached.
+"""
+from collections import OrderedDict
+import json
+import threading
+import time
+
+import numpy as np
+
+from embedding_cache import normalize_text
+from scoping import covering_keys, scope_key
+from utils import env_float, env_int
+
+class SearchResultCache:
+    """Per-scope search result cache with TTL, LRU bound and write-aware invalidation."""
+
+    def __init__(self, ttl=30.0, max_entries=2048, similarity_threshold=0.0, shared=None):
+        """
+        Args:
+            ttl: Seconds a cached result stays valid
+            max_entries: Maximum number of cached results across all users
+            similarity_threshold: Minimum cosine similarity for a near-duplicate query to reuse
+                a cached result; 0 disables near-duplicate matching
+            shared: Shared backend holding the generation counters of every worker, or None
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._scope_entries = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "similar_hits": 0, "misses": 0, "invalidations": 0, "expirations": 0, "evictions": 0}
+
+    def _current_generation(self, scope):
+        if self.shared is not None:
+            return self.shared.counter(f"search_generation:{json.dumps(scope)}")
+        with self._lock:
+            return self._generations.get(scope, 0)
+
+    def generation(self, filters):
+        """Return the scope's current generation; pass it back to put() after the search."""
+        return self._current_generation(scope_key(filters))
+
+    def get(self, filters, query, limit, mode="vector"):
+        """Return the cached result for an exact (normalized) query in a scope, or None."""
+        key = (scope_key(filters), normalize_text(query), limit, mode)
+        generation = self._current_generation(key[0]) if self.shared is not None else None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and generation is not None and entry["generation"] != generation:
+                # Another worker wrote to the scope since this result was cached
+                self._drop(key)
+                self._counters["invalidations"] += 1
+                entry = None
+            if entry is not None:
+                if entry["expires_at"] > time.time():
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return entry["results"]
+                self._drop(key)
+                self._counters["expirations"] += 1
+            if not self.similarity_threshold:
+                self._counters["misses"] += 1
+            return None
+
+    def get_similar(self, filters, limit, query_vector, mode="vector"):
+        """Return the result of the most similar cached query in the scope above the threshold, or None."""
+        now = time.time()
+        generation = self._current_generation(scope_key(filters)) if self.shared is not None else None
+        with self._lock:
+            candidates = [
+                key for key in self._scope_entries.get(scope_key(filters), ())
+                if key[2:] == (limit, mode) and self._entries[key]["vector"] is not None and self._entries[key]["expires_at"] > now
+                and (generation is None or self._entries[key]["generation"] == generation)
+            ]
+            if candidates:
+                matrix = np.array([self._entries[key]["vector"] for key in candidates], dtype=np.float32)
+                query = np.asarray(query_vector, dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+                similarities = matrix @ query / np.where(norms == 0, 1.0, norms)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    self._entries.move_to_end(candidates[best])
+                    self._counters["similar_hits"] += 1
+                    return self._entries[candidates[best]]["results"]
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, filters, query, limit, results, generation, query_vector=None, mode="vector"):
+        """Cache a result, unless a write that affects the scope happened since the search started."""
+        key = (scope_key(filters), normalize_text(query), limit, mode)
+        current = self._current_generation(key[0]) if self.shared is not None else None
+        with self._lock:
+            if (current if current is not None else self._generations.get(key[0], 0)) != generation:
+                return
+            self._entries[key] = {
+                "results": results,
+                "vector": query_vector,
+                "generation": generation,
+                "expires_at": time.time() + self.ttl,
+            }
+            self._entries.move_to_end(key)
+            self._scope_entries.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, filters):
+        """Bump the generation of, and drop the results of, every scope a write in filters affects."""
+        if self.shared is not None:
+            for affected in covering_keys(filters):
+                self.shared.incr(f"search_generation:{json.dumps(affected)}")
+        with self._lock:
+            for affected in covering_keys(filters):
+                self._generations[affected] = self._generations.get(affected, 0) + 1
+                for key in list(self._scope_entries.get(affected, ())):
+                    self._drop(key)
+                    self._counters["invalidations"] += 1
+
+    def clear(self):
+        """Drop every cached result, e.g. after searches moved to vectors of another embedding model."""
+        with self._lock:
+            self._counters["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._scope_entries.clear()
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        keys = self._scope_entries.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._scope_entries[key[0]]
+
+    def stats(self):
+        """Return hit/miss/invalidation counters and the current number of entries."""
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        lookups = counters["hits"] + counters["similar_hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round((counters["hits"] + counters["similar_hits"]) / lookups, 4) if lookups else 0.0,
+            "entries": size,
+            "max_entries": self.max_entries,
+        }
+
+def get_search_cache(shared=None):
+    """Build the SearchResultCache configured by the SEARCH_CACHE_* settings, or None if disabled."""
+    ttl = env_float("SEARCH_CACHE_TTL", 30.0)
+    if ttl <= 0:
+        return None
+    return SearchResultCache(
+        ttl=ttl,
+        max_entries=env_int("SEARCH_CACHE_SIZE", 2048),
+        similarity_threshold=env_float("SEARCH_CACHE_SIMILARITY", 0.0),
+        shared=shared,
+    )
@@ -0,0 +1,151 @@
+"""
+State shared between server worker processes.
+
+With the streamable-HTTP transport the server can run several worker
+processes (HTTP_WORKERS), each with its own Mem0 client and in-process caches.
+The little state that has to agree across them goes through a shared backend:
+
+* the search cache's per-scope generation counters, so a write handled by one
+  worker invalidates the cached results of every worker
+* an extra tier of the embedding cache, so a text embedded by one worker is
+  not embedded again by the next
+* leader locks, so the periodic compaction and lifecycle sweeps run in one
+  worker at a time
+* with the Redis backend, the deferred save queue (see save_queue.RedisSaveQueue)
+
+SHARED_BACKEND=local keeps this state in a SQLite file, which serves the
+workers of a single host and stands in for Redis in tests and benchmarks.
+SHARED_BACKEND=redis uses a Redis-compatible server at REDIS_URL and also
+works across hosts behind a load balancer.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from utils import env_int
+
+DEFAULT_SHARED_STATE_PATH = os.path.join(os.path.expanduser("~"), ".mem0", "shared_state.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared_values (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL);
+CREATE TABLE IF NOT EXISTS shared_counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+class LocalBackend:
+    """Shared state in a SQLite file that every worker process on the host opens."""
+
+    def __init__(self, path=DEFAULT_SHARED_STATE_PATH, prefix="mem0"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def get(self, key):
+        """Return the bytes stored under key, or None if missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM shared_values WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (self._key(key), time.time()),
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key, value, ttl=None):
+        """Store bytes under key, expiring after ttl seconds if given."""
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO shared_values (key, value, expires_at) VALUES (?, ?, ?)",
+                (self._key(key), value, expires_at),
+            )
+
+    def incr(self, key):
+        """Increment a counter and return its new value."""
+        with self._lock:
+            return self._conn.execute(
+                "INSERT INTO shared_counters (key, value) VALUES (?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1 RETURNING value",
+                (self._key(key),),
+            ).fetchone()[0]
+
+    def counter(self, key):
+        """Return a counter's value (0 if it was never incremented)."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM shared_counters WHERE key = ?", (self._key(key),)).fetchone()
+        return row[0] if row else 0
+
+    def try_lock(self, name, ttl):
+        """Take a named lock for ttl seconds unless another worker holds it; returns whether it was taken."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO shared_values (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+                "WHERE shared_values.expires_at <= ?",
+                (self._key(f"lock:{name}"), str(os.getpid()).encode(), now + ttl, now),
+            )
+        return cursor.rowcount == 1
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class RedisBackend:
+    """Shared state in a Redis-compatible server (Redis, Valkey, KeyDB, ...)."""
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="mem0"):
+        import redis
+
+        self.url = url
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def get(self, key):
+        return self.client.get(self._key(key))
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self._key(key), value, ex=int(ttl) if ttl else None)
+
+    def incr(self, key):
+        return self.client.incr(self._key(key))
+
+    def counter(self, key):
+        value = self.client.get(self._key(key))
+        return int(value) if value is not None else 0
+
+    def try_lock(self, name, ttl):
+        return bool(self.client.set(self._key(f"lock:{name}"), os.getpid(), nx=True, ex=max(1, int(ttl))))
+
+    def close(self):
+        self.client.close()
+
+def get_shared_backend(default="none"):
+    """Build the backend named by SHARED_BACKEND (local, redis or none), or None for none.
+
+    Args:
+        default: Backend used when SHARED_BACKEND is not set
+    """
+    name = os.getenv("SHARED_BACKEND") or default
+    prefix = os.getenv("SHARED_KEY_PREFIX", "mem0")
+    if name == "none":
+        return None
+    if name == "local":
+        return LocalBackend(os.getenv("SHARED_STATE_PATH") or DEFAULT_SHARED_STATE_PATH, prefix=prefix)
+    if name == "redis":
+        return RedisBackend(os.getenv("REDIS_URL", "redis://localhost:6379/0"), prefix=prefix)
+    raise ValueError(f"Unknown SHARED_BACKEND {name}; use local, redis or none")
+
+def get_http_workers():
+    """Number of worker processes for the streamable-HTTP transport (HTTP_WORKERS)."""
+    return max(1, env_int("HTTP_WORKERS", 1))
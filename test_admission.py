@@ -0,0 +1,172 @@
+"""
+Tests for the admission queue, displacement and slot accounting in admission.py.
+"""
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected, TokenBucket
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def settle():
+    """Let queued acquire() tasks reach their wait."""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+def controller(**kwargs):
+    settings = {"max_concurrent": 1, "client_max_concurrent": 0, "max_queue": 8, "queue_timeout": 5.0}
+    return AdmissionController(**{**settings, **kwargs})
+
+def test_calls_wait_for_a_slot_in_priority_order():
+    async def scenario():
+        admission = controller()
+        await admission.acquire("search_memories", "a")
+        save = asyncio.create_task(admission.acquire("save_memory", "b"))
+        await settle()
+        search = asyncio.create_task(admission.acquire("search_memories", "c"))
+        await settle()
+        assert admission.stats()["queued"] == 2
+
+        # The search arrived later but outranks the save
+        admission.release("search_memories", "a")
+        await asyncio.wait_for(search, 1)
+        assert not save.done()
+
+        admission.release("search_memories", "c")
+        await asyncio.wait_for(save, 1)
+        assert admission.stats()["running"] == 1
+
+    run(scenario())
+
+def test_full_queue_displaces_a_lower_priority_waiter():
+    async def scenario():
+        admission = controller(max_queue=1)
+        await admission.acquire("save_memory", "a")
+        save = asyncio.create_task(admission.acquire("save_memory", "b"))
+        await settle()
+
+        search = asyncio.create_task(admission.acquire("search_memories", "c"))
+        await settle()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await save
+        assert rejected.value.reason == "overloaded"
+        assert "displaced" in str(rejected.value)
+        assert admission.stats()["queued"] == 1
+
+        admission.release("save_memory", "a")
+        await asyncio.wait_for(search, 1)
+        assert admission.stats()["running"] == 1
+
+    run(scenario())
+
+def test_full_queue_rejects_a_call_that_does_not_outrank():
+    async def scenario():
+        admission = controller(max_queue=1)
+        await admission.acquire("search_memories", "a")
+        queued = asyncio.create_task(admission.acquire("search_memories", "b"))
+        await settle()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("save_memory", "c")
+        assert rejected.value.reason == "overloaded"
+        assert not queued.done()
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+
+    run(scenario())
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        admission = controller()
+        await admission.acquire("search_memories", "a")
+        waiter = asyncio.create_task(admission.acquire("search_memories", "b"))
+        await settle()
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert admission.stats()["queued"] == 0
+
+        admission.release("search_memories", "a")
+        assert admission.stats()["running"] == 0
+        await asyncio.wait_for(admission.acquire("search_memories", "c"), 1)
+
+    run(scenario())
+
+def test_slot_granted_to_a_cancelled_waiter_is_handed_on():
+    async def scenario():
+        admission = controller()
+        await admission.acquire("search_memories", "a")
+        first = asyncio.create_task(admission.acquire("search_memories", "b"))
+        second = asyncio.create_task(admission.acquire("search_memories", "c"))
+        await settle()
+
+        # The slot goes to the first waiter, which is cancelled before it resumes
+        admission.release("search_memories", "a")
+        first.cancel()
+        outcome = (await asyncio.gather(first, return_exceptions=True))[0]
+        if outcome is None:
+            # Before Python 3.12 wait_for returns a result that arrived with the cancellation
+            admission.release("search_memories", "b")
+        await asyncio.wait_for(second, 1)
+        assert admission.stats()["running"] == 1
+        assert admission.stats()["queued"] == 0
+
+    run(scenario())
+
+def test_cancelled_tool_call_releases_its_slot():
+    async def scenario():
+        admission = controller()
+        started = asyncio.Event()
+
+        async def slow_tool():
+            started.set()
+            await asyncio.sleep(10)
+
+        call = asyncio.create_task(admission.run("save_memory", "a", slow_tool))
+        await started.wait()
+        assert admission.stats()["running"] == 1
+
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+        assert admission.stats()["running"] == 0
+        assert admission.stats()["clients"] == 0
+
+    run(scenario())
+
+def test_queue_timeout_rejects_and_removes_the_waiter():
+    async def scenario():
+        admission = controller(queue_timeout=0.05)
+        await admission.acquire("search_memories", "a")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("search_memories", "b")
+        assert rejected.value.reason == "queue_timeout"
+        assert admission.stats()["queued"] == 0
+
+    run(scenario())
+
+def test_client_limit_lets_other_clients_through():
+    async def scenario():
+        admission = controller(max_concurrent=0, client_max_concurrent=1)
+        await admission.acquire("search_memories", "a")
+        blocked = asyncio.create_task(admission.acquire("search_memories", "a"))
+        await settle()
+
+        await asyncio.wait_for(admission.acquire("search_memories", "b"), 1)
+        assert not blocked.done()
+
+        admission.release("search_memories", "a")
+        await asyncio.wait_for(blocked, 1)
+        assert admission.stats()["running"] == 2
+
+    run(scenario())
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=1.0, burst=2)
+    bucket.updated = 100.0
+    assert bucket.take(now=100.0) == 0.0
+    assert bucket.take(now=100.0) == 0.0
+    assert bucket.take(now=100.0) == pytest.approx(1.0)
+    assert bucket.take(now=100.5) == pytest.approx(0.5)
+    assert bucket.take(now=101.0) == 0.0
@@ -0,0 +1,179 @@
+"""
+Tests for the provider circuit breakers, failover and hedging in failover.py.
+"""
+import threading
+import time
+
+import pytest
+
+from failover import CircuitBreaker, FailoverGroup, Provider, ProviderError, MIN_LATENCY_SAMPLES
+
+class FakeClock:
+    """Monotonic clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class FakeClient:
+    """Provider client that answers after delay seconds, or raises error."""
+
+    def __init__(self, answer, delay=0.0, error=None):
+        self.answer = answer
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.released = threading.Event()
+
+    def request(self):
+        self.calls += 1
+        if self.delay:
+            self.released.wait(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.answer
+
+def provider(name, client, clock=time.monotonic, failure_threshold=2, reset_after=10.0):
+    return Provider(name, client, CircuitBreaker(failure_threshold, reset_after, clock=clock))
+
+def test_circuit_opens_probes_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_after=10.0, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.advance(10.0)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # Only one probe goes through while it is outstanding
+    assert not breaker.allow()
+    assert breaker.state == "half_open"
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    assert breaker.allow()
+
+def test_failed_probe_reopens_the_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_after=10.0, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+
+    clock.advance(10.0)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.advance(9.0)
+    assert not breaker.allow()
+    clock.advance(1.0)
+    assert breaker.allow()
+
+def test_zero_threshold_never_opens():
+    breaker = CircuitBreaker(failure_threshold=0, reset_after=10.0, clock=FakeClock())
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+def test_call_fails_over_to_the_next_provider():
+    primary = FakeClient("primary", error=RuntimeError("boom"))
+    backup = FakeClient("backup")
+    group = FailoverGroup("llm", [provider("primary", primary), provider("backup", backup)], timeout=1.0, hedge=False)
+
+    assert group.call(lambda client: client.request()) == "backup"
+    stats = {entry["provider"]: entry for entry in group.stats()["providers"]}
+    assert stats["primary"]["failure"] == 1
+    assert stats["backup"]["success"] == 1
+
+def test_open_circuit_skips_the_provider():
+    clock = FakeClock()
+    primary = FakeClient("primary", error=RuntimeError("boom"))
+    backup = FakeClient("backup")
+    group = FailoverGroup(
+        "llm", [provider("primary", primary, clock), provider("backup", backup, clock)], timeout=1.0, hedge=False,
+    )
+
+    for _ in range(2):
+        assert group.call(lambda client: client.request()) == "backup"
+    assert group.providers[0].breaker.state == "open"
+    assert group.call(lambda client: client.request()) == "backup"
+    assert primary.calls == 2
+
+    # After reset_after the recovered primary gets the probe and closes its circuit
+    primary.error = None
+    clock.advance(10.0)
+    assert group.call(lambda client: client.request()) == "primary"
+    assert group.providers[0].breaker.state == "closed"
+
+def test_call_raises_when_every_provider_fails():
+    group = FailoverGroup(
+        "embedding",
+        [provider("a", FakeClient("a", error=RuntimeError("down"))), provider("b", FakeClient("b", error=ValueError("bad")))],
+        timeout=1.0,
+        hedge=False,
+    )
+    with pytest.raises(ProviderError, match="a: down; b: bad"):
+        group.call(lambda client: client.request())
+
+def test_invalid_result_counts_as_a_failure():
+    group = FailoverGroup("embedding", [provider("short", FakeClient([0.1])), provider("full", FakeClient([0.1, 0.2]))],
+                          timeout=1.0, hedge=False)
+
+    def validate(vector):
+        if len(vector) != 2:
+            raise ValueError("wrong dimensions")
+
+    assert group.call(lambda client: client.request(), validate=validate) == [0.1, 0.2]
+    assert group.providers[0].counters["failure"] == 1
+
+def test_slow_primary_is_timed_out():
+    primary = FakeClient("primary", delay=5.0)
+    group = FailoverGroup("llm", [provider("primary", primary), provider("backup", FakeClient("backup"))],
+                          timeout=0.05, hedge=False)
+    try:
+        assert group.call(lambda client: client.request()) == "backup"
+        assert group.providers[0].counters["timeout"] == 1
+    finally:
+        primary.released.set()
+
+def test_hedge_wins_over_a_slow_primary():
+    primary = FakeClient("primary", delay=5.0)
+    backup = FakeClient("backup")
+    group = FailoverGroup("llm", [provider("primary", primary), provider("backup", backup)],
+                          timeout=5.0, hedge=True, hedge_percentile=95, min_hedge_delay=0.01)
+    # The primary usually answers in 10ms, so a request still running after that is hedged
+    for _ in range(MIN_LATENCY_SAMPLES):
+        group.providers[0].record("success", 0.01)
+    try:
+        started = time.monotonic()
+        assert group.call(lambda client: client.request()) == "backup"
+        assert time.monotonic() - started < 1.0
+    finally:
+        primary.released.set()
+
+    stats = group.stats()
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+    assert backup.calls == 1
+
+def test_no_hedge_before_enough_latency_samples():
+    primary = FakeClient("primary", delay=0.05)
+    backup = FakeClient("backup")
+    group = FailoverGroup("llm", [provider("primary", primary), provider("backup", backup)],
+                          timeout=5.0, hedge=True, min_hedge_delay=0.0)
+
+    assert group.call(lambda client: client.request()) == "primary"
+    assert group.stats()["hedges"] == 0
+    assert backup.calls == 0
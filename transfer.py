@@ -0,0 +1,463 @@
+"""
+Bulk export and import of memories with their embeddings.
+
+get_all_memories only returns memory texts, so a backup restored through
+add_memory runs extraction and embedding again for every row. An export here
+streams the raw vector store records instead: id, payload (text, hash,
+timestamps, scope and metadata) and vector. An import writes them back as they
+are. The stored vectors are reused when the export was made with the embedding
+model and dimensions the server uses now; otherwise, or with --reembed, the
+texts are embedded again in batches.
+
+Formats:
+
+* ``ndjson`` (default): a header line naming the embedding model and
+  dimensions, then one JSON record per line with the vector as base64
+  little-endian float32 (exact, and a third the size of JSON numbers). Paths
+  ending in .gz are gzip compressed; "-" is stdin / stdout.
+* ``parquet``: columns id, payload (JSON text) and vector (float32 list), with
+  the header in the file metadata. Needs pyarrow (the ``parquet`` extra).
+
+Both directions work in chunks of TRANSFER_CHUNK_SIZE records, so memory use
+does not grow with the collection. On pgvector the export pages through the
+table by id, and the import COPYs each chunk into a temporary table and moves
+it into the collection with one INSERT ... ON CONFLICT per chunk. Other vector
+stores go through their insert method.
+
+Usage:
+    python transfer.py export memories.ndjson.gz --user-id alice
+    python transfer.py import memories.ndjson.gz --on-conflict replace --defer-index
+"""
+from datetime import datetime, timezone
+import argparse
+import base64
+import csv
+import gzip
+import io
+import json
+import logging
+import sys
+import time
+
+import numpy as np
+
+from utils import env_int
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NAME = "mem0-mcp-export"
+FORMAT_VERSION = 1
+FORMATS = ("ndjson", "parquet")
+ON_CONFLICT = ("skip", "replace")
+
+_STAGING_TABLE = "mem0_import"
+
+def get_transfer_settings():
+    """Read the TRANSFER_* settings."""
+    return {
+        "chunk_size": env_int("TRANSFER_CHUNK_SIZE", 2000),
+    }
+
+def encode_vector(vector):
+    return base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode("ascii")
+
+def decode_vector(value):
+    """A vector from its base64 float32 form; plain JSON lists are accepted too."""
+    if isinstance(value, str):
+        return np.frombuffer(base64.b64decode(value), dtype="<f4")
+    return np.asarray(value, dtype=np.float32)
+
+def embedding_info(memory):
+    """(model, dims) of the client's embedder, either None when the embedder does not say."""
+    config = getattr(memory.embedding_model, "config", None)
+    return getattr(config, "model", None), getattr(config, "embedding_dims", None)
+
+def format_of(path, format=None):
+    if format:
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r}; choose from {', '.join(FORMATS)}")
+        return format
+    return "parquet" if path.endswith(".parquet") else "ndjson"
+
+def collection_of(vector_store):
+    """The vecs collection behind a supabase vector store (or the collection itself), or None for other stores."""
+    if hasattr(vector_store, "table"):
+        return vector_store
+    collection = getattr(vector_store, "collection", None)
+    return collection if collection is not None and hasattr(collection, "table") else None
+
+class NdjsonWriter:
+    def __init__(self, path, header):
+        if path == "-":
+            self._handle, self._close = sys.stdout, False
+        elif path.endswith(".gz"):
+            self._handle, self._close = gzip.open(path, "wt", encoding="utf-8"), True
+        else:
+            self._handle, self._close = open(path, "w", encoding="utf-8"), True
+        self._handle.write(json.dumps(header) + "\n")
+
+    def write(self, records):
+        lines = []
+        for memory_id, payload, vector in records:
+            record = {"id": memory_id, "payload": payload}
+            if vector is not None:
+                record["vector"] = encode_vector(vector)
+            lines.append(json.dumps(record, ensure_ascii=False))
+        self._handle.write("\n".join(lines) + "\n")
+
+    def close(self):
+        if self._close:
+            self._handle.close()
+        else:
+            self._handle.flush()
+
+class ParquetWriter:
+    def __init__(self, path, header):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema(
+            [("id", pa.string()), ("payload", pa.string()), ("vector", pa.list_(pa.float32()))],
+            metadata={FORMAT_NAME: json.dumps(header)},
+        )
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def write(self, records):
+        # One row group per chunk
+        columns = {
+            "id": [memory_id for memory_id, _, _ in records],
+            "payload": [json.dumps(payload, ensure_ascii=False) for _, payload, _ in records],
+            "vector": [None if vector is None else np.asarray(vector, dtype=np.float32) for _, _, vector in records],
+        }
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+def open_writer(path, header, format=None):
+    return ParquetWriter(path, header) if format_of(path, format) == "parquet" else NdjsonWriter(path, header)
+
+def _check_header(header, path):
+    if not isinstance(header, dict) or header.get("format") != FORMAT_NAME:
+        raise ValueError(f"{path} is not a {FORMAT_NAME} file")
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {header['version']}; this version reads up to {FORMAT_VERSION}")
+    return header
+
+def _read_ndjson(path, chunk_size):
+    if path == "-":
+        handle = sys.stdin
+    elif path.endswith(".gz"):
+        handle = gzip.open(path, "rt", encoding="utf-8")
+    else:
+        handle = open(path, encoding="utf-8")
+    header = _check_header(json.loads(handle.readline() or "null"), path)
+
+    def chunks():
+        try:
+            chunk = []
+            for line in handle:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                vector = record.get("vector")
+                chunk.append((record["id"], record["payload"], None if vector is None else decode_vector(vector)))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+    return header, chunks()
+
+def _read_parquet(path, chunk_size):
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    metadata = parquet.schema_arrow.metadata or {}
+    header = _check_header(json.loads(metadata.get(FORMAT_NAME.encode(), b"null")), path)
+
+    def chunks():
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=["id", "payload", "vector"]):
+            ids, payloads, vectors = (batch.column(name).to_pylist() for name in ("id", "payload", "vector"))
+            yield [
+                (memory_id, json.loads(payload), None if vector is None else np.asarray(vector, dtype=np.float32))
+                for memory_id, payload, vector in zip(ids, payloads, vectors)
+            ]
+
+    return header, chunks()
+
+def read_export(path, format=None, chunk_size=2000):
+    """Open an export file.
+
+    Returns:
+        tuple: (header dict, iterator over chunks of (id, payload, vector or None) records)
+    """
+    if format_of(path, format) == "parquet":
+        return _read_parquet(path, chunk_size)
+    return _read_ndjson(path, chunk_size)
+
+def _records_from_sql(collection, filters, chunk_size, after, vectors):
+    from sqlalchemy import text
+
+    statement = text(
+        f'SELECT id, {"vec::real[]" if vectors else "NULL"}, metadata FROM vecs."{collection.table.name}" '
+        "WHERE id > :after AND metadata @> CAST(:filters AS jsonb) ORDER BY id LIMIT :limit"
+    )
+    after = after or ""
+    while True:
+        # A short transaction per chunk rather than one cursor held open for the whole export
+        with collection.client.Session() as session:
+            rows = session.execute(
+                statement, {"after": after, "filters": json.dumps(filters), "limit": chunk_size}
+            ).fetchall()
+        if not rows:
+            return
+        yield [(row[0], row[2], row[1]) for row in rows]
+        after = rows[-1][0]
+
+def _records_from_listing(vector_store, filters, chunk_size, after, vectors):
+    records = vector_store.list(filters=filters or None, limit=None)
+    if records and isinstance(records[0], list):
+        records = records[0]
+    records = sorted((record for record in records if after is None or str(record.id) > after),
+                     key=lambda record: str(record.id))
+    get_vectors = getattr(vector_store, "get_vectors", None) if vectors else None
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        ids = [str(record.id) for record in chunk]
+        # Stores that cannot return their vectors export texts only; the import embeds them
+        found = get_vectors(ids) if get_vectors is not None else {}
+        yield [(memory_id, record.payload or {}, found.get(memory_id)) for memory_id, record in zip(ids, chunk)]
+
+def iter_records(vector_store, filters=None, chunk_size=2000, after=None, vectors=True):
+    """Yield a vector store's records in id order as chunks of (id, payload, vector or None).
+
+    Args:
+        vector_store: The Mem0 vector store (``memory.vector_store``)
+        filters: Scope filters the records must match
+        chunk_size: Records per chunk
+        after: Start after this id, to resume an earlier pass
+        vectors: Read the vectors too; without them every vector is None
+    """
+    collection = collection_of(vector_store)
+    if collection is not None:
+        return _records_from_sql(collection, filters or {}, chunk_size, after, vectors)
+    return _records_from_listing(vector_store, filters or {}, chunk_size, after, vectors)
+
+def export_memories(memory, path, filters=None, format=None, chunk_size=2000, vectors=True):
+    """Write the memories matching filters, with their vectors, to an export file.
+
+    Args:
+        memory: The Mem0 client
+        path: File to write; see the module docstring for the formats
+        filters: Scope filters, e.g. {"user_id": "alice"}; None exports every memory
+        format: "ndjson" or "parquet"; by default taken from the file extension
+        chunk_size: Records read and written per chunk
+        vectors: Include the vectors; without them an import embeds every text again
+
+    Returns:
+        dict: Records written, seconds taken and the header
+    """
+    model, dims = embedding_info(memory)
+    header = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "model": model,
+        "dims": dims,
+        "collection": getattr(memory.vector_store, "collection_name", None),
+        "filters": filters or {},
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+    }
+    started = time.perf_counter()
+    count = 0
+    writer = open_writer(path, header, format)
+    try:
+        for chunk in iter_records(memory.vector_store, filters, chunk_size):
+            if not vectors:
+                chunk = [(memory_id, payload, None) for memory_id, payload, _ in chunk]
+            writer.write(chunk)
+            count += len(chunk)
+    finally:
+        writer.close()
+    seconds = time.perf_counter() - started
+    return {
+        "exported": count,
+        "seconds": round(seconds, 3),
+        "records_per_second": round(count / seconds, 1) if seconds else None,
+        "header": header,
+    }
+
+def copy_records(collection, records, on_conflict="skip"):
+    """COPY records into a temporary table and merge it into the collection; returns the rows written."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for memory_id, payload, vector in records:
+        # str() of a float list is valid pgvector input and round-trips float32 exactly
+        writer.writerow((memory_id, str(vector.tolist()), json.dumps(payload, ensure_ascii=False)))
+    buffer.seek(0)
+
+    table = f'vecs."{collection.table.name}"'
+    if on_conflict == "replace":
+        conflict = "DO UPDATE SET vec = EXCLUDED.vec, metadata = EXCLUDED.metadata"
+    else:
+        conflict = "DO NOTHING"
+    connection = collection.client.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"CREATE TEMP TABLE {_STAGING_TABLE} (LIKE {table}) ON COMMIT DROP")
+        cursor.copy_expert(f"COPY {_STAGING_TABLE} (id, vec, metadata) FROM STDIN WITH (FORMAT csv)", buffer)
+        # DISTINCT ON: a record repeated within the chunk would make ON CONFLICT DO UPDATE fail
+        cursor.execute(
+            f"INSERT INTO {table} (id, vec, metadata) "
+            f"SELECT DISTINCT ON (id) id, vec, metadata FROM {_STAGING_TABLE} ORDER BY id ON CONFLICT (id) {conflict}"
+        )
+        written = cursor.rowcount
+        connection.commit()
+        return written
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+def _insert_chunk(vector_store, records, on_conflict):
+    if on_conflict == "skip":
+        def exists(memory_id):
+            try:
+                return vector_store.get(vector_id=memory_id) is not None
+            except Exception:
+                return False
+
+        records = [record for record in records if not exists(record[0])]
+    if records:
+        ids, payloads, vectors = zip(*records)
+        vector_store.insert(vectors=list(vectors), payloads=list(payloads), ids=list(ids))
+    return len(records)
+
+def _drop_ann_index(collection):
+    """Drop the vector index for the duration of a bulk load; returns its description or None."""
+    from sqlalchemy import text
+
+    from vector_indexes import describe_ann_index
+
+    index = describe_ann_index(collection)
+    if index is not None:
+        with collection.client.Session() as session:
+            session.execute(text(f'DROP INDEX IF EXISTS vecs."{index["name"]}"'))
+            session.commit()
+        collection._index = None
+    return index
+
+def _rebuild_ann_index(collection, index):
+    from vector_indexes import build_ann_index
+
+    parameters = {key: index[key] for key in ("method", "m", "ef_construction", "lists") if key in index}
+    return build_ann_index(collection, **parameters)
+
+def import_memories(memory, chunks, header, on_conflict="skip", reembed=False, defer_index=False):
+    """Write exported records into the collection.
+
+    Args:
+        memory: The Mem0 client
+        chunks: Chunks of (id, payload, vector or None) records, as returned by read_export
+        header: The export header, as returned by read_export
+        on_conflict: "skip" keeps memories that already exist, "replace" overwrites them
+        reembed: Embed every text again even when the export's model matches
+        defer_index: On pgvector, drop the vector index during the load and build it once afterwards,
+            which is much faster than updating it row by row for large imports
+
+    Returns:
+        dict: Records read, written and re-embedded, seconds taken and whether vectors were reused
+    """
+    from batching import embed_batch
+
+    if on_conflict not in ON_CONFLICT:
+        raise ValueError(f"on_conflict must be one of {', '.join(ON_CONFLICT)}")
+    model, dims = embedding_info(memory)
+    reuse = not reembed and header.get("model") == model and (dims is None or header.get("dims") == dims)
+    if not reembed and not reuse:
+        logger.warning(
+            f"Export was made with {header.get('model')} ({header.get('dims')} dims), the server uses "
+            f"{model} ({dims} dims); embedding every text again"
+        )
+    collection = collection_of(memory.vector_store)
+    index = _drop_ann_index(collection) if defer_index and collection is not None else None
+
+    report = {"read": 0, "written": 0, "reembedded": 0, "vectors_reused": reuse}
+    started = time.perf_counter()
+    try:
+        for chunk in chunks:
+            report["read"] += len(chunk)
+            missing = [position for position, (_, _, vector) in enumerate(chunk) if not reuse or vector is None]
+            if missing:
+                texts = [chunk[position][1].get("data") or "" for position in missing]
+                for position, vector in zip(missing, embed_batch(memory.embedding_model, texts, "add")):
+                    memory_id, payload, _ = chunk[position]
+                    chunk[position] = (memory_id, payload, np.asarray(vector, dtype=np.float32))
+                report["reembedded"] += len(missing)
+            if dims:
+                for memory_id, _, vector in chunk:
+                    if len(vector) != dims:
+                        raise ValueError(
+                            f"Memory {memory_id} has a {len(vector)}-dimensional vector, the collection needs {dims}"
+                        )
+            if collection is not None:
+                report["written"] += copy_records(collection, chunk, on_conflict)
+            else:
+                report["written"] += _insert_chunk(memory.vector_store, chunk, on_conflict)
+    finally:
+        if index is not None:
+            report["index"] = _rebuild_ann_index(collection, index)
+    seconds = time.perf_counter() - started
+    report["seconds"] = round(seconds, 3)
+    report["records_per_second"] = round(report["read"] / seconds, 1) if seconds else None
+    return report
+
+def main():
+    settings = get_transfer_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=FORMATS, help="default: parquet for .parquet paths, else ndjson")
+    parser.add_argument("--chunk-size", type=int, default=settings["chunk_size"])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Write memories and their vectors to a file")
+    export.add_argument("path", help='output file, or "-" for stdout')
+    export.add_argument("--user-id")
+    export.add_argument("--agent-id")
+    export.add_argument("--run-id")
+    export.add_argument("--no-vectors", action="store_true", help="texts and metadata only")
+    restore = commands.add_parser("import", help="Load memories from an export file")
+    restore.add_argument("path", help='input file, or "-" for stdin')
+    restore.add_argument("--on-conflict", choices=ON_CONFLICT, default="skip")
+    restore.add_argument("--reembed", action="store_true", help="embed the texts even if the model matches")
+    restore.add_argument("--defer-index", action="store_true",
+                         help="pgvector: drop the vector index during the load and rebuild it afterwards")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    from utils import get_mem0_client
+
+    load_dotenv()
+    memory = get_mem0_client()
+    try:
+        if args.command == "export":
+            filters = {key: value for key, value in
+                       (("user_id", args.user_id), ("agent_id", args.agent_id), ("run_id", args.run_id)) if value}
+            report = export_memories(memory, args.path, filters, args.format, args.chunk_size, not args.no_vectors)
+        else:
+            header, chunks = read_export(args.path, args.format, args.chunk_size)
+            report = import_memories(memory, chunks, header, args.on_conflict, args.reembed, args.defer_index)
+    finally:
+        close = getattr(memory.vector_store, "close", None)
+        if close is not None:
+            close()
+    # The export itself may be on stdout
+    print(json.dumps(report, indent=2), file=sys.stderr if getattr(args, "path", None) == "-" else sys.stdout)
+
+if __name__ == "__main__":
+    main()
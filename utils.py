@@ -1,6 +1,8 @@
-from mem0 import Memory
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Custom instructions for memory processing
 # These aren't being used right now but Mem0 does support adding custom prompting
 # for handling memory retrieval and processing.
@@ -14,7 +16,34 @@ Extract the Following Information:
 - Source: Record where this information came from when applicable.
 """
 
-def get_mem0_client():
+def env_int(name, default):
+    """Read an integer setting from the environment, falling back to default."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+def env_float(name, default):
+    """Read a float setting from the environment, falling back to default."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return float(value)
+
+def env_bool(name, default=False):
+    """Read a boolean setting (1/true/yes/on) from the environment."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def get_mem0_client(embedding_cache=None):
+    """Build the Mem0 client from the environment.
+
+    Args:
+        embedding_cache: Optional EmbeddingCache placed in front of the openai or
+            ollama embedder so repeated texts are not re-embedded
+    """
     # Get LLM provider and configuration
     llm_provider = os.getenv('LLM_PROVIDER')
     llm_api_key = os.getenv('LLM_API_KEY')
@@ -86,17 +115,93 @@ def get_mem0_client():
         if embedding_base_url:
             config["embedder"]["config"]["ollama_base_url"] = embedding_base_url
     
-    # Configure Supabase vector store
-    config["vector_store"] = {
-        "provider": "supabase",
-        "config": {
-            "connection_string": os.environ.get('DATABASE_URL', ''),
-            "collection_name": "mem0_memories",
-            "embedding_model_dims": 1536 if llm_provider == "openai" else 768
+    embedding_dims = 1536 if llm_provider == "openai" else 768
+    vector_store = os.getenv("VECTOR_STORE", "supabase")
+
+    # Serve the collection the embedding registry marks active, with the model that built it
+    from reembed import DEFAULT_COLLECTION, resolve_collection
+
+    try:
+        collection, embedding_dims, embedding_target = resolve_collection(config, embedding_dims, vector_store)
+    except Exception as e:
+        logger.warning(f"Could not read the embedding registry, serving {DEFAULT_COLLECTION}: {e}")
+        collection, embedding_target = DEFAULT_COLLECTION, None
+
+    # Compact codes the searches rank candidates with (VECTOR_ENCODING / VECTOR_INDEX_DIMS)
+    from quantization import build_codec, get_encoding_settings
+
+    encoding = get_encoding_settings()
+    # Mem0 falls back to OpenAI's text-embedding-3-small when no embedder is configured
+    model = config.get("embedder", {}).get("config", {}).get("model", "text-embedding-3-small")
+    codec = build_codec(embedding_dims, model, encoding)
+    if vector_store == "local":
+        # Mem0 only builds the vector stores it knows about, so it gets a throwaway
+        # in-memory Qdrant collection here that is replaced by the local store below
+        from qdrant_client import QdrantClient
+
+        config["vector_store"] = {
+            "provider": "qdrant",
+            "config": {
+                "client": QdrantClient(location=":memory:"),
+                "path": ":memory:",
+                "collection_name": collection,
+                "embedding_model_dims": embedding_dims
+            }
+        }
+    else:
+        # Configure Supabase vector store
+        config["vector_store"] = {
+            "provider": "supabase",
+            "config": {
+                "connection_string": os.environ.get('DATABASE_URL', ''),
+                "collection_name": collection,
+                "embedding_model_dims": embedding_dims,
+                "index_method": os.getenv("VECTOR_INDEX_METHOD", "auto")
+            }
         }
-    }
 
     # config["custom_fact_extraction_prompt"] = CUSTOM_INSTRUCTIONS
     
-    # Create and return the Memory client
-    return Memory.from_config(config)
\ No newline at end of file
+    # Create the Memory client; mem0 is imported here because importing it takes seconds
+    from mem0 import Memory
+
+    memory = Memory.from_config(config)
+
+    if vector_store == "local":
+        from local_store import build_local_vector_store
+
+        memory.vector_store = build_local_vector_store(collection, embedding_dims, codec=codec)
+
+    # Replace vecs' default connection pool with the DB_POOL_* configured one
+    if config["vector_store"]["provider"] == "supabase":
+        from db_pool import configure_vecs_pool
+
+        configure_vecs_pool(memory.vector_store.db)
+
+        if codec is not None:
+            from quantization import enable_encoded_search
+
+            enable_encoded_search(
+                memory.vector_store, codec, encoding["rescore"], env_int("VECTOR_INDEX_EF_SEARCH", 40)
+            )
+
+    # Put timeouts, circuit breakers and the LLM_FALLBACKS / EMBEDDING_FALLBACKS providers around both
+    from failover import wrap_providers
+
+    wrap_providers(memory, config)
+
+    # Answer repeated texts from the embedding cache instead of the provider
+    if embedding_cache is not None and config.get("embedder", {}).get("provider") in ("openai", "ollama"):
+        from embedding_cache import CachedEmbedder
+
+        memory.embedding_model = CachedEmbedder(
+            memory.embedding_model,
+            embedding_cache,
+            provider=config["embedder"]["provider"],
+            casefold=env_bool("EMBEDDING_CACHE_CASEFOLD", False),
+        )
+
+    # The embedder to re-embed into, when the configured one is not the active collection's
+    memory.collection_name = collection
+    memory.embedding_target = embedding_target
+    return memory
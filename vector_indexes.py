@@ -0,0 +1,324 @@
+"""
+Index management for the pgvector table behind the ``supabase`` vector store.
+
+Scope indexes: Mem0 filters searches with ``metadata -> 'user_id' = '"alice"'``
+style comparisons (vecs compiles string ``$eq`` filters that way), which a GIN
+index on the metadata column cannot serve. Without an index matching that
+expression every scoped search reads the whole table, so the cost of a search
+grows with the total number of memories rather than with the size of the
+tenant. ``ensure_scope_indexes`` adds one B-tree expression index per scope
+key, plus a ``jsonb_path_ops`` GIN index for the containment (``@>``) filters
+used by pagination, if the collection does not have one yet.
+
+ANN index: ``build_ann_index`` (re)builds the HNSW or IVFFlat index on the
+vector column with explicit build parameters, ``apply_search_params`` sets the
+ef_search / probes every search runs with, and ``evaluate_recall`` measures
+recall and latency of the index against exact search on a sample. Run
+``python vector_indexes.py --help`` (or ``mem0-index``) for the command line.
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+import re
+import statistics
+import time
+
+from scoping import SCOPE_KEYS
+from utils import env_int
+
+logger = logging.getLogger(__name__)
+
+def _existing_indexes(connection, table_name):
+    from sqlalchemy import text
+
+    rows = connection.execute(
+        text("SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = 'vecs' AND tablename = :table"),
+        {"table": table_name},
+    )
+    return {row[0]: row[1] for row in rows}
+
+def scope_index_statements(table_name, existing=None):
+    """Return (index name, CREATE INDEX statement) pairs for the scope indexes a table lacks.
+
+    Args:
+        table_name: Name of the collection table in the vecs schema
+        existing: Mapping of index name to definition already on the table
+    """
+    existing = existing or {}
+    statements = []
+    for key in SCOPE_KEYS:
+        name = f"{table_name}_{key}_idx"
+        if name not in existing:
+            statements.append((
+                name,
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON vecs."{table_name}" ((metadata -> \'{key}\'))',
+            ))
+    if not any("gin (metadata jsonb_path_ops)" in definition for definition in existing.values()):
+        name = f"{table_name}_metadata_gin_idx"
+        statements.append((
+            name,
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON vecs."{table_name}" USING gin (metadata jsonb_path_ops)',
+        ))
+    return statements
+
+def ensure_scope_indexes(collection):
+    """Create the per-scope metadata indexes on a vecs collection if they are missing.
+
+    Indexes are built CONCURRENTLY, so writes to the collection are not blocked
+    while a large table is indexed.
+
+    Args:
+        collection: The vecs collection (``memory.vector_store.collection``)
+
+    Returns:
+        list: Names of the indexes that were created
+    """
+    from sqlalchemy import text
+
+    table_name = collection.table.name
+    engine = collection.client.engine
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        statements = scope_index_statements(table_name, _existing_indexes(connection, table_name))
+        for name, statement in statements:
+            logger.info(f"Creating index {name} on vecs.{table_name}")
+            connection.execute(text(statement))
+        if statements:
+            connection.execute(text(f'ANALYZE vecs."{table_name}"'))
+    return [name for name, _ in statements]
+
+def ensure_fulltext_index(collection, ts_config="simple"):
+    """Create the GIN index on the memory text that hybrid search's full-text query uses.
+
+    Returns:
+        list: The name of the index if it was created, else an empty list
+    """
+    from sqlalchemy import text
+
+    table_name = collection.table.name
+    name = f"{table_name}_data_fts_{ts_config}_idx"
+    with collection.client.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if name in _existing_indexes(connection, table_name):
+            return []
+        logger.info(f"Creating index {name} on vecs.{table_name}")
+        connection.execute(text(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON vecs."{table_name}" '
+            f"USING gin (to_tsvector('{ts_config}', metadata->>'data'))"
+        ))
+    return [name]
+
+# pgvector distance operator for each vecs index measure
+_DISTANCE_OPERATORS = {"cosine_distance": "<=>", "l2_distance": "<->", "max_inner_product": "<#>"}
+
+# vecs encodes the build parameters in the index name, e.g. ix_vector_cosine_ops_hnsw_m16_efc64_1a2b3c4
+_ANN_INDEX_NAME = re.compile(
+    r"^ix_(?P<ops>vector_\w+?_ops)_(?P<method>hnsw|ivfflat)_(?:m(?P<m>\d+)_efc(?P<ef_construction>\d+)|nl(?P<lists>\d+))_"
+)
+
+def get_ann_index_settings():
+    """Read the VECTOR_INDEX_* build settings."""
+    return {
+        "method": os.getenv("VECTOR_INDEX_METHOD", "auto"),
+        "m": env_int("VECTOR_INDEX_M", 16),
+        "ef_construction": env_int("VECTOR_INDEX_EF_CONSTRUCTION", 64),
+        "lists": env_int("VECTOR_INDEX_LISTS", 0) or None,
+    }
+
+def describe_ann_index(collection):
+    """Return the collection's vector index (method, build parameters, size), or None if it has none."""
+    from sqlalchemy import text
+
+    table_name = collection.table.name
+    with collection.client.Session() as session:
+        row = session.execute(
+            text(
+                "SELECT c.relname, pg_relation_size(c.oid), pg_total_relation_size(t.oid) "
+                "FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid JOIN pg_class t ON t.oid = i.indrelid "
+                "WHERE t.relnamespace = 'vecs'::regnamespace AND t.relname = :table AND c.relname LIKE 'ix_vector%'"
+            ),
+            {"table": table_name},
+        ).fetchone()
+        rows = session.execute(text(f'SELECT count(*) FROM vecs."{table_name}"')).scalar()
+    if row is None:
+        return None
+    description = {"name": row[0], "index_bytes": row[1], "table_bytes": row[2], "rows": rows}
+    match = _ANN_INDEX_NAME.match(row[0])
+    if match:
+        description["method"] = match["method"]
+        if match["method"] == "hnsw":
+            description.update(m=int(match["m"]), ef_construction=int(match["ef_construction"]))
+        else:
+            description["lists"] = int(match["lists"])
+    return description
+
+def _resolve_method(collection, method):
+    if method == "auto":
+        return "hnsw" if collection.client._supports_hnsw() else "ivfflat"
+    return method
+
+def build_ann_index(collection, method="auto", m=16, ef_construction=64, lists=None, measure="cosine_distance"):
+    """Drop the collection's vector index and build it again with the given parameters.
+
+    Args:
+        collection: The vecs collection (``memory.vector_store.collection``)
+        method: "hnsw", "ivfflat" or "auto" (HNSW when the pgvector version supports it)
+        m: HNSW connections per node
+        ef_construction: HNSW candidate list size while building
+        lists: IVFFlat list count; None lets vecs pick one from the row count
+        measure: The vecs index measure; Mem0 searches with cosine distance
+
+    Returns:
+        dict: The new index, as returned by describe_ann_index
+    """
+    from vecs import IndexArgsHNSW, IndexArgsIVFFlat, IndexMeasure, IndexMethod
+
+    method = _resolve_method(collection, method)
+    if method == "hnsw":
+        arguments = IndexArgsHNSW(m=m, ef_construction=ef_construction)
+    else:
+        arguments = IndexArgsIVFFlat(n_lists=lists) if lists else None
+    # vecs caches the index name; look it up again so the right index is dropped
+    collection._index = None
+    started = time.perf_counter()
+    collection.create_index(
+        measure=IndexMeasure(measure), method=IndexMethod(method), index_arguments=arguments, replace=True
+    )
+    collection._index = None
+    logger.info(f"Built {method} index on vecs.{collection.table.name} in {time.perf_counter() - started:.1f}s")
+    return describe_ann_index(collection)
+
+def ensure_ann_index(collection, method="auto", m=16, ef_construction=64, lists=None):
+    """Rebuild the vector index only if it is missing or was built with other parameters.
+
+    Returns:
+        dict: The index description, and whether it was rebuilt
+    """
+    current = describe_ann_index(collection)
+    method = _resolve_method(collection, method)
+    if current is not None and current.get("method") == method:
+        if method == "hnsw" and (current["m"], current["ef_construction"]) == (m, ef_construction):
+            return {**current, "rebuilt": False}
+        if method == "ivfflat" and lists in (None, current["lists"]):
+            return {**current, "rebuilt": False}
+    return {**build_ann_index(collection, method, m, ef_construction, lists), "rebuilt": True}
+
+def apply_search_params(collection, probes=10, ef_search=40):
+    """Make every search on the collection run with these IVFFlat probes / HNSW ef_search values."""
+    collection.query = functools.partial(collection.query, probes=probes, ef_search=ef_search)
+
+def _percentiles(latencies):
+    latencies = sorted(latencies)
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[max(0, int(len(latencies) * 0.95) - 1)], 2),
+    }
+
+def evaluate_recall(collection, sample_size=100, k=10, values=None, measure="cosine_distance"):
+    """Compare ANN search against exact search for vectors sampled from the collection.
+
+    Args:
+        collection: The vecs collection
+        sample_size: Number of stored vectors used as queries
+        k: Neighbours retrieved per query
+        values: ef_search (HNSW) or probes (IVFFlat) values to try
+        measure: The distance the index was built for
+
+    Returns:
+        dict: The index description, exact search latency and, per value, recall@k and latency
+    """
+    from sqlalchemy import text
+
+    index = describe_ann_index(collection)
+    if index is None or "method" not in index:
+        raise ValueError(f"Collection {collection.table.name} has no vecs vector index to evaluate")
+    setting = "hnsw.ef_search" if index["method"] == "hnsw" else "ivfflat.probes"
+    if values is None:
+        values = (10, 20, 40, 80, 160) if index["method"] == "hnsw" else (1, 5, 10, 20, 40)
+
+    table_name = collection.table.name
+    operator = _DISTANCE_OPERATORS[measure]
+    query = text(f'SELECT id FROM vecs."{table_name}" ORDER BY vec {operator} CAST(:vector AS vector) LIMIT :k')
+
+    def run(session, vector):
+        started = time.perf_counter()
+        ids = [row[0] for row in session.execute(query, {"vector": vector, "k": k})]
+        return ids, (time.perf_counter() - started) * 1000
+
+    with collection.client.Session() as session:
+        # Vectors stay in pgvector's text form, so they go back in exactly as stored
+        samples = [
+            row[0] for row in session.execute(
+                text(f'SELECT vec::text FROM vecs."{table_name}" ORDER BY random() LIMIT :n'), {"n": sample_size}
+            )
+        ]
+        session.rollback()
+        if not samples:
+            raise ValueError(f"Collection {table_name} is empty")
+
+        exact, exact_latencies = [], []
+        with session.begin():
+            session.execute(text("SET LOCAL enable_indexscan = off"))
+            for vector in samples:
+                ids, latency = run(session, vector)
+                exact.append(set(ids))
+                exact_latencies.append(latency)
+
+        runs = []
+        for value in values:
+            hits, latencies = 0, []
+            with session.begin():
+                session.execute(text(f"SET LOCAL {setting} = {int(value)}"))
+                for vector, truth in zip(samples, exact):
+                    ids, latency = run(session, vector)
+                    hits += len(truth.intersection(ids))
+                    latencies.append(latency)
+            total = sum(len(truth) for truth in exact)
+            runs.append({setting.split(".")[1]: value, "recall": round(hits / total, 4), **_percentiles(latencies)})
+
+    return {"index": index, "sample_size": len(samples), "k": k, "exact": _percentiles(exact_latencies), "runs": runs}
+
+def main():
+    """Command line entry point: inspect, rebuild and evaluate the Mem0 vector index."""
+    from dotenv import load_dotenv
+    import vecs
+
+    load_dotenv()
+    settings = get_ann_index_settings()
+    parser = argparse.ArgumentParser(description="Manage the pgvector indexes of the Mem0 collection")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--collection", default="mem0_memories")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show the vector index, its build parameters and size")
+    build = commands.add_parser("build", help="Drop and rebuild the vector index")
+    build.add_argument("--method", choices=("auto", "hnsw", "ivfflat"), default=settings["method"])
+    build.add_argument("--m", type=int, default=settings["m"])
+    build.add_argument("--ef-construction", type=int, default=settings["ef_construction"])
+    build.add_argument("--lists", type=int, default=settings["lists"])
+    commands.add_parser("scope-indexes", help="Create the user_id / agent_id / run_id indexes")
+    evaluate = commands.add_parser("evaluate", help="Measure recall and latency against exact search")
+    evaluate.add_argument("--sample", type=int, default=100)
+    evaluate.add_argument("--k", type=int, default=10)
+    evaluate.add_argument("--values", default=None, help="Comma separated ef_search (HNSW) or probes (IVFFlat) values")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("Set DATABASE_URL or pass --database-url")
+
+    client = vecs.create_client(args.database_url)
+    try:
+        collection = client.get_collection(args.collection)
+        if args.command == "status":
+            result = {"ann_index": describe_ann_index(collection)}
+        elif args.command == "build":
+            result = build_ann_index(collection, args.method, args.m, args.ef_construction, args.lists)
+        elif args.command == "scope-indexes":
+            result = {"created": ensure_scope_indexes(collection)}
+        else:
+            values = [int(value) for value in args.values.split(",")] if args.values else None
+            result = evaluate_recall(collection, sample_size=args.sample, k=args.k, values=values)
+    finally:
+        client.disconnect()
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()